@@ -1,20 +1,53 @@
-import sqlite3
 import os
+import threading
+from app.util.banco import conexao_leitura
+from app.util.historico import obter_cache_historico
 
 # Caminho do banco, que está na pasta raiz do projeto
 DB_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'megasena_db.sqlite3')
 if not os.path.exists(DB_PATH):
     DB_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'megasena_db.sqlite3')
 
+COLS_SORTEIO = ['Concurso', 'Data', 'Bola1', 'Bola2', 'Bola3', 'Bola4', 'Bola5', 'Bola6']
+
+# Respostas de listar_sorteios/buscar_sorteio da versão atual do histórico.
+# Os indicadores (repetidas_21, repetidas_39, repetidas_anteriores) pedem os mesmos
+# recortes várias vezes por requisição; só recalculamos quando o coletor grava algo.
+_consultas = (None, {})  # (versao do histórico, {chave: resposta}), trocado de uma vez
+_consultas_lock = threading.Lock()
+
 def conectar():
-    return sqlite3.connect(DB_PATH)
+    """Conexão somente-leitura da thread (pool em app/util/banco.py). Não feche."""
+    return conexao_leitura(DB_PATH)
+
+def _como_tupla(row):
+    # Mesmo formato do cursor: (Concurso, Data, Bola1, ..., Bola6) com tipos nativos
+    return tuple(v.item() if hasattr(v, 'item') else v for v in row)
+
+def _consulta_em_cache(chave, calcular):
+    # Threads de requisição leem e trocam o cache: tudo sob o lock (calcular é só um recorte do DataFrame)
+    global _consultas
+    df, versao = obter_cache_historico(DB_PATH).obter_versionado()
+    with _consultas_lock:
+        versao_cache, respostas = _consultas
+        if versao_cache != versao:
+            respostas = {}
+            _consultas = (versao, respostas)
+        if chave not in respostas:
+            respostas[chave] = calcular(df)
+        return respostas[chave]
 
 def listar_sorteios(limit=20):
-    with conectar() as conn:
-        cursor = conn.execute('SELECT Concurso, Data, Bola1, Bola2, Bola3, Bola4, Bola5, Bola6 FROM resultados_megasena ORDER BY Concurso DESC LIMIT ?', (limit,))
-        return cursor.fetchall()
+    def calcular(df):
+        if df.empty: return []
+        recorte = df[COLS_SORTEIO].iloc[::-1].head(limit)
+        return [_como_tupla(row) for row in recorte.itertuples(index=False, name=None)]
+    return list(_consulta_em_cache(('listar', limit), calcular))
 
 def buscar_sorteio(concurso_num):
-    with conectar() as conn:
-        cursor = conn.execute('SELECT Concurso, Data, Bola1, Bola2, Bola3, Bola4, Bola5, Bola6 FROM resultados_megasena WHERE Concurso=?', (concurso_num,))
-        return cursor.fetchone()
+    def calcular(df):
+        if df.empty: return None
+        linha = df.loc[df['Concurso'] == concurso_num, COLS_SORTEIO]
+        if linha.empty: return None
+        return _como_tupla(next(linha.itertuples(index=False, name=None)))
+    return _consulta_em_cache(('buscar', concurso_num), calcular)
@@ -0,0 +1,327 @@
+# app/util/agregados.py
+"""
+Agregados do dashboard ('/') mantidos de forma incremental.
+
+Todas as estatísticas do painel são só-acréscimo: cada sorteio novo entra com
+O(1) de trabalho (contadores, histogramas, soma/soma dos quadrados para a média e
+o desvio das faixas, janela dos últimos 39 sorteios, estado do ciclo e última
+aparição de cada dezena). O painel é montado a partir desse estado, sem
+percorrer o histórico.
+
+- O estado é serializável (para_dict/de_dict, JSON em megasena_db.agregados.json).
+- O coletor atualiza o arquivo ao gravar concursos; o cache do histórico estende
+  o estado em memória quando detecta sorteios novos.
+- reconstruir(m) refaz tudo do zero; verificar(m) compara com calcular_painel.
+
+Conferir:  python -m app.util.agregados [caminho_do_banco] --verificar
+"""
+import argparse
+import json
+import math
+import os
+from collections import Counter, deque
+from fractions import Fraction
+from .config_mega import TABLE_NAME, DATABASE_NAME, UNIVERSO_DEZENAS
+from .features import EH_PRIMO, EH_FIBO, EH_MULT3, QUADRANTE
+from .estatisticas import (calcular_painel, formatar_distribuicao, formatar_frequencia_geral,
+                           formatar_pares_impares, formatar_maximas, formatar_quadrantes,
+                           formatar_ciclo, formatar_atrasos, montar_faixas)
+from .mascaras import mascara_jogo, dezenas_mascara, MASCARA_UNIVERSO
+
+FORMATO = 1
+JANELAS = (39, 21)
+CONTADORES = ['primos', 'fibo', 'mult3', 'iniciais', 'finais', 'sequenciais',
+              'pares', 'linhas', 'colunas', 'repetidas', 'quadrantes']
+FAIXAS = ['soma', 'deltas'] + [f'temp{j}' for j in JANELAS]
+
+_EH_PRIMO = EH_PRIMO.tolist()
+_EH_FIBO = EH_FIBO.tolist()
+_EH_MULT3 = EH_MULT3.tolist()
+_QUADRANTE = QUADRANTE.tolist()
+
+
+class MomentosOnline:
+    """Histograma de valores inteiros + soma e soma dos quadrados (média/desvio exatos)."""
+
+    def __init__(self):
+        self.histograma = Counter()
+        self.n = 0
+        self.soma = 0
+        self.soma_quadrados = 0
+
+    def adicionar(self, valor):
+        self.histograma[valor] += 1
+        self.n += 1
+        self.soma += valor
+        self.soma_quadrados += valor * valor
+
+    @property
+    def media(self):
+        return self.soma / self.n
+
+    @property
+    def desvio(self):
+        # Desvio amostral (ddof=1), como pd.Series.std()
+        if self.n < 2:
+            return float('nan')
+        variancia = Fraction(self.n * self.soma_quadrados - self.soma * self.soma, self.n * (self.n - 1))
+        return math.sqrt(variancia)
+
+    def faixas(self):
+        if self.n == 0:
+            return []
+        return montar_faixas(list(self.histograma.keys()), list(self.histograma.values()), self.media, self.desvio)
+
+    def para_dict(self):
+        return {'histograma': list(self.histograma.items()), 'n': self.n,
+                'soma': self.soma, 'soma_quadrados': self.soma_quadrados}
+
+    @classmethod
+    def de_dict(cls, d):
+        m = cls()
+        m.histograma = Counter(dict((k, v) for k, v in d['histograma']))
+        m.n, m.soma, m.soma_quadrados = d['n'], d['soma'], d['soma_quadrados']
+        return m
+
+
+def _maior_sequencia(dezenas):
+    maior = atual = 1
+    for a, b in zip(dezenas, dezenas[1:]):
+        atual = atual + 1 if b == a + 1 else 1
+        maior = max(maior, atual)
+    return maior if maior > 1 else 0
+
+
+class AgregadosPainel:
+
+    def __init__(self):
+        self.total = 0
+        self.ultimo_concurso = 0
+        self.frequencia = [0] * UNIVERSO_DEZENAS
+        # (coluna, linha) da 1ª ocorrência na leitura coluna a coluna: desempate do top/bottom 10
+        self.primeira = [None] * UNIVERSO_DEZENAS
+        self.contadores = {nome: Counter() for nome in CONTADORES}
+        self.momentos = {nome: MomentosOnline() for nome in FAIXAS}
+        self.max_rep = {j: Counter() for j in JANELAS}
+        self.recentes = deque(maxlen=max(JANELAS))
+        self._janela = {j: Counter() for j in JANELAS}
+        self.ciclo_id = 1
+        self.ciclo_vistos = 0
+        self.ciclo_inicio = 0
+        self.ultima_aparicao = [-1] * UNIVERSO_DEZENAS
+
+    # --- Atualização ---
+
+    def adicionar(self, concurso, dezenas):
+        """Incorpora o próximo sorteio (em ordem de concurso). O(1)."""
+        d = sorted(int(x) for x in dezenas)     # colunas como na matriz (ordenadas)
+        i = self.total
+
+        for coluna, dezena in enumerate(d):
+            self.frequencia[dezena - 1] += 1
+            if self.primeira[dezena - 1] is None or (coluna, i) < tuple(self.primeira[dezena - 1]):
+                self.primeira[dezena - 1] = (coluna, i)
+
+        c = self.contadores
+        c['pares'][sum(1 for x in d if x % 2 == 0)] += 1
+        c['primos'][sum(_EH_PRIMO[x] for x in d)] += 1
+        c['fibo'][sum(_EH_FIBO[x] for x in d)] += 1
+        c['mult3'][sum(_EH_MULT3[x] for x in d)] += 1
+        c['sequenciais'][_maior_sequencia(d)] += 1
+        c['iniciais'][max(Counter(x // 10 for x in d).values())] += 1
+        c['finais'][max(Counter(x % 10 for x in d).values())] += 1
+        c['linhas'][len({(x - 1) // 10 for x in d})] += 1
+        c['colunas'][len({(x - 1) % 10 for x in d})] += 1
+        quad = [0, 0, 0, 0]
+        for x in d:
+            quad[_QUADRANTE[x]] += 1
+        c['quadrantes']['-'.join(map(str, quad))] += 1
+        if self.recentes:
+            c['repetidas'][len(set(d) & set(self.recentes[-1]))] += 1
+
+        self.momentos['soma'].adicionar(sum(d))
+        self.momentos['deltas'].adicionar(d[-1] - d[0])
+
+        # Janelas móveis: frequência nos W sorteios anteriores
+        for j in JANELAS:
+            janela = self._janela[j]
+            if i >= j:
+                freqs = [janela[x] for x in d]
+                self.momentos[f'temp{j}'].adicionar(sum(freqs))
+                self.max_rep[j][max(freqs)] += 1
+            janela.update(d)
+            if len(self.recentes) >= j:
+                janela.subtract(self.recentes[-j])
+        self.recentes.append(tuple(d))
+
+        # Ciclo: fecha quando as 60 dezenas saíram; o sorteio seguinte abre outro
+        if self.ciclo_vistos == MASCARA_UNIVERSO:
+            self.ciclo_vistos = 0
+            self.ciclo_id += 1
+            self.ciclo_inicio = i
+        self.ciclo_vistos |= mascara_jogo(d)
+
+        for x in d:
+            self.ultima_aparicao[x - 1] = i
+        self.total += 1
+        self.ultimo_concurso = int(concurso)
+
+    @classmethod
+    def reconstruir(cls, m):
+        """Refaz o estado do zero a partir da matriz (Bola1..Bola6 já ordenadas)."""
+        ag = cls()
+        for concurso, dezenas in zip(m.concursos.tolist(), m.dezenas.tolist()):
+            ag.adicionar(concurso, dezenas)
+        return ag
+
+    # --- Painel ---
+
+    def painel(self):
+        """Mesmo dict de estatisticas.calcular_painel (chaves do template index.html)."""
+        total = self.total
+        c = self.contadores
+
+        def dist(nome, total_nome=total):
+            return formatar_distribuicao(list(c[nome].keys()), list(c[nome].values()), total_nome)
+
+        aparecidas = sorted((p[0], p[1], d) for d, p in enumerate(self.primeira, start=1) if p is not None)
+        dezenas = [d for _, _, d in aparecidas]
+        freq_geral, top_10, bottom_10 = (formatar_frequencia_geral(
+            dezenas, [self.frequencia[d - 1] for d in dezenas], total) if total else ([], [], []))
+
+        painel = {
+            'freq_geral': freq_geral,
+            'top_10': top_10,
+            'bottom_10': bottom_10,
+            'stats_pares': formatar_pares_impares(list(c['pares'].keys()), list(c['pares'].values()), total),
+            'stats_soma_dist': self.momentos['soma'].faixas(),
+            'stats_primos': dist('primos'),
+            'stats_fibo': dist('fibo'),
+            'stats_mult3': dist('mult3'),
+            'stats_ini': dist('iniciais'),
+            'stats_fim': dist('finais'),
+            'stats_seq': dist('sequenciais'),
+            'stats_rep_ant': dist('repetidas', total - 1) if total >= 2 else [],
+            'stats_quadrantes': (formatar_quadrantes(list(c['quadrantes'].keys()),
+                                                     list(c['quadrantes'].values()), total) if total else []),
+            'ciclo_atual': (formatar_ciclo(self.ciclo_id, total - self.ciclo_inicio,
+                                           dezenas_mascara(self.ciclo_vistos)) if total else None),
+            'stats_lin_col': {'linhas_ocupadas': dist('linhas'), 'colunas_ocupadas': dist('colunas')},
+            'ranking_atrasos': formatar_atrasos([(total - 1) - u if u >= 0 else total
+                                                 for u in self.ultima_aparicao]),
+            'dist_deltas': self.momentos['deltas'].faixas(),
+        }
+        for j in JANELAS:
+            painel[f'stats_rep_{j}'] = self.momentos[f'temp{j}'].faixas()
+            painel[f'dist_max_{j}'] = (formatar_maximas(j, list(self.max_rep[j].keys()),
+                                                        list(self.max_rep[j].values())) if total >= j else [])
+        return painel
+
+    def verificar(self, m):
+        """Chaves do painel que divergem do cálculo completo (lista vazia = tudo confere)."""
+        esperado = calcular_painel(m)
+        atual = self.painel()
+        return [k for k in esperado if esperado[k] != atual.get(k)]
+
+    # --- Serialização ---
+
+    def para_dict(self):
+        return {
+            'formato': FORMATO,
+            'total': self.total,
+            'ultimo_concurso': self.ultimo_concurso,
+            'frequencia': self.frequencia,
+            'primeira': self.primeira,
+            'contadores': {k: list(v.items()) for k, v in self.contadores.items()},
+            'momentos': {k: v.para_dict() for k, v in self.momentos.items()},
+            'max_rep': {str(j): list(v.items()) for j, v in self.max_rep.items()},
+            'recentes': [list(r) for r in self.recentes],
+            'ciclo': {'id': self.ciclo_id, 'vistos': self.ciclo_vistos, 'inicio': self.ciclo_inicio},
+            'ultima_aparicao': self.ultima_aparicao,
+        }
+
+    @classmethod
+    def de_dict(cls, d):
+        if d.get('formato') != FORMATO:
+            raise ValueError(f"Formato de agregados não suportado: {d.get('formato')}")
+        ag = cls()
+        ag.total, ag.ultimo_concurso = d['total'], d['ultimo_concurso']
+        ag.frequencia = list(d['frequencia'])
+        ag.primeira = [tuple(p) if p is not None else None for p in d['primeira']]
+        ag.contadores = {k: Counter(dict((chave, v) for chave, v in pares)) for k, pares in d['contadores'].items()}
+        ag.momentos = {k: MomentosOnline.de_dict(v) for k, v in d['momentos'].items()}
+        ag.max_rep = {int(j): Counter(dict((k, v) for k, v in pares)) for j, pares in d['max_rep'].items()}
+        ag.recentes.extend(tuple(r) for r in d['recentes'])
+        # As contagens das janelas saem dos sorteios recentes guardados
+        for j in JANELAS:
+            for r in list(ag.recentes)[-j:]:
+                ag._janela[j].update(r)
+        ag.ciclo_id, ag.ciclo_vistos, ag.ciclo_inicio = d['ciclo']['id'], d['ciclo']['vistos'], d['ciclo']['inicio']
+        ag.ultima_aparicao = list(d['ultima_aparicao'])
+        return ag
+
+    def salvar(self, caminho):
+        temporario = caminho + '.tmp'
+        with open(temporario, 'w', encoding='utf-8') as f:
+            json.dump(self.para_dict(), f)
+        os.replace(temporario, caminho)
+
+    @classmethod
+    def carregar(cls, caminho):
+        """Estado salvo, ou None se o arquivo não existir/for inválido."""
+        try:
+            with open(caminho, encoding='utf-8') as f:
+                return cls.de_dict(json.load(f))
+        except (OSError, ValueError, KeyError, TypeError):
+            return None
+
+
+def caminho_agregados(db_path):
+    """megasena_db.sqlite3 -> megasena_db.agregados.json (mesma pasta)."""
+    return os.path.splitext(db_path)[0] + '.agregados.json'
+
+
+def estender(ag, concursos, dezenas):
+    """Acrescenta ao estado os sorteios posteriores ao último já incorporado."""
+    for concurso, jogo in zip(concursos, dezenas):
+        if concurso > ag.ultimo_concurso:
+            ag.adicionar(concurso, jogo)
+    return ag
+
+
+def atualizar_agregados_arquivo(conn, db_path):
+    """
+    Usado pelo coletor: carrega o estado salvo, acrescenta os concursos novos e regrava.
+    Se o arquivo faltar ou não bater com o banco, reconstrói do zero.
+    """
+    cols = ', '.join(f'Bola{i}' for i in range(1, 7))
+    caminho = caminho_agregados(db_path)
+    ag = AgregadosPainel.carregar(caminho)
+    if ag is not None:
+        anteriores = conn.execute(f"SELECT COUNT(*) FROM {TABLE_NAME} WHERE Concurso <= ?",
+                                  (ag.ultimo_concurso,)).fetchone()[0]
+        if anteriores != ag.total:
+            ag = None
+    if ag is None:
+        ag = AgregadosPainel()
+    linhas = conn.execute(f"SELECT Concurso, {cols} FROM {TABLE_NAME} WHERE Concurso > ? ORDER BY Concurso ASC",
+                          (ag.ultimo_concurso,)).fetchall()
+    estender(ag, [r[0] for r in linhas], [r[1:] for r in linhas])
+    ag.salvar(caminho)
+    return ag
+
+
+if __name__ == '__main__':
+    from .historico import obter_matriz
+    padrao = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..', DATABASE_NAME)
+    parser = argparse.ArgumentParser(description='Reconstrói (e opcionalmente confere) os agregados do dashboard.')
+    parser.add_argument('db', nargs='?', default=os.path.normpath(padrao))
+    parser.add_argument('--verificar', action='store_true', help='compara com o cálculo completo do painel')
+    args = parser.parse_args()
+    m = obter_matriz(args.db)
+    ag = AgregadosPainel.reconstruir(m)
+    ag.salvar(caminho_agregados(args.db))
+    print(f"{ag.total} concursos em {caminho_agregados(args.db)}.")
+    if args.verificar:
+        divergentes = ag.verificar(m)
+        print("Confere com o cálculo completo." if not divergentes else f"Divergências: {divergentes}")
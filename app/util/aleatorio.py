@@ -0,0 +1,60 @@
+# app/util/aleatorio.py
+"""
+Fluxos aleatórios reprodutíveis para geração e seleção.
+
+Cada execução tem uma semente (int >= 0). Cada uso tira dela um fluxo independente,
+identificado por uma chave fixa (np.random.SeedSequence com spawn_key):
+    fluxo_numpy(semente, FLUXO_GERACAO)           -> np.random.Generator
+    fluxo_numpy(semente, FLUXO_GERACAO, k)        -> k-ésimo lote de grupos do gerador 'lote'
+    fluxo_python(semente, FLUXO_SELECAO)          -> random.Random (mesma API do módulo random)
+    derivar_semente(semente, FLUXO_CENARIO, cid)  -> semente de um cenário do lote
+A chave depende só do papel e da posição do trabalho (lote de grupos, concurso),
+nunca de quantos processos rodam: com 1 ou N workers saem os mesmos números.
+
+Para amostras sobre conjuntos enumerados (enumerador), chaves_aleatorias dá a cada
+jogo uma chave pseudoaleatória que é função só de (semente, jogo): não importa
+em que bloco ou processo o jogo apareça.
+"""
+import random
+import numpy as np
+
+FLUXO_GERACAO = 1
+FLUXO_SELECAO = 2
+FLUXO_CENARIO = 3
+
+_BITS_SEMENTE = 63
+
+
+def nova_semente():
+    """Semente nova (63 bits, da entropia do sistema), para registrar e repetir a execução."""
+    return int(np.random.SeedSequence().generate_state(1, np.uint64)[0] >> np.uint64(64 - _BITS_SEMENTE))
+
+
+def _sequencia(semente, chaves):
+    return np.random.SeedSequence(int(semente), spawn_key=tuple(int(c) for c in chaves))
+
+
+def fluxo_numpy(semente, *chaves):
+    return np.random.default_rng(_sequencia(semente, chaves))
+
+
+def fluxo_python(semente, *chaves):
+    return random.Random(derivar_semente(semente, *chaves))
+
+
+def derivar_semente(semente, *chaves):
+    """Semente (int de 63 bits) do fluxo 'chaves' da semente."""
+    return int(_sequencia(semente, chaves).generate_state(1, np.uint64)[0] >> np.uint64(64 - _BITS_SEMENTE))
+
+
+def chaves_aleatorias(valores, semente, *chaves):
+    """
+    (M,) uint64 -> (M,) uint64: splitmix64(valor + sal do fluxo). Bijeção em uint64:
+    valores distintos nunca empatam, e a chave não depende da ordem de processamento.
+    """
+    sal = np.uint64(_sequencia(semente, chaves).generate_state(1, np.uint64)[0])
+    with np.errstate(over='ignore'):
+        z = np.asarray(valores, dtype=np.uint64) + sal
+        z = (z ^ (z >> np.uint64(30))) * np.uint64(0xBF58476D1CE4E5B9)
+        z = (z ^ (z >> np.uint64(27))) * np.uint64(0x94D049BB133111EB)
+        return z ^ (z >> np.uint64(31))
@@ -0,0 +1,87 @@
+# app/util/aparicoes.py
+"""
+Índice de aparições por dezena: atraso e Z-Score do atraso em qualquer corte do histórico.
+
+Para cada dezena guarda as linhas em que ela saiu (em ordem) e as somas prefixadas
+dos intervalos entre aparições consecutivas (gap = sorteios sem sair entre duas
+aparições) e dos quadrados desses intervalos. O estado "no corte n" (sorteios
+0..n-1) sai de uma busca binária por dezena:
+    k      = aparições antes de n
+    atraso = (n - 1) - última linha < n          (n se nunca saiu)
+    média  = soma dos k-1 gaps / (k-1)
+    desvio = sqrt(soma dos quadrados/(k-1) - média²)   (populacional, como np.std)
+Montado uma vez na matriz raiz (MatrizSorteios.indice) e consultado por todos os
+recortes: os backtests não reprocessam o histórico a cada corte.
+"""
+import numpy as np
+from .config_mega import UNIVERSO_DEZENAS
+
+
+class IndiceAparicoes:
+    """
+    - posicoes:       (A,) int64 -> linhas de cada aparição, agrupadas por dezena (1..60) e crescentes
+    - inicio:         (61,) -> aparições da dezena d em posicoes[inicio[d-1]:inicio[d]]
+    - soma_gaps:      (A+1,) int64 -> soma acumulada dos gaps (0 na primeira aparição de cada dezena)
+    - soma_quadrados: (A+1,) int64 -> idem com os gaps ao quadrado
+    """
+
+    def __init__(self, m):
+        dezena, posicoes = np.nonzero(m.incidencia.T)  # ordenado por dezena e, dentro dela, por linha
+        self.total = len(m)
+        self.posicoes = posicoes.astype(np.int64)
+        self.inicio = np.searchsorted(dezena, np.arange(UNIVERSO_DEZENAS + 1))
+        # Chave crescente dezena*(N+1) + linha: uma única busca binária atende as 60 dezenas
+        self._chaves = dezena.astype(np.int64) * (self.total + 1) + self.posicoes
+
+        gaps = np.diff(self.posicoes, prepend=0) - 1
+        primeiras = self.inicio[:-1][self.inicio[:-1] < self.inicio[1:]]
+        gaps[primeiras] = 0
+        self.soma_gaps = np.concatenate(([0], np.cumsum(gaps)))
+        self.soma_quadrados = np.concatenate(([0], np.cumsum(gaps * gaps)))
+
+    def _fim(self, n):
+        """(60,) índice em posicoes da primeira aparição de cada dezena na linha >= n."""
+        if not 0 <= n <= self.total:
+            raise ValueError(f"Corte {n} fora do índice (0..{self.total})")
+        return np.searchsorted(self._chaves, np.arange(UNIVERSO_DEZENAS, dtype=np.int64) * (self.total + 1) + n)
+
+    def proximas(self, n):
+        """(60,) int64: linha da primeira aparição de cada dezena a partir de n (-1 se não sai mais)."""
+        fim = self._fim(n)
+        ainda = fim < self.inicio[1:]
+        if not ainda.any():
+            return np.full(UNIVERSO_DEZENAS, -1, dtype=np.int64)
+        return np.where(ainda, self.posicoes[np.minimum(fim, len(self.posicoes) - 1)], -1)
+
+    def atrasos(self, n):
+        """(60,) int64: atraso de cada dezena após os n primeiros sorteios."""
+        fim = self._fim(n)
+        saiu = fim > self.inicio[:-1]
+        ultima = self.posicoes[np.where(saiu, fim - 1, 0)] if len(self.posicoes) else np.zeros(UNIVERSO_DEZENAS, np.int64)
+        return np.where(saiu, (n - 1) - ultima, n)
+
+    def estatisticas(self, n):
+        """
+        Estado no corte n, arrays (60,):
+        atraso (int64), gaps (qtd de intervalos), media e desvio (float64) dos intervalos.
+        media/desvio valem 0 onde há menos de 2 intervalos.
+        """
+        fim = self._fim(n)
+        ini = self.inicio[:-1]
+        saiu = fim > ini
+        atraso = self.atrasos(n)
+        gaps = np.where(saiu, fim - ini - 1, 0)
+        base = np.minimum(ini + 1, fim)
+        s1 = self.soma_gaps[fim] - self.soma_gaps[base]
+        s2 = self.soma_quadrados[fim] - self.soma_quadrados[base]
+        validos = gaps > 1
+        g = np.where(validos, gaps, 1)
+        media = np.where(validos, s1 / g, 0.0)
+        # Variância a partir das somas inteiras (exata até a divisão)
+        desvio = np.where(validos, np.sqrt(np.maximum(g * s2 - s1 * s1, 0) / (g * g)), 0.0)
+        return atraso, gaps, media, desvio
+
+
+def indice_aparicoes(m):
+    """Índice da matriz (montado uma vez na raiz, compartilhado com os recortes)."""
+    return m.indice('aparicoes', IndiceAparicoes)
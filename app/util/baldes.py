@@ -0,0 +1,151 @@
+# app/util/baldes.py
+"""
+Baldes de score com capacidade limitada, alimentados em fluxo.
+
+A seleção final (selecionar_com_diversificacao, no fim deste módulo) só precisa de alguns candidatos por
+vaga em cada meta (s1/p1..s4/p4), não do universo inteiro pontuado. Aqui a geração
+entrega blocos, cada bloco é pontuado e distribuído nos baldes na hora, e cada
+balde guarda no máximo a sua capacidade:
+    metas:       CANDIDATOS_POR_VAGA por vaga (mínimo MINIMO_POR_BALDE)
+    demais notas: a mesma capacidade de um balde com todas as vagas (repescagem)
+A geração para assim que todos os baldes das metas estão cheios: memória O(cotas)
+e tempo proporcional ao que foi pedido.
+"""
+from collections import Counter
+import numpy as np
+from .pontuacao import CRITERIOS, PerfilCompilado, pontuar_mascaras
+from .mascaras import jogos_de_mascaras
+
+CANDIDATOS_POR_VAGA = 50
+MINIMO_POR_BALDE = 500
+LIMITE_REPETICAO = 25
+SCORES_POSSIVEIS = range(len(CRITERIOS) + 1)
+
+
+def capacidades_das_metas(qtd_jogos, metas):
+    """metas [(score, %)] -> {score: capacidade} das notas com vagas."""
+    vagas = Counter()
+    for score, perc in metas:
+        vagas[int(score)] += int(qtd_jogos * (perc / 100))
+    return {s: max(MINIMO_POR_BALDE, v * CANDIDATOS_POR_VAGA) for s, v in vagas.items() if v > 0}
+
+
+class BaldesLimitados:
+    """{score: máscaras} com capacidade por score; os primeiros que chegam ficam (a geração já é aleatória)."""
+
+    def __init__(self, capacidades, capacidade_outros=0):
+        self.capacidades = dict(capacidades)
+        self.capacidade_outros = capacidade_outros
+        self._partes = {}
+        self._qtd = Counter()
+        self.pontuados = 0
+        self.max_score = 0
+
+    @classmethod
+    def das_metas(cls, qtd_jogos, metas):
+        return cls(capacidades_das_metas(qtd_jogos, metas),
+                   max(MINIMO_POR_BALDE, qtd_jogos * CANDIDATOS_POR_VAGA))
+
+    def capacidade(self, score):
+        return self.capacidades.get(score, self.capacidade_outros)
+
+    def cotas(self):
+        """{score: capacidade} de todas as notas possíveis (para o gerador dirigido)."""
+        return {s: self.capacidade(s) for s in SCORES_POSSIVEIS}
+
+    def adicionar(self, mascaras, scores):
+        self.pontuados += len(mascaras)
+        if len(scores):
+            self.max_score = max(self.max_score, int(scores.max()))
+        for s in np.unique(scores).tolist():
+            falta = self.capacidade(s) - self._qtd[s]
+            if falta <= 0:
+                continue
+            novos = mascaras[scores == s][:falta]
+            self._partes.setdefault(s, []).append(novos)
+            self._qtd[s] += len(novos)
+
+    def completos(self):
+        """Todos os baldes das metas cheios?"""
+        return all(self._qtd[s] >= cap for s, cap in self.capacidades.items())
+
+    def baldes(self):
+        """Mesmo formato de agrupar_por_score: {score: array de máscaras}."""
+        return {s: np.concatenate(partes) for s, partes in sorted(self._partes.items())}
+
+
+def encher_baldes(blocos, baldes, perfil, mapa_39, mapa_21):
+    """
+    Pontua os blocos de máscaras em sequência até os baldes das metas encherem. Devolve os baldes.
+    perfil: gabarito ou PerfilCompilado (compilado uma vez para todos os blocos).
+    """
+    compilado = perfil if isinstance(perfil, PerfilCompilado) else PerfilCompilado(perfil, mapa_39, mapa_21)
+    for mascaras in blocos:
+        baldes.adicionar(mascaras, pontuar_mascaras(mascaras, compilado, mapa_39, mapa_21))
+        if baldes.completos():
+            break
+    return baldes
+
+
+def selecionar_com_diversificacao(baldes, metas, qtd_jogos, max_score, mascara_pressao, perc_descarte, rng,
+                                  pular_metas_na_sobra=False):
+    """
+    Seleção final em cascata: para cada meta (score, %) sorteia int(qtd_jogos * %/100)
+    jogos do balde daquele score; o que faltar vem das demais notas, da maior para a menor.
+    - baldes: {score: máscaras} (BaldesLimitados.baldes, agrupar_por_score, universo.sortear)
+    - jogos sem dezena da mascara_pressao são descartados com chance perc_descarte (%)
+    - um jogo só entra se a soma dos usos das suas dezenas ficar abaixo de LIMITE_REPETICAO;
+      se ainda faltar jogo na nota, o filtro é relaxado
+    - rng: random.Random da seleção (fluxo_python(semente, FLUXO_SELECAO)) -> mesma semente, mesmos jogos
+    - pular_metas_na_sobra: na sobra, não volta às notas das metas
+    Devolve até qtd_jogos pares (jogo, score): o jogo em tupla de dezenas e o score do balde de onde saiu.
+    """
+    finalistas = []
+    escolhidos = set()
+    uso_global = Counter()
+
+    def selecionar(nota_alvo, qtd_necessaria):
+        mascaras = baldes.get(nota_alvo)
+        if mascaras is None or len(mascaras) == 0:
+            return []
+        candidatos = list(zip(mascaras.tolist(), map(tuple, jogos_de_mascaras(mascaras).tolist())))
+        rng.shuffle(candidatos)
+        selecionados = []
+
+        # 1a passada: pressão e diversificação
+        for mascara, jogo in candidatos:
+            if len(selecionados) >= qtd_necessaria:
+                break
+            if mascara in escolhidos:
+                continue
+            if perc_descarte > 0 and not mascara & mascara_pressao:
+                if rng.random() * 100 < perc_descarte:
+                    continue
+            if sum(uso_global[d] for d in jogo) < LIMITE_REPETICAO:
+                selecionados.append((jogo, nota_alvo))
+                escolhidos.add(mascara)
+                uso_global.update(jogo)
+
+        # 2a passada: qualquer jogo da nota que ainda não entrou
+        for mascara, jogo in candidatos:
+            if len(selecionados) >= qtd_necessaria:
+                break
+            if mascara not in escolhidos:
+                selecionados.append((jogo, nota_alvo))
+                escolhidos.add(mascara)
+                uso_global.update(jogo)
+        return selecionados
+
+    for score, perc in metas:
+        if qtd_jogos - len(finalistas) <= 0:
+            break
+        finalistas.extend(selecionar(score, int(qtd_jogos * (perc / 100))))
+
+    notas_metas = {s for s, _ in metas}
+    for score in range(max_score, -1, -1):
+        if len(finalistas) >= qtd_jogos:
+            break
+        if pular_metas_na_sobra and score in notas_metas:
+            continue
+        finalistas.extend(selecionar(score, qtd_jogos - len(finalistas)))
+    return finalistas[:qtd_jogos]
@@ -0,0 +1,93 @@
+# app/util/banco.py
+"""
+Camada única de acesso ao SQLite.
+
+- O banco roda em modo WAL: o coletor grava enquanto o servidor continua lendo,
+  sem 'database is locked' (leitores não bloqueiam o escritor e vice-versa).
+  Quem converte é só o caminho de gravação (conexao_escrita): ler nunca altera o arquivo.
+- Leituras usam conexões somente-leitura reaproveitadas dentro da thread: uma por
+  thread e por banco. O sqlite3 mantém o cache de comandos preparados por conexão,
+  então as consultas repetidas de uma requisição não são recompiladas. O servidor
+  fecha as da thread ao fim de cada requisição (fechar_conexoes_thread no teardown),
+  já que o servidor de desenvolvimento do Flask abre uma thread por requisição.
+- Gravações (coletor, features) usam conexao_escrita(), que espera o lock em vez
+  de falhar de imediato.
+"""
+import os
+import sqlite3
+import threading
+from contextlib import contextmanager
+from urllib.request import pathname2url
+
+TIMEOUT_LOCK = 30.0          # segundos esperando um lock antes de desistir
+COMANDOS_EM_CACHE = 128      # comandos preparados mantidos por conexão
+
+_local = threading.local()
+_wal_ativado = set()
+_wal_lock = threading.Lock()
+
+
+def _configurar(conn):
+    conn.execute(f"PRAGMA busy_timeout = {int(TIMEOUT_LOCK * 1000)}")
+    return conn
+
+
+def _ativar_wal(conn, caminho):
+    # journal_mode=WAL fica gravado no arquivo: basta uma vez por processo
+    with _wal_lock:
+        if caminho not in _wal_ativado:
+            conn.execute("PRAGMA journal_mode = WAL")
+            _wal_ativado.add(caminho)
+
+
+def conexao_escrita(db_path):
+    """Conexão nova para gravação. Use com 'with' (commit/rollback) e feche ao final."""
+    caminho = os.path.abspath(db_path)
+    conn = _configurar(sqlite3.connect(caminho, timeout=TIMEOUT_LOCK, cached_statements=COMANDOS_EM_CACHE))
+    conn.execute("PRAGMA synchronous = NORMAL")  # seguro em WAL e bem mais rápido
+    _ativar_wal(conn, caminho)
+    return conn
+
+
+def _abrir_leitura(caminho):
+    uri = f"file:{pathname2url(caminho)}?mode=ro"
+    conn = sqlite3.connect(uri, uri=True, timeout=TIMEOUT_LOCK,
+                           cached_statements=COMANDOS_EM_CACHE)
+    return _configurar(conn)
+
+
+def conexao_leitura(db_path):
+    """
+    Conexão somente-leitura da thread atual para o banco informado (reaproveitada).
+    Não feche: ela pertence ao pool da thread (fechar_conexoes_thread). Cada comando
+    enxerga o último commit do coletor.
+    """
+    caminho = os.path.abspath(db_path)
+    pool = getattr(_local, 'pool', None)
+    if pool is None or _local.pid != os.getpid():
+        # Conexões não atravessam fork: processo filho começa com pool vazio
+        pool = _local.pool = {}
+        _local.pid = os.getpid()
+    conn = pool.get(caminho)
+    if conn is None:
+        conn = pool[caminho] = _abrir_leitura(caminho)
+    return conn
+
+
+def fechar_conexoes_thread():
+    """Fecha as conexões de leitura da thread atual (fim de requisição ou de uma thread de trabalho)."""
+    pool = getattr(_local, 'pool', None) or {}
+    for conn in pool.values():
+        conn.close()
+    pool.clear()
+
+
+@contextmanager
+def transacao(db_path):
+    """Gravação atômica: commit ao sair do bloco, rollback em erro; a conexão é fechada."""
+    conn = conexao_escrita(db_path)
+    try:
+        with conn:
+            yield conn
+    finally:
+        conn.close()
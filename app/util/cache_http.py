@@ -0,0 +1,69 @@
+# app/util/cache_http.py
+"""
+Páginas renderizadas em cache por versão do histórico (último concurso, qtd de linhas).
+
+O HTML de rotas que só dependem do histórico (ex: o dashboard '/') é gerado uma
+vez por versão, junto com a versão comprimida (gzip), o ETag e o Last-Modified.
+Requisições condicionais (If-None-Match / If-Modified-Since) recebem 304.
+Quando o coletor grava um concurso a versão muda e a página é refeita no
+próximo acesso; só a versão mais recente fica guardada.
+"""
+import gzip
+import hashlib
+import threading
+import time
+from flask import Response
+
+NIVEL_GZIP = 6
+TAMANHO_MINIMO_GZIP = 1024
+
+
+class PaginaRenderizada:
+    """HTML pronto de uma versão: corpo, corpo em gzip (opcional), ETag e data."""
+
+    def __init__(self, html, comprimir=True):
+        self.corpo = html.encode('utf-8')
+        self.corpo_gzip = (gzip.compress(self.corpo, NIVEL_GZIP, mtime=0)
+                           if comprimir and len(self.corpo) >= TAMANHO_MINIMO_GZIP else None)
+        self.etag = hashlib.sha1(self.corpo).hexdigest()[:20]
+        self.modificado_em = int(time.time())
+
+    def responder(self, requisicao):
+        """Response (200 ou 304) para a requisição, já com os cabeçalhos de cache."""
+        usar_gzip = self.corpo_gzip is not None and 'gzip' in requisicao.accept_encodings
+        resposta = Response(self.corpo_gzip if usar_gzip else self.corpo, mimetype='text/html')
+        if usar_gzip:
+            resposta.headers['Content-Encoding'] = 'gzip'
+        if self.corpo_gzip is not None:
+            resposta.vary.add('Accept-Encoding')
+        # Cada codificação tem o seu ETag (os bytes são diferentes)
+        resposta.set_etag(self.etag + ('-gz' if usar_gzip else ''))
+        resposta.last_modified = self.modificado_em
+        resposta.cache_control.no_cache = True  # sempre revalida: a página muda a cada concurso
+        return resposta.make_conditional(requisicao)
+
+
+class CachePaginas:
+    """
+    Guarda a página da versão atual. Uso:
+        pagina = cache.obter(versao, lambda: render_template(...))
+        return pagina.responder(request)
+    """
+
+    def __init__(self, comprimir=True):
+        self.comprimir = comprimir
+        self._lock = threading.Lock()
+        self._versao = None
+        self._pagina = None
+
+    def obter(self, versao, renderizar):
+        with self._lock:
+            if self._pagina is None or self._versao != versao:
+                self._pagina = PaginaRenderizada(renderizar(), self.comprimir)
+                self._versao = versao
+            return self._pagina
+
+    def limpar(self):
+        with self._lock:
+            self._versao = None
+            self._pagina = None
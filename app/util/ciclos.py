@@ -0,0 +1,77 @@
+# app/util/ciclos.py
+"""
+Índice de ciclos: estado do ciclo (id, início, dezenas já vistas) após cada sorteio.
+
+Um ciclo começa num sorteio e fecha quando as 60 dezenas já saíram desde o seu
+início; o sorteio seguinte abre o próximo (mesma regra de analisar_ciclos).
+Os limites saem do índice de aparições (app/util/aparicoes.py): o fim do ciclo que
+começa em s é a maior, entre as 60 dezenas, "primeira aparição a partir de s".
+Por sorteio i ficam guardados:
+    ciclo[i]   -> id do ciclo (1, 2, ...)
+    inicio[i]  -> linha em que o ciclo começou
+    vistos[i]  -> máscara de 60 bits das dezenas já sorteadas no ciclo até i
+Estado em qualquer corte = uma leitura na linha n-1. Sorteios novos só refazem o
+ciclo que estava aberto (estender).
+"""
+import numpy as np
+from .mascaras import mascaras_de_jogos, MASCARA_UNIVERSO
+from .aparicoes import indice_aparicoes
+
+
+class IndiceCiclos:
+    """ciclo/inicio/vistos (N,) por sorteio, como descrito no cabeçalho do módulo."""
+
+    def __init__(self, m, anterior=None):
+        n = len(m)
+        self.total = n
+        self.ultimo_concurso = int(m.concursos[-1]) if n else 0
+        self.ciclo = np.empty(n, dtype=np.int32)
+        self.inicio = np.empty(n, dtype=np.int32)
+        self.vistos = np.empty(n, dtype=np.uint64)
+
+        s, ciclo_id = 0, 1
+        if anterior is not None and anterior.total:
+            # Tudo antes do ciclo aberto continua igual
+            s, ciclo_id = anterior._proximo_inicio()
+            self.ciclo[:s] = anterior.ciclo[:s]
+            self.inicio[:s] = anterior.inicio[:s]
+            self.vistos[:s] = anterior.vistos[:s]
+
+        if s < n:
+            mascaras = mascaras_de_jogos(m.dezenas)
+            aparicoes = indice_aparicoes(m)
+            while s < n:
+                proximas = aparicoes.proximas(s)
+                fim = n - 1 if (proximas < 0).any() else int(proximas.max())
+                self.ciclo[s:fim + 1] = ciclo_id
+                self.inicio[s:fim + 1] = s
+                self.vistos[s:fim + 1] = np.bitwise_or.accumulate(mascaras[s:fim + 1])
+                s, ciclo_id = fim + 1, ciclo_id + 1
+
+    def _proximo_inicio(self):
+        """(linha, id) do ciclo aberto; se o último sorteio fechou o ciclo, o próximo começa em total."""
+        ultimo = self.total - 1
+        if int(self.vistos[ultimo]) == MASCARA_UNIVERSO:
+            return self.total, int(self.ciclo[ultimo]) + 1
+        return int(self.inicio[ultimo]), int(self.ciclo[ultimo])
+
+    def estado(self, n):
+        """(id do ciclo, sorteios no ciclo, máscara das dezenas vistas) após os n primeiros sorteios."""
+        if not 1 <= n <= self.total:
+            raise ValueError(f"Corte {n} fora do índice (1..{self.total})")
+        i = n - 1
+        return int(self.ciclo[i]), n - int(self.inicio[i]), int(self.vistos[i])
+
+    def estender(self, m):
+        """
+        Índice para uma matriz que continua esta (mesmos sorteios + novos no fim).
+        Se a matriz não for continuação, reconstrói do zero.
+        """
+        continua = (len(m) >= self.total and
+                    (self.total == 0 or int(m.concursos[self.total - 1]) == self.ultimo_concurso))
+        return IndiceCiclos(m, self if continua else None)
+
+
+def indice_ciclos(m):
+    """Índice da matriz (montado uma vez na raiz, compartilhado com os recortes)."""
+    return m.indice('ciclos', IndiceCiclos)
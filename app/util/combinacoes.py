@@ -0,0 +1,95 @@
+# app/util/combinacoes.py
+"""
+Índice combinatório (combinadic) dos jogos: cada jogo de 6 dezenas <-> um inteiro
+em [0, C(60,6)) = [0, 50.063.860), na ordem lexicográfica (a mesma do enumerador).
+
+    indice(a1 < ... < a6) = C(60,6) - 1 - soma_j C(60 - a_j, 7 - j)
+
+(o complemento do rank colex do jogo espelhado d -> 61 - d). Cabe num uint32:
+4 bytes por jogo, contra ~100+ bytes de uma tupla num set.
+
+ConjuntoJogos é um bitmap de C(60,6) bits (~6 MB): pertinência e deduplicação
+com um teste de bit, tamanho fixo independente de quantos jogos entram.
+"""
+from math import comb
+import numpy as np
+from .config_mega import UNIVERSO_DEZENAS, NUM_DEZENAS_SORTEADAS
+from .mascaras import BITS_DEZENAS, jogos_de_mascaras
+
+TOTAL_COMBINACOES = comb(UNIVERSO_DEZENAS, NUM_DEZENAS_SORTEADAS)
+
+# _BINOMIAL[k, n] = C(n, k) para k = 0..6, n = 0..60
+_BINOMIAL = np.array([[comb(n, k) for n in range(UNIVERSO_DEZENAS + 1)]
+                      for k in range(NUM_DEZENAS_SORTEADAS + 1)], dtype=np.int64)
+
+
+def indices_de_jogos(jogos):
+    """(M,6) dezenas em ordem crescente -> (M,) uint32."""
+    jogos = np.asarray(jogos, dtype=np.int64).reshape(-1, NUM_DEZENAS_SORTEADAS)
+    k = np.arange(NUM_DEZENAS_SORTEADAS, 0, -1)                     # 6, 5, ..., 1
+    soma = _BINOMIAL[k, UNIVERSO_DEZENAS - jogos].sum(axis=1)
+    return (TOTAL_COMBINACOES - 1 - soma).astype(np.uint32)
+
+
+def indices_de_mascaras(mascaras):
+    """(M,) uint64 de máscaras com 6 bits acesos -> (M,) uint32."""
+    return indices_de_jogos(jogos_de_mascaras(mascaras))
+
+
+def jogos_de_indices(indices):
+    """(M,) índices -> (M,6) uint8 dezenas em ordem crescente."""
+    resto = TOTAL_COMBINACOES - 1 - np.asarray(indices, dtype=np.int64)
+    jogos = np.empty((len(resto), NUM_DEZENAS_SORTEADAS), dtype=np.uint8)
+    for j in range(NUM_DEZENAS_SORTEADAS):
+        k = NUM_DEZENAS_SORTEADAS - j
+        # Maior x com C(x, k) <= resto; a dezena é 60 - x
+        x = np.searchsorted(_BINOMIAL[k], resto, side='right') - 1
+        jogos[:, j] = UNIVERSO_DEZENAS - x
+        resto = resto - _BINOMIAL[k, x]
+    return jogos
+
+
+def mascaras_de_indices(indices):
+    """(M,) índices -> (M,) uint64 máscaras."""
+    jogos = jogos_de_indices(indices).astype(np.intp)
+    return np.bitwise_or.reduce(BITS_DEZENAS[jogos - 1], axis=1) if len(jogos) else np.empty(0, dtype=np.uint64)
+
+
+class ConjuntoJogos:
+    """Conjunto de jogos como bitmap de TOTAL_COMBINACOES bits (bit i aceso = índice i presente)."""
+
+    def __init__(self):
+        self.bits = np.zeros((TOTAL_COMBINACOES + 7) // 8, dtype=np.uint8)
+        self.tamanho = 0
+
+    def __len__(self):
+        return self.tamanho
+
+    def contem(self, indices):
+        """(M,) bool: quais índices já estão no conjunto."""
+        indices = np.asarray(indices, dtype=np.int64)
+        return (self.bits[indices >> 3] >> (indices & 7).astype(np.uint8) & 1).astype(bool)
+
+    def adicionar(self, indices, limite=None):
+        """
+        Acende os índices. Retorna (M,) bool: True nos que entraram agora
+        (ausentes antes e primeira ocorrência dentro do próprio array).
+        limite: só os 'limite' primeiros novos (na ordem do array) entram.
+        """
+        indices = np.asarray(indices, dtype=np.int64)
+        novos = ~self.contem(indices)
+        _, primeira = np.unique(indices, return_index=True)
+        unicos = np.zeros(len(indices), dtype=bool)
+        unicos[primeira] = True
+        novos &= unicos
+        if limite is not None:
+            novos[np.flatnonzero(novos)[limite:]] = False
+        entram = indices[novos]
+        np.bitwise_or.at(self.bits, entram >> 3, np.left_shift(1, entram & 7).astype(np.uint8))
+        self.tamanho += len(entram)
+        return novos
+
+    def indices(self):
+        """Índices presentes, em ordem crescente (uint32)."""
+        bits = np.unpackbits(self.bits, bitorder='little')[:TOTAL_COMBINACOES]
+        return np.flatnonzero(bits).astype(np.uint32)
@@ -0,0 +1,404 @@
+# app/util/cubo.py
+"""
+Cubo de features estáticas de todas as C(60,6) combinações e score do universo inteiro por concurso.
+
+Soma, deltas, pares, primos, mult3, linhas, colunas, quadrantes e sequenciais só
+dependem das dezenas: são calculados uma vez, para os 50.063.860 jogos, e gravados
+em colunas num arquivo ao lado do banco (megasena_db.cubo.bin, ~800 MB), na ordem
+do índice combinatório (app/util/combinacoes.py). Temp39/21 e max_rep dependem do
+histórico: a cada concurso novo, o job soma esses termos às colunas do cubo e grava
+o score (uint8) de todos os jogos (megasena_db.universo.<assinatura>.bin). /teste-preditivo
+com gerador=exaustivo (METODO_UNIVERSO) sorteia direto dos baldes exatos de score, sem
+gerar nem pontuar nada por requisição. É a versão exata da amostra uniforme do
+enumerador: os modelos F4/F5 do 'lote' são esquemas de amostragem, não filtros, e
+não se aplicam aqui.
+
+Layout (little-endian), lido com np.memmap:
+    cubo.bin      cabeçalho 64 bytes | colunas de COLUNAS_CUBO, uma após a outra, TOTAL_COMBINACOES linhas
+    universo.bin  cabeçalho 64 bytes | contagens (16,) uint32 (jogos válidos por score)
+                  | ordem (qtd_validos,) uint32 (índices agrupados por score crescente)
+                  | scores (TOTAL_COMBINACOES,) uint8 (INVALIDO = fora de validar_jogo_rigid)
+O cabeçalho do universo guarda a assinatura do perfil usado (gabarito, mapas de
+calor e último sorteio): quem lê só usa o arquivo se a assinatura bater com o
+perfil atual; senão volta para a geração por amostragem. A assinatura também vai no
+nome do arquivo: cada concurso grava um arquivo novo em vez de substituir o que o
+servidor pode estar com mapeado (no Windows a troca falharia), e as versões antigas
+são apagadas quando ninguém mais as usa.
+
+Gerar/atualizar manualmente:  python -m app.util.cubo [caminho_do_banco] [--refazer-cubo] [--se-desatualizado]
+(o cubo é gerado na primeira vez, ~1-2 min; o universo leva ~35 s por concurso).
+O job é opcional: só roda sozinho com MEGASENA_UNIVERSO=1 (coletor) ou
+run_update_and_serve.py --universo, sempre em segundo plano (atualizar_em_segundo_plano),
+e um arquivo de trava impede duas execuções simultâneas. Sem o universo em dia, o
+gerador exaustivo segue com a geração em fluxo (encher_baldes).
+"""
+import argparse
+import glob
+import hashlib
+import json
+import os
+import subprocess
+import sys
+import threading
+import time
+import numpy as np
+from .config_mega import DATABASE_NAME, UNIVERSO_DEZENAS, NUM_DEZENAS_SORTEADAS
+from .combinacoes import TOTAL_COMBINACOES, jogos_de_indices, mascaras_de_indices
+from .mascaras import mascaras_de_jogos, contar_pares_sequenciais, popcount
+from .pontuacao import CRITERIOS, CRITERIOS_ESTATICOS, PerfilCompilado, metricas_estaticas, criterios_de_metricas
+from .aleatorio import FLUXO_GERACAO, fluxo_numpy
+from .analise_preditiva import montar_gabarito
+from .perfis import perfil_preditivo
+from .historico import obter_matriz
+
+MAGICA_CUBO = b'MSCUBO01'
+MAGICA_UNIVERSO = b'MSUNIV01'
+VERSAO_FORMATO = 1
+CABECALHO = np.dtype([
+    ('magica', 'S8'),
+    ('versao', '<u4'),
+    ('total', '<u4'),
+    ('ultimo_concurso', '<u4'),
+    ('qtd_validos', '<u4'),
+    ('assinatura', 'S16'),
+    ('reservado', 'S24'),
+])
+assert CABECALHO.itemsize == 64
+
+# (nome, dtype, largura): dezenas para os termos dinâmicos, sequenciais para validar_jogo_rigid
+COLUNAS_CUBO = [('dezenas', '<u1', NUM_DEZENAS_SORTEADAS)] + [
+    (c, '<u2' if c in ('soma', 'quadrantes') else '<u1', 1) for c in CRITERIOS_ESTATICOS] + [
+    ('sequenciais', '<u1', 1)]
+
+QTD_CONTAGENS = 16
+INVALIDO = 255
+LINHAS_POR_BLOCO = 1 << 21
+
+VARIAVEL_ATIVACAO = 'MEGASENA_UNIVERSO'
+TRAVA_EXPIRA_SEGUNDOS = 3600      # trava mais velha que isso é de um job que morreu
+
+# Único gerador de /teste-preditivo que o universo pontuado substitui (uniforme, sem modelo F4/F5)
+METODO_UNIVERSO = 'exaustivo'
+
+# Mesmo perfil de /teste-preditivo (extrair_perfil_alvo_completo com 15 padrões de quadrante)
+TOP_N_QUADRANTES_PREDITIVO = 15
+
+
+def caminho_cubo(db_path):
+    """megasena_db.sqlite3 -> megasena_db.cubo.bin (mesma pasta)."""
+    return os.path.splitext(db_path)[0] + '.cubo.bin'
+
+
+def _prefixo_universo(db_path):
+    return os.path.splitext(db_path)[0] + '.universo'
+
+
+def caminho_universo(db_path, assinatura):
+    """megasena_db.sqlite3 -> megasena_db.universo.<assinatura>.bin (mesma pasta)."""
+    return f"{_prefixo_universo(db_path)}.{assinatura}.bin"
+
+
+def _remover_universos_antigos(db_path, manter):
+    """Apaga os universos de outras assinaturas; os ainda mapeados (Windows) ficam para a próxima vez."""
+    for caminho in glob.glob(glob.escape(_prefixo_universo(db_path)) + '.*.bin'):
+        if os.path.abspath(caminho) == os.path.abspath(manter):
+            continue
+        try:
+            os.remove(caminho)
+        except OSError:
+            pass
+
+
+def _cabecalho(magica, **campos):
+    cab = np.zeros(1, dtype=CABECALHO)
+    cab['magica'] = magica
+    cab['versao'] = VERSAO_FORMATO
+    cab['total'] = TOTAL_COMBINACOES
+    for nome, valor in campos.items():
+        cab[nome] = valor
+    return cab
+
+
+def ler_cabecalho(caminho, magica):
+    """Cabeçalho como dict, ou None se o arquivo não existir/for de outro tipo ou versão."""
+    try:
+        cab = np.fromfile(caminho, dtype=CABECALHO, count=1)
+    except (OSError, ValueError):
+        return None
+    if (len(cab) != 1 or cab['magica'][0] != magica or int(cab['versao'][0]) != VERSAO_FORMATO
+            or int(cab['total'][0]) != TOTAL_COMBINACOES):
+        return None
+    dados = {nome: int(cab[nome][0]) for nome in ('total', 'ultimo_concurso', 'qtd_validos')}
+    dados['assinatura'] = cab['assinatura'][0].decode('ascii')
+    return dados
+
+
+def _colunas(buf, inicio=CABECALHO.itemsize):
+    """Views das colunas do cubo sobre o buffer (arquivo mapeado)."""
+    colunas = {}
+    for nome, dtype, largura in COLUNAS_CUBO:
+        tamanho = np.dtype(dtype).itemsize * largura * TOTAL_COMBINACOES
+        coluna = buf[inicio:inicio + tamanho].view(dtype)
+        colunas[nome] = coluna.reshape(TOTAL_COMBINACOES, largura) if largura > 1 else coluna
+        inicio += tamanho
+    return colunas, inicio
+
+
+def _tamanho_cubo():
+    return CABECALHO.itemsize + sum(np.dtype(d).itemsize * l for _, d, l in COLUNAS_CUBO) * TOTAL_COMBINACOES
+
+
+# --- Cubo (uma vez) ---
+
+def gerar_cubo(caminho, linhas_por_bloco=LINHAS_POR_BLOCO):
+    """Calcula as features estáticas de todas as combinações e grava o cubo (temporário + os.replace)."""
+    temporario = caminho + '.tmp'
+    with open(temporario, 'wb') as f:
+        f.write(_cabecalho(MAGICA_CUBO).tobytes())
+        f.truncate(_tamanho_cubo())
+    buf = np.memmap(temporario, dtype=np.uint8, mode='r+')
+    colunas, _ = _colunas(buf)
+    for ini in range(0, TOTAL_COMBINACOES, linhas_por_bloco):
+        fim = min(ini + linhas_por_bloco, TOTAL_COMBINACOES)
+        jogos = jogos_de_indices(np.arange(ini, fim))
+        colunas['dezenas'][ini:fim] = jogos
+        for criterio, valores in metricas_estaticas(jogos).items():
+            colunas[criterio][ini:fim] = valores
+        colunas['sequenciais'][ini:fim] = contar_pares_sequenciais(mascaras_de_jogos(jogos))
+    buf.flush()
+    del colunas, buf
+    os.replace(temporario, caminho)
+    return TOTAL_COMBINACOES
+
+
+def abrir_cubo(caminho):
+    """Colunas do cubo mapeadas em memória (somente leitura), ou None."""
+    if ler_cabecalho(caminho, MAGICA_CUBO) is None or os.path.getsize(caminho) != _tamanho_cubo():
+        return None
+    colunas, _ = _colunas(np.asarray(np.memmap(caminho, dtype=np.uint8, mode='r')))
+    return colunas
+
+
+# --- Universo pontuado (a cada concurso) ---
+
+def assinatura_perfil(gabarito, mapa_39, mapa_21, ultimo_sorteio):
+    """Hash curto de tudo que muda o score de um jogo (16 caracteres hex)."""
+    dados = [gabarito, sorted(mapa_39.items()), sorted(mapa_21.items()), sorted(ultimo_sorteio)]
+    return hashlib.sha1(json.dumps(dados, sort_keys=True, default=str).encode('utf-8')).hexdigest()[:16]
+
+
+def pontuar_universo(colunas, compilado, ultimo_sorteio, linhas_por_bloco=LINHAS_POR_BLOCO):
+    """(TOTAL_COMBINACOES,) uint8: score de cada jogo, INVALIDO onde validar_jogo_rigid recusa."""
+    no_ultimo = np.zeros(UNIVERSO_DEZENAS + 1, dtype=np.uint8)
+    no_ultimo[list(ultimo_sorteio)] = 1
+    scores = np.empty(TOTAL_COMBINACOES, dtype=np.uint8)
+    for ini in range(0, TOTAL_COMBINACOES, linhas_por_bloco):
+        fim = min(ini + linhas_por_bloco, TOTAL_COMBINACOES)
+        jogos = colunas['dezenas'][ini:fim].astype(np.intp)
+        metricas = {c: colunas[c][ini:fim] for c in CRITERIOS_ESTATICOS}
+        metricas.update(compilado.metricas_dinamicas(jogos))
+        bloco = popcount(criterios_de_metricas(metricas, compilado).astype(np.uint64)).astype(np.uint8)
+        validos = (no_ultimo[jogos].sum(axis=1) <= 1) & (colunas['sequenciais'][ini:fim] <= 1)
+        bloco[~validos] = INVALIDO
+        scores[ini:fim] = bloco
+    return scores
+
+
+def gravar_universo(caminho, scores, ultimo_concurso, assinatura):
+    """Grava contagens, índices agrupados por score e scores (temporário + os.replace)."""
+    contagens = np.bincount(scores, minlength=INVALIDO + 1)
+    qtd_validos = TOTAL_COMBINACOES - int(contagens[INVALIDO])
+    ordem = np.argsort(scores, kind='stable')[:qtd_validos].astype('<u4')    # INVALIDO fica no fim
+    por_score = np.zeros(QTD_CONTAGENS, dtype='<u4')
+    por_score[:len(CRITERIOS) + 1] = contagens[:len(CRITERIOS) + 1]
+
+    cab = _cabecalho(MAGICA_UNIVERSO, ultimo_concurso=ultimo_concurso, qtd_validos=qtd_validos,
+                     assinatura=assinatura.encode('ascii'))
+    temporario = caminho + '.tmp'
+    with open(temporario, 'wb') as f:
+        for parte in (cab, por_score, ordem, scores):
+            f.write(parte.tobytes())
+    # Nome novo por assinatura: só falha (Windows) se regravar a mesma assinatura com o
+    # arquivo mapeado pelo servidor; _executar trata o OSError
+    os.replace(temporario, caminho)
+    return qtd_validos
+
+
+class UniversoPontuado:
+    """
+    Universo pontuado de um concurso, mapeado do arquivo (somente leitura).
+    - contagens[s]: jogos válidos com score s
+    - ordem:        índices combinatórios, agrupados por score (crescente dentro do score)
+    - scores:       score de cada índice (INVALIDO = fora das regras rígidas)
+    """
+
+    def __init__(self, cabecalho, contagens, ordem, scores):
+        self.cabecalho = cabecalho
+        self.assinatura = cabecalho['assinatura']
+        self.contagens = contagens.astype(np.int64)
+        self.inicio = np.concatenate(([0], np.cumsum(self.contagens)))
+        self.ordem = ordem
+        self.scores = scores
+
+    @property
+    def max_score(self):
+        com_jogos = np.flatnonzero(self.contagens)
+        return int(com_jogos[-1]) if len(com_jogos) else 0
+
+    def balde(self, score):
+        """Índices combinatórios de todos os jogos válidos com o score."""
+        if not 0 <= score < len(self.contagens):
+            return self.ordem[:0]
+        return self.ordem[self.inicio[score]:self.inicio[score + 1]]
+
+    def sortear(self, cotas, semente):
+        """
+        cotas {score: quantidade} -> baldes {score: máscaras} no formato de agrupar_por_score:
+        amostra uniforme, sem reposição, de cada balde exato (fluxo FLUXO_GERACAO da semente).
+        """
+        rng = fluxo_numpy(semente, FLUXO_GERACAO)
+        baldes = {}
+        for score in sorted(cotas):
+            balde = self.balde(int(score))
+            qtd = min(int(cotas[score]), len(balde))
+            if qtd > 0:
+                baldes[int(score)] = mascaras_de_indices(balde[rng.choice(len(balde), qtd, replace=False)])
+        return baldes
+
+
+def abrir_universo(caminho):
+    """UniversoPontuado do arquivo, ou None se não existir/for inválido."""
+    cab = ler_cabecalho(caminho, MAGICA_UNIVERSO)
+    if cab is None:
+        return None
+    inicio_ordem = CABECALHO.itemsize + 4 * QTD_CONTAGENS
+    inicio_scores = inicio_ordem + 4 * cab['qtd_validos']
+    if os.path.getsize(caminho) != inicio_scores + TOTAL_COMBINACOES:
+        return None
+    buf = np.asarray(np.memmap(caminho, dtype=np.uint8, mode='r'))
+    contagens = buf[CABECALHO.itemsize:inicio_ordem].view('<u4')
+    return UniversoPontuado(cab, contagens[:len(CRITERIOS) + 1], buf[inicio_ordem:inicio_scores].view('<u4'),
+                            buf[inicio_scores:])
+
+
+_abertos = {}
+_abertos_lock = threading.Lock()
+
+
+def universo_do_perfil(db_path, assinatura):
+    """
+    Universo pontuado ao lado do banco se ele foi gerado para este perfil (mesma assinatura), senão None.
+    O arquivo mapeado é reaproveitado entre requisições enquanto não for regravado (mtime/tamanho);
+    os de outras assinaturas saem do cache, liberando o arquivo para o job apagar.
+    """
+    caminho = caminho_universo(os.path.abspath(db_path), assinatura)
+    try:
+        estado = os.stat(caminho)
+    except OSError:
+        estado = None
+    with _abertos_lock:
+        for antigo in [c for c in _abertos if c != caminho]:
+            del _abertos[antigo]
+        if estado is None:
+            _abertos.pop(caminho, None)
+            return None
+        versao = (estado.st_mtime_ns, estado.st_size)
+        aberto = _abertos.get(caminho)
+        if aberto is None or aberto[0] != versao:
+            aberto = _abertos[caminho] = (versao, abrir_universo(caminho))
+    universo = aberto[1]
+    return universo if universo is not None and universo.assinatura == assinatura else None
+
+
+def _perfil_atual(db_path):
+    """(concurso, gabarito, mapa_39, mapa_21, ultimo_sorteio) do perfil de /teste-preditivo para o histórico atual."""
+    m = obter_matriz(db_path)
+    predicao = perfil_preditivo(m, db_path)
+    gabarito = montar_gabarito(predicao, TOP_N_QUADRANTES_PREDITIVO)
+    return int(m.concursos[-1]), gabarito, predicao['mapa_39'], predicao['mapa_21'], predicao['ultimo_sorteio']
+
+
+def universo_em_dia(db_path):
+    """True se o universo pontuado existe e foi gerado para o perfil atual."""
+    concurso, gabarito, mapa_39, mapa_21, ultimo_sorteio = _perfil_atual(db_path)
+    assinatura = assinatura_perfil(gabarito, mapa_39, mapa_21, ultimo_sorteio)
+    cab = ler_cabecalho(caminho_universo(db_path, assinatura), MAGICA_UNIVERSO)
+    return cab is not None and cab['assinatura'] == assinatura
+
+
+def atualizar_universo(db_path):
+    """
+    Job por concurso: pontua o universo inteiro para o perfil atual, grava o arquivo da
+    assinatura e apaga os antigos. Retorna o cabeçalho gravado, ou None se o cubo ainda não foi gerado.
+    """
+    colunas = abrir_cubo(caminho_cubo(db_path))
+    if colunas is None:
+        return None
+    concurso, gabarito, mapa_39, mapa_21, ultimo_sorteio = _perfil_atual(db_path)
+    scores = pontuar_universo(colunas, PerfilCompilado(gabarito, mapa_39, mapa_21), ultimo_sorteio)
+    assinatura = assinatura_perfil(gabarito, mapa_39, mapa_21, ultimo_sorteio)
+    caminho = caminho_universo(db_path, assinatura)
+    gravar_universo(caminho, scores, concurso, assinatura)
+    _remover_universos_antigos(db_path, caminho)
+    return ler_cabecalho(caminho, MAGICA_UNIVERSO)
+
+
+def universo_ativado():
+    """O job do universo roda sozinho (coletor/launcher) só com MEGASENA_UNIVERSO=1."""
+    return os.environ.get(VARIAVEL_ATIVACAO, '').strip().lower() in ('1', 'true', 'sim')
+
+
+def atualizar_em_segundo_plano(db_path):
+    """Dispara 'python -m app.util.cubo <db> --se-desatualizado' num processo separado, sem esperar."""
+    raiz = os.path.normpath(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..'))
+    return subprocess.Popen([sys.executable, '-m', 'app.util.cubo', os.path.abspath(db_path), '--se-desatualizado'],
+                            cwd=raiz)
+
+
+def _travar(caminho):
+    """Cria o arquivo de trava; False se outro job estiver rodando (trava recente)."""
+    try:
+        if time.time() - os.path.getmtime(caminho) > TRAVA_EXPIRA_SEGUNDOS:
+            os.remove(caminho)
+    except OSError:
+        pass
+    try:
+        os.close(os.open(caminho, os.O_CREAT | os.O_EXCL | os.O_WRONLY))
+        return True
+    except FileExistsError:
+        return False
+
+
+def _executar(args):
+    if args.refazer_cubo or abrir_cubo(caminho_cubo(args.db)) is None:
+        print(f"Gerando cubo de features em {caminho_cubo(args.db)} ...")
+        gerar_cubo(caminho_cubo(args.db))
+    if args.se_desatualizado and universo_em_dia(args.db):
+        print("Universo pontuado em dia para o perfil atual.")
+        return
+    try:
+        cab = atualizar_universo(args.db)
+    except OSError as erro:
+        # Ex.: Windows, mesma assinatura regravada com o arquivo mapeado pelo servidor
+        print(f"Não foi possível gravar o universo pontuado: {erro}")
+        raise SystemExit(1)
+    print(f"Universo do concurso {cab['ultimo_concurso']}: {cab['qtd_validos']} jogos válidos "
+          f"em {caminho_universo(args.db, cab['assinatura'])}.")
+
+
+if __name__ == '__main__':
+    padrao = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..', DATABASE_NAME)
+    parser = argparse.ArgumentParser(description='Gera o cubo de features e o universo pontuado do concurso atual.')
+    parser.add_argument('db', nargs='?', default=os.path.normpath(padrao))
+    parser.add_argument('--refazer-cubo', action='store_true', help='regera o cubo mesmo se ele já existir')
+    parser.add_argument('--se-desatualizado', action='store_true',
+                        help='só pontua o universo se ele não existir ou não bater com o perfil atual')
+    args = parser.parse_args()
+    trava = _prefixo_universo(args.db) + '.trava'
+    if not _travar(trava):
+        print(f"Outro job do universo em andamento ({trava}).")
+        raise SystemExit(0)
+    try:
+        _executar(args)
+    finally:
+        os.remove(trava)
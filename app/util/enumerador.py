@@ -0,0 +1,155 @@
+# app/util/enumerador.py
+"""
+Enumeração exaustiva das C(60,6) = 50.063.860 combinações, em ordem lexicográfica,
+em blocos de máscaras uint64 (app/util/mascaras.py).
+
+Cada jogo = prefixo (3 menores dezenas) + sufixo (3 maiores). Os sufixos possíveis
+são as C(60,3) combinações de 3 dezenas, em ordem lexicográfica: os que começam
+depois da última dezena do prefixo formam o final dessa lista. Um bloco é um
+trecho de prefixos consecutivos expandido de uma vez (np.repeat + OR com os sufixos).
+
+- Poda: prefixos que já violam as regras rígidas (mais de 1 repetida do último
+  sorteio, mais de 1 par sequencial) ou as dezenas fixas/excluídas descartam a
+  subárvore inteira (até 29.260 jogos) sem gerá-la.
+- Memória constante: blocos de até 'tamanho_bloco' jogos.
+- Partes: o espaço de índices (posição lexicográfica 0..C(60,6)-1, o mesmo índice
+  de app/util/combinacoes.py) é dividido em 'partes' faixas contíguas de tamanho
+  parecido; cada processo enumera a sua.
+"""
+import itertools
+from concurrent.futures import ProcessPoolExecutor
+from math import comb
+import numpy as np
+from .config_mega import UNIVERSO_DEZENAS, NUM_DEZENAS_SORTEADAS
+from .combinacoes import TOTAL_COMBINACOES
+from .aleatorio import FLUXO_GERACAO, nova_semente, chaves_aleatorias
+from .mascaras import mascara_jogo, mascaras_de_jogos, popcount, contar_acertos, contar_pares_sequenciais
+
+TAMANHO_BLOCO = 1 << 20
+TAMANHO_PREFIXO = 3
+TAMANHO_SUFIXO = NUM_DEZENAS_SORTEADAS - TAMANHO_PREFIXO
+
+# Todas as combinações de 3 dezenas, em ordem lexicográfica (servem de prefixo e de sufixo)
+_TRIOS = np.array(list(itertools.combinations(range(1, UNIVERSO_DEZENAS + 1), TAMANHO_PREFIXO)), dtype=np.uint8)
+_MASCARAS_TRIOS = mascaras_de_jogos(np.pad(_TRIOS, ((0, 0), (0, 3)), mode='edge'))
+# Sufixos cuja menor dezena é >= d: _MASCARAS_TRIOS[_INICIO_SUFIXO[d]:]
+_INICIO_SUFIXO = np.searchsorted(_TRIOS[:, 0], np.arange(UNIVERSO_DEZENAS + 2))
+
+# Prefixos que ainda deixam 3 dezenas maiores; quantos jogos cada um gera e a
+# posição lexicográfica do seu primeiro jogo
+_PREFIXOS = np.flatnonzero(_TRIOS[:, 2] <= UNIVERSO_DEZENAS - TAMANHO_SUFIXO)
+_QTD_POR_PREFIXO = np.array([comb(UNIVERSO_DEZENAS - int(c), TAMANHO_SUFIXO) for c in _TRIOS[_PREFIXOS, 2]],
+                            dtype=np.int64)
+_POSICAO_PREFIXO = np.concatenate(([0], np.cumsum(_QTD_POR_PREFIXO)[:-1]))
+
+
+def faixa_da_parte(parte, partes):
+    """[ini, fim) das posições lexicográficas da parte (faixas contíguas, cortadas em limites de prefixo)."""
+    if not 0 <= parte < partes:
+        raise ValueError(f"Parte {parte} fora de 0..{partes - 1}")
+    limites = np.searchsorted(_POSICAO_PREFIXO, [TOTAL_COMBINACOES * parte // partes,
+                                                  TOTAL_COMBINACOES * (parte + 1) // partes])
+    ini, fim = (int(_POSICAO_PREFIXO[i]) if i < len(_PREFIXOS) else TOTAL_COMBINACOES for i in limites)
+    return ini, fim
+
+
+def _prefixos_viaveis(prefixos, mascara_ultimo, fixas, excluidas):
+    """Poda: prefixos cuja subárvore ainda pode ter jogos válidos."""
+    m = _MASCARAS_TRIOS[prefixos]
+    ok = np.ones(len(prefixos), dtype=bool)
+    if mascara_ultimo is not None:
+        ok &= (contar_acertos(m, mascara_ultimo) <= 1) & (contar_pares_sequenciais(m) <= 1)
+    if excluidas:
+        ok &= (m & np.uint64(excluidas)) == 0
+    if fixas:
+        # As dezenas que ainda faltam viriam depois do prefixo: as fixas menores que a
+        # última dezena do prefixo já têm que estar nele; e cabem no máximo 3
+        ate_ultima = (np.uint64(1) << _TRIOS[prefixos, 2].astype(np.uint64)) - np.uint64(1)
+        faltam = np.uint64(fixas) & ~m
+        ok &= (faltam & ate_ultima) == 0
+        ok &= popcount(faltam) <= TAMANHO_SUFIXO
+    return prefixos[ok]
+
+
+def enumerar_jogos(ultimo_sorteio=None, fixas=(), excluidas=(), parte=0, partes=1, tamanho_bloco=TAMANHO_BLOCO):
+    """
+    Gera blocos (arrays uint64 de máscaras) com os jogos da parte, em ordem lexicográfica.
+    ultimo_sorteio: aplica as regras de validar_jogo_rigid (None = sem regras).
+    fixas / excluidas: dezenas obrigatórias / proibidas.
+    """
+    mascara_ultimo = np.uint64(mascara_jogo(ultimo_sorteio)) if ultimo_sorteio is not None else None
+    mascara_fixas = mascara_jogo(fixas)
+    mascara_excluidas = mascara_jogo(excluidas)
+
+    ini, fim = faixa_da_parte(parte, partes)
+    selecionados = (_POSICAO_PREFIXO >= ini) & (_POSICAO_PREFIXO < fim)
+    prefixos = _prefixos_viaveis(_PREFIXOS[selecionados], mascara_ultimo, mascara_fixas, mascara_excluidas)
+    qtd = _QTD_POR_PREFIXO[np.searchsorted(_PREFIXOS, prefixos)]
+
+    # Blocos de prefixos consecutivos com até tamanho_bloco jogos (ao menos 1 prefixo)
+    acumulado = np.cumsum(qtd)
+    i = 0
+    while i < len(prefixos):
+        base = acumulado[i - 1] if i else 0
+        j = max(int(np.searchsorted(acumulado, base + tamanho_bloco, side='right')), i + 1)
+        bloco = _expandir(prefixos[i:j], qtd[i:j])
+        i = j
+
+        validos = np.ones(len(bloco), dtype=bool)
+        if mascara_ultimo is not None:
+            validos &= (contar_acertos(bloco, mascara_ultimo) <= 1) & (contar_pares_sequenciais(bloco) <= 1)
+        if mascara_fixas:
+            validos &= (bloco & np.uint64(mascara_fixas)) == np.uint64(mascara_fixas)
+        if mascara_excluidas:
+            validos &= (bloco & np.uint64(mascara_excluidas)) == 0
+        if validos.any():
+            yield bloco[validos]
+
+
+def _expandir(prefixos, qtd):
+    """Todos os jogos dos prefixos (em ordem lexicográfica): prefixo | cada sufixo posterior."""
+    linha = np.repeat(np.arange(len(prefixos)), qtd)
+    local = np.arange(int(qtd.sum())) - np.repeat(np.cumsum(qtd) - qtd, qtd)
+    sufixo = _INICIO_SUFIXO[_TRIOS[prefixos, 2].astype(np.intp) + 1][linha] + local
+    return _MASCARAS_TRIOS[prefixos][linha] | _MASCARAS_TRIOS[sufixo]
+
+
+def _amostra_parte(args):
+    """Jogos da parte com as 'qtd' menores chaves aleatórias: amostra uniforme sem reposição (k-menores)."""
+    qtd, ultimo_sorteio, fixas, excluidas, parte, partes, semente = args
+    chaves = np.empty(0, dtype=np.uint64)
+    jogos = np.empty(0, dtype=np.uint64)
+    for bloco in enumerar_jogos(ultimo_sorteio, fixas, excluidas, parte, partes):
+        chaves = np.concatenate((chaves, chaves_aleatorias(bloco, semente, FLUXO_GERACAO)))
+        jogos = np.concatenate((jogos, bloco))
+        if len(jogos) > qtd:
+            manter = np.argpartition(chaves, qtd - 1)[:qtd] if qtd else np.empty(0, dtype=np.intp)
+            chaves, jogos = chaves[manter], jogos[manter]
+    return chaves, jogos
+
+
+def gerar_universo_exaustivo(qtd_alvo, ultimo_sorteio, fixas=(), excluidas=(), processos=1, semente=None):
+    """
+    Universo a partir de TODAS as combinações que passam nas regras rígidas:
+    se couberem em qtd_alvo, vêm todas; senão, uma amostra uniforme de qtd_alvo
+    (sem o viés de grupos e sem parar antes por limite de tentativas).
+    processos > 1: cada processo enumera uma parte do espaço de índices.
+    A chave de sorteio de cada jogo só depende de (semente, jogo): a mesma semente
+    dá o mesmo universo com qualquer número de processos.
+    Retorna array uint64 de máscaras (ordenado).
+    """
+    semente = nova_semente() if semente is None else semente
+    tarefas = [(qtd_alvo, ultimo_sorteio, tuple(fixas), tuple(excluidas), parte, processos, semente)
+               for parte in range(processos)]
+    if processos > 1:
+        with ProcessPoolExecutor(max_workers=processos) as executor:
+            partes = list(executor.map(_amostra_parte, tarefas))
+    else:
+        partes = [_amostra_parte(tarefas[0])]
+
+    chaves = np.concatenate([c for c, _ in partes])
+    jogos = np.concatenate([j for _, j in partes])
+    if len(jogos) > qtd_alvo:
+        manter = np.argpartition(chaves, qtd_alvo - 1)[:qtd_alvo] if qtd_alvo else np.empty(0, dtype=np.intp)
+        jogos = jogos[manter]
+    return np.sort(jogos)
@@ -2,14 +2,23 @@
 import pandas as pd
 import numpy as np
 from collections import Counter
-import sqlite3
 # Importação absoluta correta
-from app.util.config_mega import TABLE_NAME, LISTA_PRIMOS, LISTA_FIBONACCI, LISTA_MULTIPLOS_3, NUM_DEZENAS_SORTEADAS
+from app.util.config_mega import TABLE_NAME, NUM_DEZENAS_SORTEADAS
+from app.util.matriz import como_matriz
+from app.util.features import obter_features
+from app.util.janelas import temperatura_janela
+from app.util.aparicoes import indice_aparicoes
+from app.util.ciclos import indice_ciclos
+from app.util.mascaras import dezenas_mascara
+from app.util.banco import conexao_leitura
+
+# Os analisadores recebem o histórico como DataFrame ou MatrizSorteios (preferível:
+# a matriz do cache já vem pronta) e trabalham sobre a matriz de dezenas e sobre
+# as features por sorteio (app/util/features.py), sem recalcular indicadores.
 
 def get_db_connection(db_path):
-    conn = sqlite3.connect(db_path)
-    conn.row_factory = sqlite3.Row
-    return conn
+    # Conexão somente-leitura do pool da thread (app/util/banco.py); não deve ser fechada
+    return conexao_leitura(db_path)
 
 def carregar_todos_resultados(db_path):
     conn = get_db_connection(db_path)
@@ -21,31 +30,58 @@ def carregar_todos_resultados(db_path):
     except Exception as e:
         print(f"Erro DB: {e}")
         return pd.DataFrame()
-    finally:
-        conn.close()
 
 # --- Funções Auxiliares ---
 
 def calcular_distribuicao_qtd(df, func_contagem):
-    total = len(df)
+    m = como_matriz(df)
+    total = len(m)
     contador = Counter()
-    for _, row in df.iterrows():
-        bolas = row[[f'Bola{i}' for i in range(1, NUM_DEZENAS_SORTEADAS + 1)]].dropna().astype(int).tolist()
+    for bolas in m.lista_dezenas():
         qtd = func_contagem(bolas)
         contador[qtd] += 1
     return [{'qtd': k, 'contagem': v, 'percentual': round((v/total*100), 1)} for k, v in sorted(contador.items())]
 
+def contar_valores(valores):
+    """
+    Contagem vetorizada de um array 1-D: (valores, contagens) como listas de tipos nativos,
+    na ordem da primeira ocorrência (a mesma de um Counter alimentado em sequência).
+    """
+    unicos, primeiro, contagem = np.unique(np.asarray(valores), return_index=True, return_counts=True)
+    ordem = np.argsort(primeiro, kind='stable')
+    return unicos[ordem].tolist(), contagem[ordem].tolist()
+
+def formatar_distribuicao(valores, contagens, total):
+    """[{'qtd', 'contagem', 'percentual'}] em ordem crescente de valor."""
+    return [{'qtd': k, 'contagem': v, 'percentual': round((v/total*100), 1)}
+            for k, v in sorted(zip(valores, contagens))]
+
+def distribuicao_feature(valores, total=None):
+    """Mesmo formato de calcular_distribuicao_qtd, a partir de uma coluna de features."""
+    valores = np.asarray(valores)
+    total = total if total is not None else len(valores)
+    unicos, contagem = np.unique(valores, return_counts=True)
+    return formatar_distribuicao(unicos.tolist(), contagem.tolist(), total)
+
 def criar_faixas_estatisticas(lista_valores):
     """
     Divide uma lista de valores em 5 faixas baseadas na Média e Desvio Padrão.
     Faixa 3 (Meio) = Media +/- 0.5 * Desvio
     """
-    if not lista_valores: return []
+    if len(lista_valores) == 0: return []
     
     s = pd.Series(lista_valores)
-    media = s.mean()
-    desvio = s.std()
-    total = len(s)
+    v = s.to_numpy()
+    return montar_faixas(v, np.ones(len(v), dtype=np.int64), s.mean(), s.std())
+
+def montar_faixas(valores, contagens, media, desvio):
+    """
+    As 5 faixas de criar_faixas_estatisticas a partir de (valor, contagem) e da
+    média/desvio já conhecidos (ex: histograma + média/desvio online).
+    """
+    v = np.asarray(valores)
+    c = np.asarray(contagens, dtype=np.int64)
+    total = int(c.sum())
 
     # Definição dos limites (Limiares)
     limite_muito_baixo = media - (1.5 * desvio)
@@ -53,13 +89,13 @@ def criar_faixas_estatisticas(lista_valores):
     limite_alto       = media + (0.5 * desvio)
     limite_muito_alto = media + (1.5 * desvio)
 
-    # Contagem
+    # Contagem (vetorizada; mesmas fronteiras de pontuacao.classificar_faixa)
     faixas = {
-        "Muito Baixo": 0,
-        "Baixo": 0,
-        "Média": 0,
-        "Alto": 0,
-        "Muito Alto": 0
+        "Muito Baixo": int(c[v < limite_muito_baixo].sum()),
+        "Baixo":       int(c[(v >= limite_muito_baixo) & (v < limite_baixo)].sum()),
+        "Média":       int(c[(v >= limite_baixo) & (v <= limite_alto)].sum()), # Faixa Central
+        "Alto":        int(c[(v > limite_alto) & (v <= limite_muito_alto)].sum()),
+        "Muito Alto":  int(c[v > limite_muito_alto].sum())
     }
     
     # Definição das labels para exibição (ex: "120 - 150")
@@ -71,13 +107,6 @@ def criar_faixas_estatisticas(lista_valores):
         "Muito Alto":  f"> {int(limite_muito_alto)}"
     }
 
-    for v in lista_valores:
-        if v < limite_muito_baixo: faixas["Muito Baixo"] += 1
-        elif v < limite_baixo:     faixas["Baixo"] += 1
-        elif v <= limite_alto:     faixas["Média"] += 1 # Faixa Central
-        elif v <= limite_muito_alto: faixas["Alto"] += 1
-        else:                      faixas["Muito Alto"] += 1
-
     # Formatação final
     resultado = []
     ordem = ["Muito Baixo", "Baixo", "Média", "Alto", "Muito Alto"]
@@ -95,60 +124,33 @@ def criar_faixas_estatisticas(lista_valores):
 # --- Análises ---
 
 def analisar_basicos(df):
-    def conta_primos(bolas): return len([x for x in bolas if x in LISTA_PRIMOS])
-    def conta_fibo(bolas): return len([x for x in bolas if x in LISTA_FIBONACCI])
-    def conta_mult3(bolas): return len([x for x in bolas if x in LISTA_MULTIPLOS_3])
-
+    f = obter_features(como_matriz(df))
     return {
-        'primos': calcular_distribuicao_qtd(df, conta_primos),
-        'fibo': calcular_distribuicao_qtd(df, conta_fibo),
-        'mult3': calcular_distribuicao_qtd(df, conta_mult3)
+        'primos': distribuicao_feature(f['primos']),
+        'fibo': distribuicao_feature(f['fibo']),
+        'mult3': distribuicao_feature(f['mult3'])
     }
 
 def analisar_iniciais_finais(df):
-    total = len(df)
-    stats_ini = Counter()
-    stats_fim = Counter()
-    for _, row in df.iterrows():
-        bolas = row[[f'Bola{i}' for i in range(1, 7)]].dropna().astype(int).tolist()
-        iniciais = [str(d).zfill(2)[0] for d in bolas]
-        stats_ini[max(Counter(iniciais).values())] += 1
-        finais = [str(d).zfill(2)[-1] for d in bolas]
-        stats_fim[max(Counter(finais).values())] += 1
-        
-    def fmt(c): return [{'qtd': k, 'contagem': v, 'percentual': round(v/total*100, 1)} for k,v in sorted(c.items())]
-    return fmt(stats_ini), fmt(stats_fim)
+    # Concentração: maior quantidade de dezenas com o mesmo início (dezena) / mesmo final (unidade)
+    f = obter_features(como_matriz(df))
+    return distribuicao_feature(f['iniciais']), distribuicao_feature(f['finais'])
 
 def analisar_sequenciais(df):
-    total = len(df)
-    stats_seq = Counter()
-    for _, row in df.iterrows():
-        bolas = sorted(row[[f'Bola{i}' for i in range(1, 7)]].dropna().astype(int).tolist())
-        max_seq = 1; atual_seq = 1
-        for i in range(len(bolas)-1):
-            if bolas[i+1] == bolas[i]+1: atual_seq += 1
-            else:
-                max_seq = max(max_seq, atual_seq); atual_seq = 1
-        max_seq = max(max_seq, atual_seq)
-        stats_seq[max_seq if max_seq > 1 else 0] += 1
-    return [{'qtd': k, 'contagem': v, 'percentual': round(v/total*100, 1)} for k,v in sorted(stats_seq.items())]
+    # Maior bloco de consecutivas de cada sorteio (0 = nenhum par)
+    f = obter_features(como_matriz(df))
+    return distribuicao_feature(f['sequenciais'])
 
 def analisar_repetidas_anterior(df):
-    total = len(df) - 1; stats = Counter()
-    if total < 1: return []
-    jogos = [set(row[[f'Bola{i}' for i in range(1, 7)]].dropna().astype(int).tolist()) for _, row in df.iterrows()]
-    for i in range(1, len(jogos)):
-        stats[len(jogos[i].intersection(jogos[i-1]))] += 1
-    return [{'qtd': k, 'contagem': v, 'percentual': round(v/total*100, 1)} for k,v in sorted(stats.items())]
+    f = obter_features(como_matriz(df))
+    if len(f['repetidas']) < 2: return []
+    return distribuicao_feature(f['repetidas'][1:])
 
 # --- NOVAS LÓGICAS DE 5 FAIXAS ---
 
 def analisar_somas_distribuicao(df):
     """Calcula a distribuição das Somas em 5 faixas dinâmicas"""
-    somas = []
-    for _, row in df.iterrows():
-        bolas = row[[f'Bola{i}' for i in range(1, 7)]].dropna().astype(int).tolist()
-        somas.append(sum(bolas))
+    somas = obter_features(como_matriz(df))['soma']
     
     return criar_faixas_estatisticas(somas)
 
@@ -157,50 +159,36 @@ def analisar_frequencia_periodo_distribuicao(df, janela):
     Calcula a 'Soma de Frequência' (Temperatura) e distribui em 5 faixas dinâmicas.
     Confirmação da lógica: Contagem de todas as dezenas nos X jogos anteriores.
     """
-    cols_bolas = [f'Bola{i}' for i in range(1, 7)]
-    todos_jogos = df[cols_bolas].values.tolist()
-    
-    lista_metricas = []
-    
+    m = como_matriz(df)
     # Começa a partir da 'janela', pois os primeiros jogos não têm histórico suficiente
-    for i in range(janela, len(todos_jogos)):
-        jogo_atual = [int(x) for x in todos_jogos[i] if pd.notna(x)]
-        
-        # Pega o recorte histórico (os 'janela' jogos anteriores)
-        historico = todos_jogos[i-janela : i]
-        
-        # Achatamos a lista para contar a frequência de cada número nesse período
-        flat_historico = [int(num) for sublist in historico for num in sublist if pd.notna(num)]
-        contagem_hist = Counter(flat_historico)
-        
-        # Somamos a popularidade das dezenas do jogo atual
-        soma_frequencia = sum(contagem_hist[num] for num in jogo_atual)
-        lista_metricas.append(soma_frequencia)
-
-    return criar_faixas_estatisticas(lista_metricas)
+    temp, _ = temperatura_janela(m, janela)
+    return criar_faixas_estatisticas(temp[janela:])
 
 # --- Funções Antigas (Ainda usadas no index para tabelas simples) ---
 
 def analisar_frequencia_geral(df):
-    total = len(df)
+    m = como_matriz(df)
+    total = len(m)
     if total == 0: return [], [], []
-    cols = [f'Bola{i}' for i in range(1, 7)]
-    todas = [int(x) for col in cols for x in df[col].dropna()]
-    c = Counter(todas)
-    res = [{'dezena': k, 'contagem': v, 'percentual': round(v/total*100, 2)} for k,v in c.items()]
+    # Ordem coluna a coluna (Bola1 de todos, depois Bola2...), como na leitura por coluna;
+    # define o desempate do top/bottom 10
+    dezenas, contagens = contar_valores(m.dezenas.T.ravel())
+    return formatar_frequencia_geral(dezenas, contagens, total)
+
+def formatar_frequencia_geral(dezenas, contagens, total):
+    """(geral por dezena, top 10, bottom 10); dezenas na ordem que decide os empates."""
+    res = [{'dezena': k, 'contagem': v, 'percentual': round(v/total*100, 2)} for k,v in zip(dezenas, contagens)]
     return sorted(res, key=lambda x:x['dezena']), sorted(res, key=lambda x:x['contagem'], reverse=True)[:10], sorted(res, key=lambda x:x['contagem'])[:10]
 
 def analisar_pares_impares(df):
-    total = len(df); stats = Counter()
-    for _, row in df.iterrows():
-        bolas = row[[f'Bola{i}' for i in range(1, 7)]].dropna().astype(int).tolist()
-        pares = len([x for x in bolas if x%2==0])
-        stats[(pares, 6-pares)] += 1
-    return [{'pares': p, 'impares': i, 'contagem': c, 'percentual': round(c/total*100, 2)} for (p,i),c in sorted(stats.items())]
-
-# app/util/estatisticas.py
+    m = como_matriz(df)
+    total = len(m)
+    pares, contagem = np.unique(obter_features(m)['pares'], return_counts=True)
+    return formatar_pares_impares(pares.tolist(), contagem.tolist(), total)
 
-# app/util/estatisticas.py
+def formatar_pares_impares(pares, contagens, total):
+    return [{'pares': p, 'impares': 6-p, 'contagem': c, 'percentual': round(c/total*100, 2)}
+            for p, c in sorted(zip(pares, contagens))]
 
 def analisar_distribuicao_maximas(df, janela):
     """
@@ -208,8 +196,15 @@ def analisar_distribuicao_maximas(df, janela):
     Range 39: 6, 7, 8, 9, >=10
     Range 21: 4, 5, 6, 7, >=8
     """
-    if df.empty or len(df) < janela: return []
+    m = como_matriz(df)
+    if m.vazia or len(m) < janela: return []
 
+    # Máxima repetição de cada jogo (janela móvel)
+    valores, contagens = np.unique(temperatura_janela(m, janela)[1][janela:], return_counts=True)
+    return formatar_maximas(janela, valores.tolist(), contagens.tolist())
+
+def formatar_maximas(janela, valores, contagens):
+    """Faixas de Máxima Repetição a partir de (valor, contagem)."""
     # 1. Configuração das Faixas baseada na janela
     if janela == 39:
         # Faixas: 6, 7, 8, 9, >=10
@@ -226,42 +221,17 @@ def analisar_distribuicao_maximas(df, janela):
     else:
         return []
 
-    # 2. Processamento dos dados (igual anteriormente)
-    cols_bolas = [f'Bola{i}' for i in range(1, NUM_DEZENAS_SORTEADAS + 1)]
-    todos_jogos = []
-    for _, row in df.iterrows():
-        try: todos_jogos.append(row[cols_bolas].dropna().astype(int).tolist())
-        except: continue
+    total_analisado = sum(contagens)
 
-    total_analisado = 0
-    
-    for i in range(janela, len(todos_jogos)):
-        jogo_atual = todos_jogos[i]
-        historico = todos_jogos[i-janela : i]
-        
-        # Achata histórico e conta
-        flat_historico = [num for sublist in historico for num in sublist]
-        contagem_hist = Counter(flat_historico)
-        
-        # Pega a MÁXIMA repetição encontrada neste jogo
-        freqs_atuais = [contagem_hist[num] for num in jogo_atual]
-        if not freqs_atuais: continue
-            
-        max_rep = max(freqs_atuais)
-        total_analisado += 1
-
-        # 3. Categorização nas Faixas
-        if max_rep < limite_min:
-            # Se for menor que o mínimo (ex: 3), ignora ou conta como 'Outros'
-            # Aqui vamos focar nas faixas pedidas, então não incrementa faixas
-            pass
-        elif max_rep >= limite_max:
-            faixas[limite_max] += 1 # Conta no balde "Maior ou Igual"
-        else:
-            if max_rep in faixas:
-                faixas[max_rep] += 1
-
-    # 4. Formatação do Resultado
+    # 2. Categorização nas Faixas
+    # Abaixo do mínimo (ex: 3) não entra em nenhuma faixa
+    for max_rep, qtd in zip(valores, contagens):
+        if max_rep >= limite_max:
+            faixas[limite_max] += qtd # Balde "Maior ou Igual"
+        elif max_rep in faixas:
+            faixas[max_rep] += qtd
+
+    # 3. Formatação do Resultado
     resultado = []
     for k, label in labels.items():
         qtd = faixas[k]
@@ -278,32 +248,19 @@ def analisar_distribuicao_quadrantes(df):
     Analisa o perfil de quadrantes de cada sorteio.
     Q1 (Sup. Esq), Q2 (Sup. Dir), Q3 (Inf. Esq), Q4 (Inf. Dir)
     """
-    total_sorteios = len(df)
+    m = como_matriz(df)
+    total_sorteios = len(m)
     if total_sorteios == 0: return []
     
-    q1 = {1, 2, 3, 4, 5, 11, 12, 13, 14, 15, 21, 22, 23, 24, 25}
-    q2 = {6, 7, 8, 9, 10, 16, 17, 18, 19, 20, 26, 27, 28, 29, 30}
-    q3 = {31, 32, 33, 34, 35, 41, 42, 43, 44, 45, 51, 52, 53, 54, 55}
-    q4 = {36, 37, 38, 39, 40, 46, 47, 48, 49, 50, 56, 57, 58, 59, 60}
-
-    cols_bolas = [f'Bola{i}' for i in range(1, NUM_DEZENAS_SORTEADAS + 1)]
-    stats_perfis = Counter()
-
-    for _, row in df.iterrows():
-        bolas = row[cols_bolas].dropna().astype(int).tolist()
-        
-        c1 = len([x for x in bolas if x in q1])
-        c2 = len([x for x in bolas if x in q2])
-        c3 = len([x for x in bolas if x in q3])
-        c4 = len([x for x in bolas if x in q4])
-        
-        # Cria o perfil ex: "2-1-2-1"
-        perfil = f"{c1}-{c2}-{c3}-{c4}"
-        stats_perfis[perfil] += 1
+    # Perfis já calculados por sorteio, ex: "2-1-2-1"
+    perfis, contagens = contar_valores(obter_features(m)['quadrantes'])
+    return formatar_quadrantes(perfis, contagens, total_sorteios)
 
+def formatar_quadrantes(perfis, contagens, total_sorteios):
+    """Perfis na ordem da primeira ocorrência -> ranking por contagem."""
     resultado = []
-    # Ordena pelos perfis que mais saíram
-    for perfil, contagem in sorted(stats_perfis.items(), key=lambda x: x[1], reverse=True):
+    # Ordena pelos perfis que mais saíram (empate: o que apareceu primeiro)
+    for perfil, contagem in sorted(zip(perfis, contagens), key=lambda x: x[1], reverse=True):
         resultado.append({
             'perfil': perfil,
             'contagem': contagem,
@@ -317,44 +274,18 @@ def analisar_ciclos(df):
     Analisa o Ciclo Atual:
     - Quantos sorteios já ocorreram neste ciclo.
     - Quais dezenas faltam sair para fechar o ciclo.
+    O ciclo de cada sorteio é pré-calculado uma vez (app/util/ciclos.py); em qualquer
+    recorte o estado atual é só a leitura da sua última linha.
     """
-    if df.empty: return None
+    m = como_matriz(df)
+    if m.vazia: return None
 
-    cols_bolas = [f'Bola{i}' for i in range(1, NUM_DEZENAS_SORTEADAS + 1)]
-    todos_jogos = df[cols_bolas].values.tolist()
+    ciclo_id, sorteios_neste_ciclo, vistos = indice_ciclos(m).estado(len(m))
+    return formatar_ciclo(ciclo_id, sorteios_neste_ciclo, dezenas_mascara(vistos))
 
-    # Conjunto de todas as dezenas possíveis (1 a 60)
+def formatar_ciclo(ciclo_id, sorteios_neste_ciclo, dezenas_neste_ciclo):
     universo = set(range(1, 61))
-    
-    # Dezenas que já saíram no ciclo atual
-    dezenas_saiu_ciclo = set()
-    concursos_no_ciclo = 0
-    
-    # Percorre do ÚLTIMO jogo para trás até fechar o ciclo
-    # Mas a lógica de ciclo é progressiva. Vamos simular do inicio.
-    
-    ciclo_id = 1
-    dezenas_neste_ciclo = set()
-    inicio_ciclo_index = 0
-
-    # Vamos percorrer a história para achar o estado ATUAL
-    for i, jogo in enumerate(todos_jogos):
-        nums = {int(x) for x in jogo if pd.notna(x)}
-        
-        # Se o ciclo estava completo, inicia um novo
-        if len(dezenas_neste_ciclo) == 60:
-            dezenas_neste_ciclo = set()
-            ciclo_id += 1
-            inicio_ciclo_index = i
-            
-        dezenas_neste_ciclo.update(nums)
-
-    # O estado atual é o que sobrou no 'dezenas_neste_ciclo'
-    faltam_sair = list(universo - dezenas_neste_ciclo)
-    faltam_sair.sort()
-    
-    sorteios_neste_ciclo = len(todos_jogos) - inicio_ciclo_index
-
+    faltam_sair = sorted(universo - set(dezenas_neste_ciclo))
     return {
         'id_ciclo': ciclo_id,
         'qtd_jogos': sorteios_neste_ciclo,
@@ -369,43 +300,15 @@ def analisar_padrao_linhas_colunas(df):
     Retorna os padrões mais comuns de preenchimento.
     Ex Linhas: 2-1-1-1-1-0 (significa 2 dezenas numa linha, 1 em outras 4, 0 na ultima)
     """
-    stats_linhas = Counter()
-    stats_colunas = Counter()
-    total = len(df)
-
-    cols_bolas = [f'Bola{i}' for i in range(1, NUM_DEZENAS_SORTEADAS + 1)]
-
-    for _, row in df.iterrows():
-        bolas = row[cols_bolas].dropna().astype(int).tolist()
-        
-        # Mega Sena: Linhas 0-5, Colunas 0-9 (Baseado na dezena - 1)
-        # Ex: 60 -> (59)//10 = 5 (Linha 6), (59)%10 = 9 (Coluna 10)
-        linhas_counts = [0]*6
-        colunas_counts = [0]*10
-        
-        for b in bolas:
-            idx = b - 1
-            l = idx // 10
-            c = idx % 10
-            if 0 <= l < 6: linhas_counts[l] += 1
-            if 0 <= c < 10: colunas_counts[c] += 1
-            
-        # Gera a assinatura (ordenada para agrupar padrões iguais, ex: 2-1-1 é igual a 1-2-1 em estrutura)
-        # Mas aqui queremos a estrutura de quantidade, ex: "5 linhas ocupadas"
-        
-        # Padrão de Ocupação (quantas linhas tiveram dezenas?)
-        qtd_linhas_ocupadas = 6 - linhas_counts.count(0)
-        qtd_colunas_ocupadas = 10 - colunas_counts.count(0)
-        
-        stats_linhas[qtd_linhas_ocupadas] += 1
-        stats_colunas[qtd_colunas_ocupadas] += 1
-
-    def formatar(c):
-        return [{'qtd': k, 'contagem': v, 'percentual': round(v/total*100, 1)} for k,v in sorted(c.items())]
+    m = como_matriz(df)
+    total = len(m)
 
+    # Padrão de Ocupação (quantas linhas/colunas do volante tiveram dezenas?)
+    # Mega Sena: Linhas 0-5, Colunas 0-9 (Baseado na dezena - 1)
+    f = obter_features(m)
     return {
-        'linhas_ocupadas': formatar(stats_linhas),
-        'colunas_ocupadas': formatar(stats_colunas)
+        'linhas_ocupadas': distribuicao_feature(f['linhas'], total),
+        'colunas_ocupadas': distribuicao_feature(f['colunas'], total)
     }
 
 def analisar_atrasos(df):
@@ -413,32 +316,16 @@ def analisar_atrasos(df):
     Calcula o Atraso Atual de cada uma das 60 dezenas.
     Isso é CRUCIAL para o sistema de pontuação preditiva.
     """
-    cols_bolas = [f'Bola{i}' for i in range(1, NUM_DEZENAS_SORTEADAS + 1)]
-    todos_jogos = df[cols_bolas].values.tolist()
-    total_jogos = len(todos_jogos)
-    
-    # Dicionário {Dezena: Ultimo_Concurso_Visto}
-    ultima_aparicao = {i: -1 for i in range(1, 61)}
-    
-    # Percorre cronologicamente
-    for idx, jogo in enumerate(todos_jogos):
-        nums = [int(x) for x in jogo if pd.notna(x)]
-        for n in nums:
-            ultima_aparicao[n] = idx # Salva o índice do jogo (0 a N)
-            
-    # Calcula atraso
-    resultado = []
-    for dezena in range(1, 61):
-        ultimo_idx = ultima_aparicao[dezena]
-        if ultimo_idx == -1:
-            atraso = total_jogos # Nunca saiu (improvavel na mega, mas possivel em amostragem pequena)
-        else:
-            atraso = (total_jogos - 1) - ultimo_idx
-            
-        resultado.append({
-            'dezena': dezena,
-            'atraso': atraso
-        })
+    m = como_matriz(df)
+
+    # Atraso = sorteios desde a última aparição; nunca saiu (improvável na mega,
+    # mas possível em amostragem pequena) = total de jogos.
+    # Busca binária no índice de aparições (app/util/aparicoes.py), válido em qualquer recorte.
+    return formatar_atrasos(indice_aparicoes(m).atrasos(len(m)).tolist())
+
+def formatar_atrasos(atrasos):
+    """atrasos[d-1] -> ranking [{'dezena', 'atraso'}] do mais atrasado ao menos."""
+    resultado = [{'dezena': d, 'atraso': a} for d, a in enumerate(atrasos, start=1)]
         
     # Ordena pelos mais atrasados primeiro
     resultado.sort(key=lambda x: x['atraso'], reverse=True)
@@ -450,17 +337,8 @@ def analisar_deltas(df):
     Analisa a soma das diferenças (Deltas).
     Mede se o jogo é muito 'espalhado' ou 'agrupado'.
     """
-    cols_bolas = [f'Bola{i}' for i in range(1, NUM_DEZENAS_SORTEADAS + 1)]
-    somas_deltas = []
-    
-    for _, row in df.iterrows():
-        bolas = sorted(row[cols_bolas].dropna().astype(int).tolist())
-        # Calcula diferenças: (B2-B1) + (B3-B2) ...
-        # Matematicamente, Soma Deltas = (Bn - B1)
-        # Mas vamos fazer a soma de cada salto para visualização
-        deltas = [bolas[i+1] - bolas[i] for i in range(len(bolas)-1)]
-        soma_deltas = sum(deltas)
-        somas_deltas.append(soma_deltas)
+    # Soma das diferenças: (B2-B1) + (B3-B2) ... = (Bn - B1), já na feature 'deltas'
+    somas_deltas = obter_features(como_matriz(df))['deltas']
         
     # Usa a nossa função de faixas criada anteriormente
     return criar_faixas_estatisticas(somas_deltas)
@@ -470,50 +348,67 @@ def analisar_atraso_relativo(df, limite_desvio=3.0):
     Calcula o Z-Score do atraso atual.
     Z-Score = (Atraso Atual - Média Histórica) / Desvio Padrão Histórico.
     Se Z-Score > 3, significa que é um evento estatístico raríssimo (Anomalia).
+    Média e desvio dos intervalos vêm das somas prefixadas do índice de aparições,
+    no corte len(m): nada é reprocessado em recortes (backtests).
     """
-    cols = [f'Bola{i}' for i in range(1, NUM_DEZENAS_SORTEADAS + 1)]
-    todos_jogos = df[cols].values.tolist()
-    total_jogos = len(todos_jogos)
-    
-    intervalos = {k: [] for k in range(1, 61)}
-    ultima_aparicao = {k: -1 for k in range(1, 61)}
-    
-    for idx, jogo in enumerate(todos_jogos):
-        nums = [int(x) for x in jogo if pd.notna(x)]
-        for n in nums:
-            if ultima_aparicao[n] != -1:
-                gap = idx - ultima_aparicao[n] - 1
-                intervalos[n].append(gap)
-            ultima_aparicao[n] = idx
-            
+    m = como_matriz(df)
+    atraso, _, media, desvio = indice_aparicoes(m).estatisticas(len(m))
+
+    # Evita divisão por zero se desvio for 0 (ou menos de 2 intervalos)
+    com_desvio = desvio > 0
+    z_scores = np.where(com_desvio, (atraso - media) / np.where(com_desvio, desvio, 1), 0.0)
+
     resultado = []
     for dezena in range(1, 61):
-        atraso_atual = (total_jogos - 1) - ultima_aparicao[dezena]
-        gaps = intervalos[dezena]
-        
-        if len(gaps) > 1:
-            media = np.mean(gaps)
-            desvio = np.std(gaps)
-            
-            # Evita divisão por zero se desvio for 0
-            if desvio > 0:
-                z_score = (atraso_atual - media) / desvio
-            else:
-                z_score = 0
-        else:
-            media = 0
-            z_score = 0
-            
+        z_score = z_scores[dezena - 1]
         # Filtra pelo parametro (Default > 3 sigmas)
         # Se quiser flexibilidade, retornamos tudo e filtramos na ponta
         if z_score > 0: # Retorna todos que estão acima da média para ordenação
             resultado.append({
                 'dezena': dezena,
-                'atraso': atraso_atual,
-                'media': round(media, 1),
+                'atraso': int(atraso[dezena - 1]),
+                'media': round(media[dezena - 1], 1),
                 'z_score': round(z_score, 2)
             })
             
     # Ordena pelos mais críticos (Z-Score maior)
     resultado.sort(key=lambda x: x['z_score'], reverse=True)
-    return resultado
\ No newline at end of file
+    return resultado
+
+# --- Painel (rota '/') ---
+
+def calcular_painel(df):
+    """
+    Todas as distribuições do dashboard de uma vez, nos mesmos formatos das funções
+    analisar_*. As features por sorteio são obtidas uma única vez (persistidas ou
+    num passe vetorizado) e cada distribuição é só uma contagem sobre essas colunas.
+    Retorna dict com as chaves usadas pelo template index.html.
+    """
+    m = como_matriz(df)
+    obter_features(m)
+    freq_geral, top_10, bottom_10 = analisar_frequencia_geral(m)
+    basicos = analisar_basicos(m)
+    ini, fim = analisar_iniciais_finais(m)
+    return {
+        'freq_geral': freq_geral,
+        'top_10': top_10,
+        'bottom_10': bottom_10,
+        'stats_pares': analisar_pares_impares(m),
+        'stats_soma_dist': analisar_somas_distribuicao(m),
+        'stats_primos': basicos['primos'],
+        'stats_fibo': basicos['fibo'],
+        'stats_mult3': basicos['mult3'],
+        'stats_ini': ini,
+        'stats_fim': fim,
+        'stats_seq': analisar_sequenciais(m),
+        'stats_rep_ant': analisar_repetidas_anterior(m),
+        'stats_rep_39': analisar_frequencia_periodo_distribuicao(m, 39),
+        'stats_rep_21': analisar_frequencia_periodo_distribuicao(m, 21),
+        'dist_max_39': analisar_distribuicao_maximas(m, 39),
+        'dist_max_21': analisar_distribuicao_maximas(m, 21),
+        'stats_quadrantes': analisar_distribuicao_quadrantes(m),
+        'ciclo_atual': analisar_ciclos(m),
+        'stats_lin_col': analisar_padrao_linhas_colunas(m),
+        'ranking_atrasos': analisar_atrasos(m),
+        'dist_deltas': analisar_deltas(m),
+    }
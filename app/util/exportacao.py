@@ -0,0 +1,162 @@
+# app/util/exportacao.py
+"""
+Exportação/importação colunar de universos gerados e resultados de backtest.
+
+Cada exportação é um "pacote": uma pasta com um .npy por coluna + meta.json.
+- Gravação em blocos (GravadorColunar.adicionar): milhões de jogos sem montar
+  tudo na memória; cada coluna vai para um arquivo parcial e o .npy final é
+  montado no fechamento.
+- Leitura com np.load(mmap_mode='r'): as colunas são mapeadas, sem cópia.
+
+Pacotes padrão:
+    universo -> mascara (uint64), score (uint8), criterios (uint16, bits de pontuacao.CRITERIOS)
+    lote     -> base, alvo (int32), real (N,6 uint8), acertos (N,7 int32: qtd de jogos com 0..6), max_score (uint8)
+"""
+import json
+import os
+import shutil
+import time
+import numpy as np
+from .config_mega import NUM_DEZENAS_SORTEADAS
+
+DIRETORIO_EXPORTACOES = os.path.normpath(
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..', 'exportacoes'))
+TAMANHO_BLOCO = 1_000_000
+ARQUIVO_META = 'meta.json'
+
+ESQUEMA_UNIVERSO = {
+    'mascara': (np.uint64, ()),
+    'score': (np.uint8, ()),
+    'criterios': (np.uint16, ()),
+}
+ESQUEMA_LOTE = {
+    'base': (np.int32, ()),
+    'alvo': (np.int32, ()),
+    'real': (np.uint8, (NUM_DEZENAS_SORTEADAS,)),
+    'acertos': (np.int32, (NUM_DEZENAS_SORTEADAS + 1,)),
+    'max_score': (np.uint8, ()),
+}
+
+
+def novo_pacote(prefixo, diretorio_base=DIRETORIO_EXPORTACOES):
+    """Caminho de uma pasta nova, ex: exportacoes/universo_2943_20251126-101500."""
+    nome = f"{prefixo}_{time.strftime('%Y%m%d-%H%M%S')}"
+    caminho = os.path.join(diretorio_base, nome)
+    sufixo = 1
+    while os.path.exists(caminho):
+        sufixo += 1
+        caminho = os.path.join(diretorio_base, f"{nome}-{sufixo}")
+    return caminho
+
+
+class GravadorColunar:
+    """
+    Grava colunas em blocos. Uso:
+        with GravadorColunar(pasta, ESQUEMA_UNIVERSO) as g:
+            g.adicionar(mascara=..., score=..., criterios=...)
+            g.metadados['concurso'] = 2943
+    """
+
+    def __init__(self, diretorio, esquema, metadados=None):
+        self.diretorio = diretorio
+        self.esquema = {nome: (np.dtype(dtype), tuple(formato)) for nome, (dtype, formato) in esquema.items()}
+        self.metadados = dict(metadados or {})
+        self.linhas = 0
+        os.makedirs(diretorio, exist_ok=True)
+        self._parciais = {nome: open(self._caminho(nome) + '.parcial', 'wb') for nome in self.esquema}
+
+    def _caminho(self, nome):
+        return os.path.join(self.diretorio, f"{nome}.npy")
+
+    def adicionar(self, **colunas):
+        """Anexa um bloco; todas as colunas do esquema, com o mesmo número de linhas."""
+        if set(colunas) != set(self.esquema):
+            raise ValueError(f"Colunas esperadas: {sorted(self.esquema)}; recebidas: {sorted(colunas)}")
+        blocos = {}
+        for nome, (dtype, formato) in self.esquema.items():
+            bloco = np.ascontiguousarray(colunas[nome], dtype=dtype)
+            if bloco.shape[1:] != formato:
+                raise ValueError(f"Coluna '{nome}': formato {bloco.shape[1:]} != {formato}")
+            blocos[nome] = bloco
+        tamanhos = {len(b) for b in blocos.values()}
+        if len(tamanhos) > 1:
+            raise ValueError(f"Colunas com tamanhos diferentes: {tamanhos}")
+        for nome, bloco in blocos.items():
+            self._parciais[nome].write(bloco.tobytes())
+        self.linhas += tamanhos.pop() if tamanhos else 0
+
+    def fechar(self):
+        """Monta os .npy finais (cabeçalho + dados copiados em blocos) e grava o meta.json."""
+        for nome, (dtype, formato) in self.esquema.items():
+            parcial = self._parciais[nome]
+            parcial.close()
+            cabecalho = {'descr': np.lib.format.dtype_to_descr(dtype), 'fortran_order': False,
+                         'shape': (self.linhas,) + formato}
+            with open(self._caminho(nome), 'wb') as destino, open(parcial.name, 'rb') as origem:
+                np.lib.format.write_array_header_1_0(destino, cabecalho)
+                shutil.copyfileobj(origem, destino, 16 * 1024 * 1024)
+            os.remove(parcial.name)
+        meta = dict(self.metadados)
+        meta['linhas'] = self.linhas
+        meta['colunas'] = {nome: {'dtype': np.dtype(dtype).str, 'formato': list(formato)}
+                           for nome, (dtype, formato) in self.esquema.items()}
+        meta['criado_em'] = time.strftime('%Y-%m-%d %H:%M:%S')
+        with open(os.path.join(self.diretorio, ARQUIVO_META), 'w', encoding='utf-8') as f:
+            json.dump(meta, f, ensure_ascii=False, indent=2, default=_json_padrao)
+        return self.diretorio
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, tipo, valor, tb):
+        if tipo is None:
+            self.fechar()
+        else:
+            for parcial in self._parciais.values():
+                parcial.close()
+        return False
+
+
+def _json_padrao(valor):
+    # Tipos NumPy/sets que aparecem nos parâmetros e perfis
+    if hasattr(valor, 'item'):
+        return valor.item()
+    if isinstance(valor, (set, frozenset, tuple)):
+        return sorted(valor) if isinstance(valor, (set, frozenset)) else list(valor)
+    return str(valor)
+
+
+def ler_pacote(diretorio, mmap=True):
+    """
+    Abre um pacote. Retorna (colunas, meta): colunas = {nome: array}, mapeadas em
+    memória (somente leitura) quando mmap=True.
+    """
+    with open(os.path.join(diretorio, ARQUIVO_META), encoding='utf-8') as f:
+        meta = json.load(f)
+    modo = 'r' if mmap else None
+    colunas = {nome: np.load(os.path.join(diretorio, f"{nome}.npy"), mmap_mode=modo)
+               for nome in meta['colunas']}
+    return colunas, meta
+
+
+def exportar_universo(diretorio, mascaras, scores, criterios, metadados=None, tamanho_bloco=TAMANHO_BLOCO):
+    """Universo pontuado: um jogo por linha (máscara), com score e critérios atendidos."""
+    with GravadorColunar(diretorio, ESQUEMA_UNIVERSO, metadados) as g:
+        for ini in range(0, len(mascaras), tamanho_bloco):
+            fim = ini + tamanho_bloco
+            g.adicionar(mascara=mascaras[ini:fim], score=scores[ini:fim], criterios=criterios[ini:fim])
+    return diretorio
+
+
+def exportar_lote(diretorio, resultados, metadados=None):
+    """Resultados de simular_lote_cenarios (lista de dicts) em colunas."""
+    with GravadorColunar(diretorio, ESQUEMA_LOTE, metadados) as g:
+        g.adicionar(
+            base=[r['base'] for r in resultados],
+            alvo=[r['alvo'] for r in resultados],
+            real=np.array([r['real'] for r in resultados], dtype=np.uint8).reshape(-1, NUM_DEZENAS_SORTEADAS),
+            acertos=np.array([[r['acertos'].get(k, 0) for k in range(NUM_DEZENAS_SORTEADAS + 1)]
+                              for r in resultados], dtype=np.int32).reshape(-1, NUM_DEZENAS_SORTEADAS + 1),
+            max_score=[r['max_score'] for r in resultados],
+        )
+    return diretorio
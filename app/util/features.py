@@ -0,0 +1,176 @@
+# app/util/features.py
+"""
+Indicadores por sorteio (soma, deltas, pares, primos, quadrantes, Temp39/21, ...),
+calculados uma única vez e persistidos na tabela 'features_megasena' (chave: Concurso).
+
+- O coletor grava as features de cada concurso novo logo após salvá-lo.
+- O cache do histórico carrega a tabela junto com a matriz de sorteios.
+- Backfill completo:  python -m app.util.features [caminho_do_banco]
+"""
+import argparse
+import os
+import numpy as np
+import pandas as pd
+from .config_mega import (TABLE_NAME, DATABASE_NAME, UNIVERSO_DEZENAS,
+                          LISTA_PRIMOS, LISTA_FIBONACCI, LISTA_MULTIPLOS_3)
+from .matriz import MatrizSorteios
+from .janelas import temperatura_janela
+from .banco import transacao
+
+TABELA_FEATURES = 'features_megasena'
+
+# Colunas numéricas (todas inteiras) + o padrão de quadrantes em texto ("2-1-2-1")
+COLUNAS_NUMERICAS = [
+    'soma', 'deltas', 'pares', 'primos', 'fibo', 'mult3',
+    'sequenciais', 'iniciais', 'finais', 'linhas', 'colunas', 'repetidas',
+    'temp39', 'temp21', 'max_rep_39', 'max_rep_21',
+]
+COLUNAS_FEATURES = COLUNAS_NUMERICAS + ['quadrantes']
+
+# Tabelas de consulta por dezena (índice = dezena, posição 0 sem uso)
+_DEZENAS = np.arange(UNIVERSO_DEZENAS + 1)
+EH_PRIMO = np.isin(_DEZENAS, LISTA_PRIMOS)
+EH_FIBO = np.isin(_DEZENAS, LISTA_FIBONACCI)
+EH_MULT3 = np.isin(_DEZENAS, LISTA_MULTIPLOS_3)
+QUADRANTE = np.where(_DEZENAS > 30, 2, 0) + ((_DEZENAS - 1) % 10 >= 5)   # 0..3 = Q1..Q4
+LINHA = (_DEZENAS - 1) // 10
+COLUNA = (_DEZENAS - 1) % 10
+
+
+def _ocupacao(rotulos, qtd_rotulos):
+    """Contagem por rótulo em cada linha: (N,6) rótulos -> (N,qtd_rotulos)."""
+    contagem = np.zeros((len(rotulos), qtd_rotulos), dtype=np.int16)
+    np.add.at(contagem, (np.arange(len(rotulos))[:, None], rotulos), 1)
+    return contagem
+
+
+def _maior_sequencia(dezenas):
+    """Maior bloco de dezenas consecutivas (0 quando não há nenhum par)."""
+    consecutivas = np.diff(dezenas.astype(np.int16), axis=1) == 1
+    atual = np.zeros(len(dezenas), dtype=np.int16)
+    maior = np.zeros(len(dezenas), dtype=np.int16)
+    for coluna in consecutivas.T:
+        atual = (atual + 1) * coluna
+        maior = np.maximum(maior, atual)
+    return np.where(maior > 0, maior + 1, 0)
+
+
+def _temperatura(m, janela, linhas):
+    """Temp (soma das frequências nos 'janela' sorteios anteriores) e máxima repetição."""
+    temp, maximo = temperatura_janela(m, janela)
+    return temp[linhas], maximo[linhas]
+
+
+def calcular_features(m, linhas=None):
+    """
+    Calcula as features das linhas pedidas da matriz (padrão: todas).
+    As linhas anteriores servem de contexto (repetidas, Temp, MaxRep).
+    Retorna DataFrame com 'Concurso' + COLUNAS_FEATURES.
+    """
+    linhas = np.arange(len(m)) if linhas is None else np.asarray(linhas, dtype=np.intp)
+    dez = m.dezenas[linhas].astype(np.intp)
+
+    quad = _ocupacao(QUADRANTE[dez], 4)
+    f = pd.DataFrame({'Concurso': m.concursos[linhas].astype(np.int64)})
+    f['soma'] = dez.sum(axis=1)
+    f['deltas'] = dez[:, -1] - dez[:, 0]
+    f['pares'] = (dez % 2 == 0).sum(axis=1)
+    f['primos'] = EH_PRIMO[dez].sum(axis=1)
+    f['fibo'] = EH_FIBO[dez].sum(axis=1)
+    f['mult3'] = EH_MULT3[dez].sum(axis=1)
+    f['sequenciais'] = _maior_sequencia(dez)
+    f['iniciais'] = _ocupacao(dez // 10, 7).max(axis=1)
+    f['finais'] = _ocupacao(dez % 10, 10).max(axis=1)
+    f['linhas'] = (_ocupacao(LINHA[dez], 6) > 0).sum(axis=1)
+    f['colunas'] = (_ocupacao(COLUNA[dez], 10) > 0).sum(axis=1)
+
+    anteriores = np.maximum(linhas - 1, 0)
+    repetidas = (m.incidencia[linhas] & m.incidencia[anteriores]).sum(axis=1)
+    f['repetidas'] = np.where(linhas > 0, repetidas, 0)
+
+    f['temp39'], f['max_rep_39'] = _temperatura(m, 39, linhas)
+    f['temp21'], f['max_rep_21'] = _temperatura(m, 21, linhas)
+    f['quadrantes'] = ['-'.join(map(str, q)) for q in quad.tolist()]
+    for col in COLUNAS_NUMERICAS:
+        f[col] = f[col].astype(np.int64)
+    return f[['Concurso'] + COLUNAS_FEATURES]
+
+
+def como_colunas(df_features):
+    """DataFrame de features -> dict {coluna: array}, o formato guardado na matriz."""
+    return {col: df_features[col].to_numpy() for col in COLUNAS_FEATURES}
+
+
+def obter_features(m):
+    """Features alinhadas às linhas da matriz (persistidas ou calculadas na hora)."""
+    if m.features is None:
+        m.features = como_colunas(calcular_features(m))
+    return m.features
+
+
+# --- PERSISTÊNCIA ---
+
+def criar_tabela_features(conn):
+    colunas_sql = ", ".join([f"{c} INTEGER" for c in COLUNAS_NUMERICAS])
+    conn.execute(f"""
+    CREATE TABLE IF NOT EXISTS {TABELA_FEATURES} (
+        Concurso INTEGER PRIMARY KEY,
+        {colunas_sql},
+        quadrantes TEXT
+    );""")
+
+
+def _ler_matriz(conn):
+    df = pd.read_sql_query(
+        f"SELECT Concurso, Bola1, Bola2, Bola3, Bola4, Bola5, Bola6 FROM {TABLE_NAME} ORDER BY Concurso ASC", conn)
+    return MatrizSorteios.de_dataframe(df)
+
+
+def atualizar_features(conn):
+    """
+    Grava as features dos concursos que ainda não estão na tabela.
+    Retorna quantas linhas foram gravadas.
+    """
+    criar_tabela_features(conn)
+    m = _ler_matriz(conn)
+    existentes = {c for (c,) in conn.execute(f"SELECT Concurso FROM {TABELA_FEATURES}")}
+    faltantes = [i for i, c in enumerate(m.concursos.tolist()) if c not in existentes]
+    if not faltantes:
+        return 0
+    novas = calcular_features(m, faltantes)
+    colunas = ['Concurso'] + COLUNAS_FEATURES
+    conn.executemany(
+        f"INSERT OR REPLACE INTO {TABELA_FEATURES} ({', '.join(colunas)}) VALUES ({', '.join('?' * len(colunas))})",
+        novas[colunas].astype(object).itertuples(index=False, name=None))
+    return len(novas)
+
+
+def reconstruir_features(db_path):
+    """Backfill: apaga e recalcula a tabela inteira."""
+    with transacao(db_path) as conn:
+        conn.execute(f"DROP TABLE IF EXISTS {TABELA_FEATURES}")
+        return atualizar_features(conn)
+
+
+def carregar_features(conn, m):
+    """
+    Lê a tabela de features alinhada às linhas da matriz.
+    Retorna None se a tabela não existir ou não cobrir todos os concursos.
+    """
+    try:
+        df = pd.read_sql_query(f"SELECT * FROM {TABELA_FEATURES} ORDER BY Concurso ASC", conn)
+    except Exception:
+        return None
+    df = df[df['Concurso'].isin(m.concursos)]
+    if len(df) != len(m) or not np.array_equal(df['Concurso'].to_numpy(), m.concursos):
+        return None
+    return como_colunas(df)
+
+
+if __name__ == '__main__':
+    padrao = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..', DATABASE_NAME)
+    parser = argparse.ArgumentParser(description='Recalcula a tabela de features da Mega-Sena.')
+    parser.add_argument('db', nargs='?', default=os.path.normpath(padrao))
+    args = parser.parse_args()
+    total = reconstruir_features(args.db)
+    print(f"{total} concursos gravados em {TABELA_FEATURES}.")
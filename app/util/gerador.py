@@ -1,6 +1,13 @@
 # app/util/gerador.py
+import itertools
 import random
 from collections import defaultdict
+import numpy as np
+from .mascaras import mascara_jogo, BITS_DEZENAS, contar_acertos, contar_pares_sequenciais
+from .enumerador import gerar_universo_exaustivo
+from .combinacoes import ConjuntoJogos, indices_de_mascaras
+from .aleatorio import FLUXO_GERACAO, nova_semente, fluxo_numpy, fluxo_python
+from .gerador_dirigido import SCORE_DIRIGIDO, gerar_universo_dirigido
 
 # Definição dos Quadrantes (Mega-Sena 6x10)
 Q1 = [1, 2, 3, 4, 5, 11, 12, 13, 14, 15, 21, 22, 23, 24, 25]
@@ -26,60 +33,242 @@ def classificar_dezenas_por_quadrante(mapa_scores):
     
     return potes
 
-def selecionar_5_balanceado(pote_quadrante):
+def selecionar_5_balanceado(pote_quadrante, rng=random):
+    """rng: random.Random (ou o próprio módulo random) de onde saem os sorteios."""
     if not pote_quadrante.get('prata'): 
-        return random.sample(pote_quadrante['ouro'], 5)
+        return rng.sample(pote_quadrante['ouro'], 5)
 
-    r = random.random()
+    r = rng.random()
     selecao = []
     
     if r < 0.50: # Cenário A (Forte)
-        selecao.extend(random.sample(pote_quadrante['ouro'], 3))
-        selecao.extend(random.sample(pote_quadrante['prata'], 1))
-        selecao.extend(random.sample(pote_quadrante['bronze'], 1))
+        selecao.extend(rng.sample(pote_quadrante['ouro'], 3))
+        selecao.extend(rng.sample(pote_quadrante['prata'], 1))
+        selecao.extend(rng.sample(pote_quadrante['bronze'], 1))
     elif r < 0.80: # Cenário B (Equilibrado)
-        selecao.extend(random.sample(pote_quadrante['ouro'], 2))
-        selecao.extend(random.sample(pote_quadrante['prata'], 2))
-        selecao.extend(random.sample(pote_quadrante['bronze'], 1))
+        selecao.extend(rng.sample(pote_quadrante['ouro'], 2))
+        selecao.extend(rng.sample(pote_quadrante['prata'], 2))
+        selecao.extend(rng.sample(pote_quadrante['bronze'], 1))
     else: # Cenário C (Zebra)
-        selecao.extend(random.sample(pote_quadrante['ouro'], 1))
-        selecao.extend(random.sample(pote_quadrante['prata'], 2))
-        selecao.extend(random.sample(pote_quadrante['bronze'], 2))
+        selecao.extend(rng.sample(pote_quadrante['ouro'], 1))
+        selecao.extend(rng.sample(pote_quadrante['prata'], 2))
+        selecao.extend(rng.sample(pote_quadrante['bronze'], 2))
         
     return selecao
 
 def validar_jogo_rigid(jogo, ultimo_sorteio):
+    """Aceita dezenas ou máscaras de bits (int) para o jogo e o último sorteio."""
+    mascara = int(jogo) if isinstance(jogo, (int, np.integer)) else mascara_jogo(jogo)
+    ultimo = int(ultimo_sorteio) if isinstance(ultimo_sorteio, (int, np.integer)) else mascara_jogo(ultimo_sorteio)
+
     # 1. Repetidas (0 ou 1)
-    rep = len(set(jogo).intersection(set(ultimo_sorteio)))
+    rep = (mascara & ultimo).bit_count()
     if rep > 1: return False
     
-    # 2. Sequenciais (Máximo 1 par)
-    s = sorted(jogo)
-    seqs = sum(1 for i in range(len(s)-1) if s[i+1] == s[i]+1)
+    # 2. Sequenciais (Máximo 1 par): cada par consecutivo é um bit aceso com o vizinho aceso
+    seqs = (mascara & (mascara >> 1)).bit_count()
     if seqs > 1: return False
     
     return True
 
-def gerar_universo_filtrado(qtd_alvo, ultimo_sorteio, mapa_scores=None, modelo='F4'):
+# --- CONFIGURAÇÃO DO MODELO ---
+DENSIDADE_MODELO = {
+    'F5': 1500,  # Modelo F5 (Quina): Alta densidade por grupo, poucos grupos (~1500 jogos por grupo de 20).
+    'F4': 85,    # Modelo F4 (Quadra): Baixa densidade, muitos grupos (Padrão, ~85 jogos por grupo de 20).
+}
+TENTATIVAS_POR_JOGO = 4          # tentativas internas por jogo pedido ao grupo
+ELEMENTOS_POR_LOTE = 4_000_000   # sorteios aleatórios por lote de grupos (~16 MB em float32)
+TAMANHO_BLOCO_FLUXO = 10_000     # jogos por bloco na geração em fluxo (gerar_universo_em_blocos)
+
+# Cenários de selecionar_5_balanceado: (probabilidade acumulada, qtd ouro/prata/bronze)
+CENARIOS_POTE = [(0.50, (3, 1, 1)), (0.80, (2, 2, 1)), (1.00, (1, 2, 2))]
+
+def _config_modelo(qtd_alvo, modelo):
+    densidade_por_grupo = DENSIDADE_MODELO['F5'] if modelo == 'F5' else DENSIDADE_MODELO['F4']
+    # Cálculo de segurança para o loop não ficar infinito
+    qtd_grupos_estimada = int(qtd_alvo / densidade_por_grupo) + 10
+    return densidade_por_grupo, qtd_grupos_estimada * 10
+
+def gerar_universo_filtrado(qtd_alvo, ultimo_sorteio, mapa_scores=None, modelo='F4', metodo='lote', semente=None,
+                            perfil=None, mapa_21=None, cotas=None):
     """
     Gera o universo de jogos baseados no Modelo escolhido (F4 ou F5).
+    Retorna um array uint64 de máscaras de bits (ver app/util/mascaras.py).
+    metodo='lote' (padrão): grupos e jogos sorteados em lotes NumPy (gerar_universo_lote).
+    metodo='legado': laço original, jogo a jogo.
+    metodo='exaustivo': amostra uniforme de todas as combinações que passam nas regras
+    rígidas (app/util/enumerador.py); mapa_scores/modelo não se aplicam.
+    metodo='dirigido' (só quando pedido): até cotas[SCORE_DIRIGIDO] jogos com o score
+    máximo saem da varredura exata de app/util/gerador_dirigido.py e o restante, até
+    qtd_alvo, sai do 'lote' como sempre: as outras faixas têm a mesma distribuição do
+    'lote'. Mais lento que o 'lote'; exige perfil (gabarito), mapa_scores (mapa 39) e mapa_21.
+    semente: mesma semente -> mesmo universo (fluxo FLUXO_GERACAO, app/util/aleatorio.py).
+    """
+    semente = nova_semente() if semente is None else semente
+    if metodo == 'legado':
+        return gerar_universo_legado(qtd_alvo, ultimo_sorteio, mapa_scores, modelo,
+                                     fluxo_python(semente, FLUXO_GERACAO))
+    if metodo == 'exaustivo':
+        return gerar_universo_exaustivo(qtd_alvo, ultimo_sorteio, semente=semente)
+    if metodo == 'dirigido':
+        dirigidos = _gerar_faixas_dirigidas(qtd_alvo, ultimo_sorteio, mapa_scores, semente, perfil, mapa_21, cotas)
+        resto = gerar_universo_lote(qtd_alvo - len(dirigidos), ultimo_sorteio, mapa_scores, modelo, semente)
+        return np.concatenate((dirigidos, resto[~np.isin(resto, dirigidos)]))
+    return gerar_universo_lote(qtd_alvo, ultimo_sorteio, mapa_scores, modelo, semente)
+
+def _gerar_faixas_dirigidas(qtd_alvo, ultimo_sorteio, mapa_scores, semente, perfil, mapa_21, cotas):
+    """
+    Parte dirigida de metodo='dirigido': a cota do score máximo (SCORE_DIRIGIDO).
+    """
+    qtd = min(int((cotas or {}).get(SCORE_DIRIGIDO, 0)), qtd_alvo)
+    return gerar_universo_dirigido(qtd, ultimo_sorteio, perfil, mapa_scores or {}, mapa_21 or {}, semente)
+
+def escolher_metodo(metodo):
+    """metodo='auto' -> 'lote'. Os demais ('dirigido', 'exaustivo', 'legado') só quando pedidos."""
+    return 'lote' if metodo == 'auto' else metodo
+
+def gerar_universo_em_blocos(qtd_alvo, ultimo_sorteio, mapa_scores=None, modelo='F4', metodo='lote', semente=None,
+                             perfil=None, mapa_21=None, cotas=None):
+    """
+    Mesmos métodos de gerar_universo_filtrado, em blocos de máscaras para consumo em
+    fluxo (app/util/baldes.py). 'lote' gera sob demanda, em blocos de TAMANHO_BLOCO_FLUXO;
+    'dirigido' entrega o score máximo num bloco e segue com os blocos do 'lote';
+    os demais entregam o universo num bloco só.
+    """
+    semente = nova_semente() if semente is None else semente
+    if metodo == 'lote':
+        return gerar_blocos_lote(qtd_alvo, ultimo_sorteio, mapa_scores, modelo, semente, TAMANHO_BLOCO_FLUXO)
+    if metodo == 'dirigido':
+        dirigidos = _gerar_faixas_dirigidas(qtd_alvo, ultimo_sorteio, mapa_scores, semente, perfil, mapa_21, cotas)
+        blocos = gerar_blocos_lote(qtd_alvo - len(dirigidos), ultimo_sorteio, mapa_scores, modelo, semente,
+                                   TAMANHO_BLOCO_FLUXO)
+        return itertools.chain([dirigidos], (bloco[~np.isin(bloco, dirigidos)] for bloco in blocos))
+    return iter([gerar_universo_filtrado(qtd_alvo, ultimo_sorteio, mapa_scores, modelo, metodo, semente,
+                                         perfil, mapa_21, cotas)])
+
+def _sortear_grupos(rng, potes, qtd):
+    """
+    (qtd,20) dezenas: 5 por quadrante, como selecionar_5_balanceado, para vários grupos de uma vez.
+    Com potes ouro/prata/bronze o cenário (3-1-1, 2-2-1, 1-2-2) é sorteado por grupo e quadrante.
+    """
+    quadrantes = ['Q1', 'Q2', 'Q3', 'Q4']
+    if not potes['Q1'].get('prata'):
+        # Sem mapa: 5 quaisquer das 15 dezenas do quadrante
+        dezenas = np.array([potes[q]['ouro'] for q in quadrantes], dtype=np.uint8)       # (4,15)
+        escolha = np.argpartition(rng.random((qtd, 4, dezenas.shape[1])), 4, axis=-1)[..., :5]
+        return dezenas[np.arange(4)[:, None], escolha].reshape(qtd, 20)
+
+    dezenas = np.array([[potes[q][pote] for pote in ('ouro', 'prata', 'bronze')] for q in quadrantes],
+                       dtype=np.uint8)                                                   # (4,3,5)
+    limites = np.array([lim for lim, _ in CENARIOS_POTE])
+    quantidades = np.array([qtds for _, qtds in CENARIOS_POTE])                           # (3 cenários, 3 potes)
+    cenario = np.minimum(np.searchsorted(limites, rng.random((qtd, 4)), side='right'), len(limites) - 1)
+    qtd_por_pote = quantidades[cenario]                                                  # (qtd,4,3)
+    # Posição aleatória de cada dezena no seu pote; ficam as 'qtd_por_pote' primeiras
+    posicao = rng.random((qtd, 4, 3, 5)).argsort(axis=-1).argsort(axis=-1)
+    escolhidas = posicao < qtd_por_pote[..., None]
+    return np.broadcast_to(dezenas, escolhidas.shape)[escolhidas].reshape(qtd, 20)
+
+def _sortear_jogos(rng, g20, qtd):
+    """
+    (grupos, qtd) máscaras de 'qtd' jogos 6-de-20 sorteados em cada grupo.
+    6 posições distintas = as 6 menores de 20 chaves aleatórias.
+    """
+    bits = BITS_DEZENAS[g20.astype(np.intp) - 1]                                          # (grupos,20)
+    posicoes = np.argpartition(rng.random((len(g20), qtd, 20), dtype=np.float32), 5, axis=-1)[..., :6]
+    return np.bitwise_or.reduce(np.take_along_axis(bits[:, None, :], posicoes, axis=-1), axis=-1)
+
+def gerar_universo_lote(qtd_alvo, ultimo_sorteio, mapa_scores=None, modelo='F4', semente=None):
+    """
+    Mesmo modelo do laço original (grupos de 20, até 'densidade' jogos válidos e
+    inéditos por grupo em até 4x tentativas), com o sorteio feito em lotes NumPy:
+    - grupos de 20 e amostras 6-de-20 como arrays inteiros
+    - filtros de repetidas/sequenciais como máscaras vetoriais sobre os uint64
+    - inéditos testados no bitmap de índices combinatórios (app/util/combinacoes.py)
+    Cada grupo recebe de início ~1.5x a densidade em tentativas (~80% são válidas);
+    só os grupos que não completam sorteiam o restante das 4x.
+    Cada lote de grupos sorteia do seu próprio fluxo, fluxo_numpy(semente, FLUXO_GERACAO, k)
+    para o k-ésimo lote: o sorteio de um lote não depende dos outros (pode ser feito fora
+    de ordem ou em paralelo); só a aceitação dos inéditos segue a ordem dos lotes.
+    Retorna as máscaras na ordem em que foram aceitas.
+    """
+    blocos = list(gerar_blocos_lote(qtd_alvo, ultimo_sorteio, mapa_scores, modelo, semente))
+    return np.concatenate(blocos) if blocos else np.empty(0, dtype=np.uint64)
+
+def gerar_blocos_lote(qtd_alvo, ultimo_sorteio, mapa_scores=None, modelo='F4', semente=None, tamanho_bloco=None):
+    """
+    gerar_universo_lote em fluxo: entrega as máscaras aceitas em blocos de ~tamanho_bloco
+    (padrão: um bloco por lote de grupos). Os blocos concatenados = gerar_universo_lote
+    com a mesma semente; quem consome pode parar antes (app/util/baldes.py).
+    """
+    semente = nova_semente() if semente is None else semente
+    mascara_ultimo = np.uint64(mascara_jogo(ultimo_sorteio))
+    potes = classificar_dezenas_por_quadrante(mapa_scores or {})
+    densidade_por_grupo, max_tentativas_grupos = _config_modelo(qtd_alvo, modelo)
+    tentativas = densidade_por_grupo * TENTATIVAS_POR_JOGO
+    iniciais = min(tentativas, densidade_por_grupo * 3 // 2)
+    grupos_por_lote = max(1, ELEMENTOS_POR_LOTE // (iniciais * 20))
+
+    def validos(mascaras):
+        # Regras rígidas: no máximo 1 repetida do último sorteio e 1 par sequencial
+        return (contar_acertos(mascaras, mascara_ultimo) <= 1) & (contar_pares_sequenciais(mascaras) <= 1)
+
+    universo = ConjuntoJogos()
+    aceitos = []
+    pendentes = 0
+    total = 0
+    grupos = 0
+    while total < qtd_alvo and grupos < max_tentativas_grupos:
+        lote = min(grupos_por_lote, max_tentativas_grupos - grupos)
+        rng = fluxo_numpy(semente, FLUXO_GERACAO, grupos // grupos_por_lote)
+        grupos += lote
+        g20 = _sortear_grupos(rng, potes, lote)
+        mascaras = _sortear_jogos(rng, g20, iniciais)
+        ok = validos(mascaras)
+        indices = indices_de_mascaras(mascaras.ravel()).reshape(mascaras.shape)
+
+        for g in range(lote):
+            limite = min(densidade_por_grupo, qtd_alvo - total)
+            novos = _ineditos(mascaras[g][ok[g]], indices[g][ok[g]], universo, limite)
+            aceitos.append(novos)
+            total += len(novos)
+            pendentes += len(novos)
+            if len(novos) < limite and tentativas > iniciais:
+                # Grupo difícil: completa as tentativas restantes
+                extras = _sortear_jogos(rng, g20[g:g + 1], tentativas - iniciais)[0]
+                extras = extras[validos(extras)]
+                novos = _ineditos(extras, indices_de_mascaras(extras), universo, limite - len(novos))
+                aceitos.append(novos)
+                total += len(novos)
+                pendentes += len(novos)
+            if total >= qtd_alvo:
+                break
+            if tamanho_bloco and pendentes >= tamanho_bloco:
+                yield np.concatenate(aceitos)
+                aceitos, pendentes = [], 0
+
+        if aceitos and not tamanho_bloco:
+            yield np.concatenate(aceitos)
+            aceitos, pendentes = [], 0
+
+    if aceitos:
+        yield np.concatenate(aceitos)
+
+def _ineditos(candidatos, indices, universo, limite):
+    """Até 'limite' jogos distintos (na ordem de sorteio) fora do universo; já entram no universo."""
+    return candidatos[universo.adicionar(indices, limite)]
+
+def gerar_universo_legado(qtd_alvo, ultimo_sorteio, mapa_scores=None, modelo='F4', rng=random):
+    """
+    Implementação original, jogo a jogo (random.sample + validar_jogo_rigid).
+    Mantida para comparação: gerar_universo_filtrado(..., metodo='legado').
+    rng: random.Random (ou o módulo random).
     """
     universo = set()
+    mascara_ultimo = mascara_jogo(ultimo_sorteio)
     potes = classificar_dezenas_por_quadrante(mapa_scores or {})
     
-    # --- CONFIGURAÇÃO DO MODELO ---
-    if modelo == 'F5':
-        # Modelo F5 (Quina): Alta densidade por grupo, poucos grupos.
-        # ~1500 jogos por grupo de 20.
-        densidade_por_grupo = 1500
-    else:
-        # Modelo F4 (Quadra): Baixa densidade, muitos grupos (Padrão).
-        # ~85 jogos por grupo de 20.
-        densidade_por_grupo = 85
-
-    # Cálculo de segurança para o loop não ficar infinito
-    qtd_grupos_estimada = int(qtd_alvo / densidade_por_grupo) + 10
-    max_tentativas_grupos = qtd_grupos_estimada * 10 
+    densidade_por_grupo, max_tentativas_grupos = _config_modelo(qtd_alvo, modelo)
     
     tentativas = 0
     
@@ -88,10 +277,10 @@ def gerar_universo_filtrado(qtd_alvo, ultimo_sorteio, mapa_scores=None, modelo='
         
         # 1. Montar Grupo de 20 (5 de cada Q)
         g20 = []
-        g20.extend(selecionar_5_balanceado(potes['Q1']))
-        g20.extend(selecionar_5_balanceado(potes['Q2']))
-        g20.extend(selecionar_5_balanceado(potes['Q3']))
-        g20.extend(selecionar_5_balanceado(potes['Q4']))
+        g20.extend(selecionar_5_balanceado(potes['Q1'], rng))
+        g20.extend(selecionar_5_balanceado(potes['Q2'], rng))
+        g20.extend(selecionar_5_balanceado(potes['Q3'], rng))
+        g20.extend(selecionar_5_balanceado(potes['Q4'], rng))
         
         # 2. Expansão baseada na Densidade do Modelo
         # Tenta gerar 'densidade_por_grupo' jogos VÁLIDOS dentro desse grupo
@@ -103,13 +292,16 @@ def gerar_universo_filtrado(qtd_alvo, ultimo_sorteio, mapa_scores=None, modelo='
             tentativas_internas += 1
             
             # Sorteia 6 dentro dos 20
-            jogo = tuple(sorted(random.sample(g20, 6)))
+            jogo = mascara_jogo(rng.sample(g20, 6))
             
             if jogo not in universo:
-                if validar_jogo_rigid(jogo, ultimo_sorteio):
+                if validar_jogo_rigid(jogo, mascara_ultimo):
                     universo.add(jogo)
                     jogos_gerados_neste_grupo += 1
                     
-            if len(universo) >= qtd_alvo: return list(universo)
+            if len(universo) >= qtd_alvo: return _como_array(universo)
     
-    return list(universo)
\ No newline at end of file
+    return _como_array(universo)
+
+def _como_array(universo):
+    return np.fromiter(universo, dtype=np.uint64, count=len(universo))
\ No newline at end of file
@@ -0,0 +1,149 @@
+# app/util/gerador_dirigido.py
+"""
+Gerador dirigido (opcional, só com metodo='dirigido' explícito; 'auto' nunca o escolhe):
+jogos com o score máximo (todos os CRITERIOS), uniformes entre todos os que existem.
+
+Um jogo com score máximo atende o critério de quadrantes, então está num dos padrões
+"c1-c2-c3-c4" do alvo (quantas dezenas de cada quadrante de 15). Basta percorrer esses
+padrões: para cada quadrante as C(15, c) sub-escolhas são pré-calculadas com suas
+métricas parciais (máscara, soma, pares, primos, mult3, calor 39/21, máximos do calor,
+menor/maior dezena, linhas/colunas ocupadas), que se compõem por soma, máximo, mínimo
+ou OR de bits. Q1xQ2 e Q3xQ4 são combinados primeiro e o produto das duas metades é
+avaliado em blocos com as tabelas de PerfilCompilado (app/util/pontuacao.py): o
+critério de cada jogo é o mesmo de calcular_pontuacao_binaria. Soma, deltas, pares,
+primos e mult3 vêm antes: quem falha em algum já é descartado.
+
+Por que só o score máximo: abaixo dele entram jogos fora dos padrões de quadrante, que
+esta varredura não enxerga, e a distribuição ficaria enviesada. As demais faixas
+continuam vindo do 'lote' (app/util/gerador.py).
+
+Custo: não é amostragem, é uma varredura de dezenas de milhões de combinações por
+chamada, na ordem de segundos, mais que o 'lote' inteiro. Só vale quando o 'lote' não
+acha jogos suficientes com o score máximo. Dentro do score a escolha é uniforme (as
+menores chaves_aleatorias da semente) e não depende da ordem dos blocos.
+"""
+import itertools
+import numpy as np
+from .config_mega import NUM_DEZENAS_SORTEADAS
+from .features import EH_PRIMO, EH_MULT3, QUADRANTE, LINHA, COLUNA
+from .mascaras import BITS_DEZENAS, mascara_jogo, popcount, contar_acertos, contar_pares_sequenciais
+from .pontuacao import CRITERIOS, PerfilCompilado, criterios_de_metricas, padrao_quadrantes
+from .aleatorio import FLUXO_GERACAO, nova_semente, chaves_aleatorias
+
+ELEMENTOS_POR_BLOCO = 1 << 20
+SCORE_DIRIGIDO = len(CRITERIOS)      # única faixa em que a varredura dos padrões é exata
+
+_DEZENAS_QUADRANTE = [np.flatnonzero(QUADRANTE[1:] == q) + 1 for q in range(4)]
+
+# Avaliados antes (poucas métricas, somas simples); o resto só para quem passou em todos
+_CRITERIOS_BARATOS = ('soma', 'deltas', 'pares', 'primos', 'mult3')
+_CHAVES_CARAS = ('mascara', 'temp39', 'temp21', 'max_rep_39', 'max_rep_21', 'linhas', 'colunas')
+
+
+def _subescolhas(dezenas, qtd, compilado):
+    """Métricas parciais de todas as escolhas de 'qtd' dezenas entre 'dezenas' (arrays alinhados)."""
+    escolhas = list(itertools.combinations(dezenas.tolist(), qtd))
+    escolhas = np.array(escolhas, dtype=np.intp).reshape(len(escolhas), qtd)
+    calor_39, calor_21 = compilado.calor_39[escolhas], compilado.calor_21[escolhas]
+    vazio = qtd == 0
+    return {
+        'mascara': np.bitwise_or.reduce(BITS_DEZENAS[escolhas - 1], axis=1) if not vazio else np.zeros(1, np.uint64),
+        'soma': escolhas.sum(axis=1),
+        'pares': (escolhas % 2 == 0).sum(axis=1),
+        'primos': EH_PRIMO[escolhas].sum(axis=1),
+        'mult3': EH_MULT3[escolhas].sum(axis=1),
+        'temp39': calor_39.sum(axis=1),
+        'temp21': calor_21.sum(axis=1),
+        'max_rep_39': calor_39.max(axis=1) if not vazio else np.zeros(1, np.int64),
+        'max_rep_21': calor_21.max(axis=1) if not vazio else np.zeros(1, np.int64),
+        'menor': escolhas.min(axis=1) if not vazio else np.full(1, 99),
+        'maior': escolhas.max(axis=1) if not vazio else np.zeros(1, np.int64),
+        'linhas': np.bitwise_or.reduce(1 << LINHA[escolhas], axis=1) if not vazio else np.zeros(1, np.int64),
+        'colunas': np.bitwise_or.reduce(1 << COLUNA[escolhas], axis=1) if not vazio else np.zeros(1, np.int64),
+    }
+
+
+def _combinar(a, b):
+    """Produto cartesiano de duas listas de partes (a externo, b interno), compondo as métricas."""
+    na, nb = len(a['soma']), len(b['soma'])
+    return _compor(a, b, np.repeat(np.arange(na), nb), np.tile(np.arange(nb), na))
+
+
+def _compor(a, b, i, j, chaves=None):
+    """Métricas dos pares (a[i], b[j]); chaves: só essas métricas (padrão: todas)."""
+    combinado = {}
+    for chave in (a if chaves is None else chaves):
+        x, y = a[chave][i], b[chave][j]
+        if chave in ('max_rep_39', 'max_rep_21', 'maior'):
+            combinado[chave] = np.maximum(x, y)
+        elif chave == 'menor':
+            combinado[chave] = np.minimum(x, y)
+        elif chave in ('mascara', 'linhas', 'colunas'):
+            combinado[chave] = x | y
+        else:
+            combinado[chave] = x + y
+    return combinado
+
+
+def padroes_alvo(compilado):
+    """Padrões (c1, c2, c3, c4) com 6 dezenas que atendem o critério de quadrantes."""
+    codigos = np.flatnonzero(compilado.tabelas['quadrantes'])
+    padroes = [tuple(int(c) for c in padrao_quadrantes(codigo)) for codigo in codigos.tolist()]
+    return [p for p in padroes if sum(p) == NUM_DEZENAS_SORTEADAS and max(p) <= len(_DEZENAS_QUADRANTE[0])]
+
+
+def gerar_universo_dirigido(qtd, ultimo_sorteio, perfil, mapa_39, mapa_21, semente=None):
+    """
+    Até 'qtd' jogos com score SCORE_DIRIGIDO (todos os critérios), uniformes entre todos os que
+    passam nas regras rígidas de validar_jogo_rigid. Retorna array uint64 de máscaras,
+    na ordem da chave aleatória da semente.
+    """
+    semente = nova_semente() if semente is None else semente
+    if qtd <= 0:
+        return np.empty(0, dtype=np.uint64)
+    compilado = PerfilCompilado(perfil, mapa_39, mapa_21)
+    mascara_ultimo = np.uint64(mascara_jogo(ultimo_sorteio))
+    chaves, guardados = np.empty(0, dtype=np.uint64), np.empty(0, dtype=np.uint64)
+
+    subescolhas = {}
+    for padrao in padroes_alvo(compilado):
+        partes = []
+        for q, qtd_q in enumerate(padrao):
+            if (q, qtd_q) not in subescolhas:
+                subescolhas[q, qtd_q] = _subescolhas(_DEZENAS_QUADRANTE[q], qtd_q, compilado)
+            partes.append(subescolhas[q, qtd_q])
+        metade_a = _combinar(partes[0], partes[1])
+        metade_b = _combinar(partes[2], partes[3])
+        na, nb = len(metade_a['soma']), len(metade_b['soma'])
+        passo = max(1, ELEMENTOS_POR_BLOCO // nb)
+
+        for ini in range(0, na, passo):
+            fim = min(ini + passo, na)
+            i, j = np.repeat(np.arange(ini, fim), nb), np.tile(np.arange(nb), fim - ini)
+            # 1a etapa (métricas baratas): todas precisam atender
+            baratas = _compor(metade_a, metade_b, i, j, ('soma', 'pares', 'primos', 'mult3', 'menor', 'maior'))
+            baratas['deltas'] = baratas['maior'] - baratas['menor']
+            passam = np.logical_and.reduce([compilado.tabelas[c][baratas[c]] for c in _CRITERIOS_BARATOS])
+            i, j = i[passam], j[passam]
+            jogos = _compor(metade_a, metade_b, i, j, _CHAVES_CARAS)
+            mascaras = jogos['mascara']
+            metricas = {c: baratas[c][passam] for c in _CRITERIOS_BARATOS}
+            metricas.update({
+                'temp39': jogos['temp39'], 'temp21': jogos['temp21'],
+                'linhas': popcount(jogos['linhas'].astype(np.uint64)),
+                'colunas': popcount(jogos['colunas'].astype(np.uint64)),
+                'max_rep_39': jogos['max_rep_39'], 'max_rep_21': jogos['max_rep_21'],
+                'quadrantes': np.full(len(mascaras), padrao[0] * 343 + padrao[1] * 49 + padrao[2] * 7 + padrao[3]),
+            })
+            scores = popcount(criterios_de_metricas(metricas, compilado).astype(np.uint64))
+            validos = (contar_acertos(mascaras, mascara_ultimo) <= 1) & (contar_pares_sequenciais(mascaras) <= 1)
+            novos = mascaras[validos & (scores == SCORE_DIRIGIDO)]
+            if len(novos) == 0:
+                continue
+            chaves = np.concatenate((chaves, chaves_aleatorias(novos, semente, FLUXO_GERACAO)))
+            guardados = np.concatenate((guardados, novos))
+            if len(guardados) > qtd:
+                manter = np.argpartition(chaves, qtd - 1)[:qtd]
+                chaves, guardados = chaves[manter], guardados[manter]
+
+    return guardados[np.argsort(chaves)]
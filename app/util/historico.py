@@ -0,0 +1,195 @@
+# app/util/historico.py
+import os
+import threading
+import time
+import numpy as np
+import pandas as pd
+from app.util.config_mega import TABLE_NAME, NUM_DEZENAS_SORTEADAS
+from app.util.matriz import MatrizSorteios
+from app.util.features import carregar_features
+from app.util.banco import conexao_leitura
+from app.util.snapshot import (caminho_snapshot, ler_cabecalho, matriz_do_snapshot, dataframe_da_matriz,
+                               consultar_versao, versao_do_cabecalho, soma_verificacao)
+from app.util.agregados import AgregadosPainel, caminho_agregados, estender
+
+COLS_BOLAS = [f'Bola{i}' for i in range(1, NUM_DEZENAS_SORTEADAS + 1)]
+
+
+class HistoricoSorteios:
+    """
+    Cache do histórico de sorteios, compartilhado por todo o processo.
+    - Carrega o banco uma única vez (direto do snapshot binário mapeado em memória,
+      app/util/snapshot.py, quando ele está em dia com o banco).
+    - A cada acesso confere (via mtime do arquivo) se o coletor gravou algo.
+    - Se gravou, busca apenas os concursos com número maior que o último em memória
+      e anexa ao DataFrame. Qualquer outra mudança (linhas apagadas/alteradas, que a
+      soma de verificação do conteúdo denuncia) força uma recarga completa.
+    O DataFrame devolvido é compartilhado: trate como somente leitura.
+    """
+
+    def __init__(self, db_path):
+        self.db_path = db_path
+        self._lock = threading.Lock()
+        self._df = None
+        self._matriz = None
+        self._matriz_base = None
+        self._indices_anteriores = {}
+        self._agregados = None
+        self._assinatura = None
+        self.ultimo_concurso = 0
+        self.total = 0
+        self.soma_verificacao = 0
+        self.atualizado_em = None
+
+    @property
+    def versao(self):
+        """Identifica o estado atual do histórico: (último concurso, qtd de linhas, soma de verificação)."""
+        return (self.ultimo_concurso, self.total, self.soma_verificacao)
+
+    def obter(self):
+        with self._lock:
+            assinatura = self._assinatura_arquivo()
+            if self._df is None or assinatura != self._assinatura:
+                self._sincronizar()
+                self._assinatura = assinatura
+            return self._df
+
+    def obter_versionado(self):
+        """(DataFrame, versao) lidos juntos, para chaves de cache consistentes."""
+        self.obter()
+        with self._lock:
+            return self._df, self.versao
+
+    def obter_matriz(self):
+        """MatrizSorteios da versão atual (montada uma única vez por versão)."""
+        self.obter()
+        with self._lock:
+            if self._matriz is None:
+                m = self._matriz_base if self._matriz_base is not None else MatrizSorteios.de_dataframe(self._df)
+                # Features persistidas pelo coletor; se faltar algo são calculadas sob demanda
+                m.features = carregar_features(conexao_leitura(self.db_path), m)
+                # Índices que sabem se estender (ex: ciclos) continuam da versão anterior
+                for nome, indice in self._indices_anteriores.items():
+                    if hasattr(indice, 'estender'):
+                        m._indices[nome] = indice.estender(m)
+                self._indices_anteriores = {}
+                self._matriz = m
+            return self._matriz
+
+    def obter_agregados(self):
+        """
+        AgregadosPainel da versão atual. Entre versões o estado é só estendido com os
+        sorteios novos; na primeira vez vem do arquivo gravado pelo coletor (se bater
+        com o histórico) ou é reconstruído a partir da matriz.
+        """
+        m = self.obter_matriz()
+        with self._lock:
+            ag = self._agregados
+            if ag is None or not self._agregados_compativeis(ag, m):
+                ag = AgregadosPainel.carregar(caminho_agregados(self.db_path))
+                if ag is None or not self._agregados_compativeis(ag, m):
+                    ag = AgregadosPainel.reconstruir(m)
+            if ag.total < len(m):
+                estender(ag, m.concursos[ag.total:].tolist(), m.dezenas[ag.total:].tolist())
+            self._agregados = ag
+            return ag
+
+    @staticmethod
+    def _agregados_compativeis(ag, m):
+        # O estado cobre um prefixo do histórico atual (mesma qtd de linhas até o último concurso)
+        if ag.total == 0:
+            return True
+        return ag.total <= len(m) and int(m.concursos[ag.total - 1]) == ag.ultimo_concurso
+
+    def _assinatura_arquivo(self):
+        # Inclui o arquivo -wal para enxergar gravações ainda não consolidadas
+        assinatura = []
+        for caminho in (self.db_path, self.db_path + '-wal'):
+            try:
+                st = os.stat(caminho)
+                assinatura.append((st.st_mtime_ns, st.st_size))
+            except OSError:
+                assinatura.append(None)
+        return tuple(assinatura)
+
+    def _consultar(self, query, params=()):
+        return pd.read_sql_query(query, conexao_leitura(self.db_path), params=params)
+
+    def _sincronizar(self):
+        query_base = f"SELECT Concurso, Data, {', '.join(COLS_BOLAS)} FROM {TABLE_NAME}"
+        try:
+            versao_db = consultar_versao(conexao_leitura(self.db_path))
+            ultimo_db, total_db, _ = versao_db
+            if self._df is not None and versao_db == self.versao:
+                return
+            m = self._matriz_do_snapshot(versao_db)
+            if m is not None:
+                self._definir(dataframe_da_matriz(m), m)
+                return
+            if self._df is not None and not self._df.empty:
+                if ultimo_db > self.ultimo_concurso and total_db > self.total:
+                    novos = self._consultar(f"{query_base} WHERE Concurso > ? ORDER BY Concurso ASC", (self.ultimo_concurso,))
+                    df = pd.concat([self._df, novos], ignore_index=True)
+                    # Só anexa se o que já estava em memória não mudou no banco
+                    if len(df) == total_db and self._soma_do_dataframe(df) == versao_db[2]:
+                        self._definir(df)
+                        return
+            self._definir(self._consultar(f"{query_base} ORDER BY Concurso ASC"))
+        except Exception as e:
+            print(f"Erro DB: {e}")
+            if self._df is None:
+                self._definir(pd.DataFrame())
+
+    def _matriz_do_snapshot(self, versao_db):
+        # Snapshot binário gravado pelo coletor: só vale se bater com o banco
+        caminho = caminho_snapshot(self.db_path)
+        cab = ler_cabecalho(caminho)
+        if cab is None or versao_do_cabecalho(cab) != versao_db:
+            return None
+        return matriz_do_snapshot(caminho)
+
+    def _definir(self, df, matriz=None):
+        if self._matriz is not None:
+            self._indices_anteriores = self._matriz._indices
+        self._df = df
+        self._matriz = None
+        self._matriz_base = matriz
+        self.total = len(df)
+        self.ultimo_concurso = int(df['Concurso'].iloc[-1]) if not df.empty else 0
+        self.soma_verificacao = self._soma_do_dataframe(df)
+        self.atualizado_em = time.time()
+
+    @staticmethod
+    def _soma_do_dataframe(df):
+        if df.empty:
+            return 0
+        return soma_verificacao(df['Concurso'].to_numpy(), df[COLS_BOLAS].to_numpy(dtype=np.float64))
+
+
+_caches = {}
+_caches_lock = threading.Lock()
+
+
+def obter_cache_historico(db_path):
+    """Devolve o cache único do processo para o banco informado."""
+    chave = os.path.abspath(db_path)
+    with _caches_lock:
+        cache = _caches.get(chave)
+        if cache is None:
+            cache = _caches[chave] = HistoricoSorteios(chave)
+        return cache
+
+
+def obter_historico(db_path):
+    """Atalho: DataFrame (Concurso, Data, Bola1..Bola6) em ordem crescente de concurso."""
+    return obter_cache_historico(db_path).obter()
+
+
+def obter_matriz(db_path):
+    """Atalho: MatrizSorteios do histórico atual."""
+    return obter_cache_historico(db_path).obter_matriz()
+
+
+def obter_agregados(db_path):
+    """Atalho: agregados incrementais do dashboard (app/util/agregados.py)."""
+    return obter_cache_historico(db_path).obter_agregados()
@@ -0,0 +1,50 @@
+# app/util/janelas.py
+"""
+Janelas móveis sobre o histórico, a partir da incidência acumulada (MatrizSorteios.acumulada).
+
+Frequência de cada dezena nos W sorteios anteriores ao sorteio i:
+    acumulada[i] - acumulada[i - W]
+Uma subtração de matrizes responde para todos os i e qualquer W, sem refazer
+um Counter por sorteio (antes: O(N·W); agora: O(N·60)).
+
+Convenção herdada dos analisadores: sorteios com i < W não têm janela completa e
+ficam com Temp/MaxRep = 0 (quem consome descarta os W primeiros).
+"""
+import numpy as np
+
+
+def frequencia_janela(m, janela, linhas=None):
+    """
+    (len(linhas), 60) int32: quantas vezes cada dezena saiu nos 'janela' sorteios
+    anteriores a cada linha (janela parcial quando linha < janela).
+    """
+    acc = m.acumulada
+    linhas = np.arange(len(m)) if linhas is None else np.asarray(linhas, dtype=np.intp)
+    return acc[linhas] - acc[np.maximum(linhas - janela, 0)]
+
+
+def frequencia_antes(m, idx, janela):
+    """(60,) frequências na janela anterior ao sorteio idx (idx = len(m) -> após o último)."""
+    acc = m.acumulada
+    return acc[idx] - acc[max(idx - janela, 0)]
+
+
+def temperatura_janela(m, janela):
+    """
+    (temp, max_rep) de cada sorteio, arrays (N,) int32:
+    - temp:    soma das frequências das 6 dezenas sorteadas na janela anterior
+    - max_rep: maior dessas frequências
+    Memorizado na matriz por janela (e herdado pelos recortes).
+    """
+    if janela not in m._janelas:
+        n = len(m)
+        temp = np.zeros(n, dtype=np.int32)
+        max_rep = np.zeros(n, dtype=np.int32)
+        if n > janela:
+            linhas = np.arange(janela, n)
+            freq = frequencia_janela(m, janela, linhas)
+            valores = np.take_along_axis(freq, m.dezenas[linhas].astype(np.intp) - 1, axis=1)
+            temp[janela:] = valores.sum(axis=1)
+            max_rep[janela:] = valores.max(axis=1)
+        m._janelas[janela] = (temp, max_rep)
+    return m._janelas[janela]
@@ -0,0 +1,73 @@
+# app/util/mascaras.py
+"""
+Representação de jogos/sorteios como máscara de 60 bits (bit d-1 aceso = dezena d).
+Um jogo cabe num uint64, então universos inteiros viram arrays NumPy compactos
+(8 bytes por jogo) e interseções/acertos/sequenciais viram operações de bits.
+"""
+import numpy as np
+from .config_mega import UNIVERSO_DEZENAS, NUM_DEZENAS_SORTEADAS
+
+BITS_DEZENAS = np.left_shift(np.uint64(1), np.arange(UNIVERSO_DEZENAS, dtype=np.uint64))
+MASCARA_UNIVERSO = (1 << UNIVERSO_DEZENAS) - 1
+
+# Tabela de popcount por byte, usada quando o NumPy não tem bitwise_count (< 2.0)
+_POPCOUNT_BYTE = np.array([bin(i).count('1') for i in range(256)], dtype=np.uint8)
+
+
+def mascara_jogo(jogo):
+    """Máscara (int Python) de uma coleção de dezenas."""
+    m = 0
+    for d in jogo:
+        m |= 1 << (int(d) - 1)
+    return m
+
+
+def dezenas_mascara(mascara):
+    """Dezenas (ordenadas) de uma máscara int."""
+    mascara = int(mascara)
+    return [d + 1 for d in range(UNIVERSO_DEZENAS) if mascara >> d & 1]
+
+
+def mascaras_de_jogos(jogos):
+    """(M,6) dezenas -> (M,) uint64."""
+    jogos = np.asarray(jogos, dtype=np.intp).reshape(-1, NUM_DEZENAS_SORTEADAS)
+    if len(jogos) == 0:
+        return np.empty(0, dtype=np.uint64)
+    return np.bitwise_or.reduce(BITS_DEZENAS[jogos - 1], axis=1)
+
+
+def jogos_de_mascaras(mascaras, qtd_dezenas=NUM_DEZENAS_SORTEADAS):
+    """(M,) uint64 -> (M,qtd_dezenas) uint8, dezenas em ordem crescente (isola o bit mais baixo, qtd_dezenas vezes)."""
+    restante = np.array(mascaras, dtype=np.uint64)
+    jogos = np.empty((len(restante), qtd_dezenas), dtype=np.uint8)
+    for j in range(qtd_dezenas):
+        menor = restante & (~restante + np.uint64(1))
+        # potência de 2 -> expoente exato em float64
+        jogos[:, j] = np.log2(menor.astype(np.float64)).astype(np.uint8) + 1
+        restante ^= menor
+    return jogos
+
+
+def popcount(valores):
+    """Quantidade de bits acesos em cada elemento de um array uint64."""
+    valores = np.asarray(valores, dtype=np.uint64)
+    if hasattr(np, 'bitwise_count'):
+        return np.bitwise_count(valores)
+    bytes_ = np.ascontiguousarray(valores).reshape(-1, 1).view(np.uint8)
+    return _POPCOUNT_BYTE[bytes_].sum(axis=1, dtype=np.uint8).reshape(valores.shape)
+
+
+def contar_acertos(mascaras, mascara_sorteio):
+    """Acertos de cada jogo contra um sorteio (ou qualquer conjunto de dezenas)."""
+    return popcount(np.asarray(mascaras, dtype=np.uint64) & np.uint64(mascara_sorteio))
+
+
+def contar_pares_sequenciais(mascaras):
+    """Pares de dezenas consecutivas (ex: 14-15) em cada jogo: bits vizinhos acesos."""
+    mascaras = np.asarray(mascaras, dtype=np.uint64)
+    return popcount(mascaras & (mascaras >> np.uint64(1)))
+
+
+def remover_duplicados(mascaras):
+    """Jogos únicos (ordenados pela máscara)."""
+    return np.unique(np.asarray(mascaras, dtype=np.uint64))
@@ -0,0 +1,128 @@
+# app/util/matriz.py
+import numpy as np
+import pandas as pd
+from app.util.config_mega import NUM_DEZENAS_SORTEADAS, UNIVERSO_DEZENAS
+
+COLS_BOLAS = [f'Bola{i}' for i in range(1, NUM_DEZENAS_SORTEADAS + 1)]
+
+
+class MatrizSorteios:
+    """
+    Estrutura canônica do histórico, montada uma vez por versão do histórico
+    e usada como entrada por todos os analisadores.
+    - concursos:   (N,)   int32  -> número do concurso de cada linha
+    - dezenas:     (N,6)  uint8  -> dezenas sorteadas, ordenadas por linha
+    - incidencia:  (N,60) uint8  -> incidencia[i, d-1] = 1 se a dezena d saiu no sorteio i
+    - datas:       (N,)   object -> data do sorteio (texto, como no banco) ou None
+    - features:    dict {indicador: (N,) array} -> ver app/util/features.py (None até carregar)
+    - acumulada:   (N+1,60) int32 -> acumulada[i, d-1] = vezes que d saiu nos sorteios 0..i-1
+                   (montada sob demanda; base das janelas móveis em app/util/janelas.py)
+    - indice(nome, construir): índices derivados do histórico completo (ex: aparições
+                   por dezena em app/util/aparicoes.py), montados uma vez na matriz raiz
+                   e compartilhados com todos os recortes, que os consultam no seu corte.
+    """
+
+    def __init__(self, concursos, dezenas, datas=None):
+        self.concursos = np.asarray(concursos, dtype=np.int32)
+        self.dezenas = np.sort(np.asarray(dezenas, dtype=np.uint8).reshape(-1, NUM_DEZENAS_SORTEADAS), axis=1)
+        self.datas = datas
+        self.incidencia = np.zeros((len(self.dezenas), UNIVERSO_DEZENAS), dtype=np.uint8)
+        self.incidencia[np.arange(len(self.dezenas))[:, None], self.dezenas.astype(np.intp) - 1] = 1
+        self.features = None
+        self._posicoes = None
+        self._acumulada = None
+        self._janelas = {}
+        self._indices = {}
+        self._raiz = None
+
+    @classmethod
+    def de_dataframe(cls, df):
+        # Linhas incompletas (coleta parcial) ou fora de 1..60 ficam de fora, antes do cast para uint8
+        df = df.dropna(subset=COLS_BOLAS) if not df.empty else df
+        if not df.empty:
+            bolas = df[COLS_BOLAS].to_numpy(dtype=np.float64)
+            df = df[((bolas >= 1) & (bolas <= UNIVERSO_DEZENAS) & (bolas == np.floor(bolas))).all(axis=1)]
+        if df.empty:
+            return cls(np.empty(0, dtype=np.int32), np.empty((0, NUM_DEZENAS_SORTEADAS), dtype=np.uint8))
+        datas = df['Data'].to_numpy(dtype=object) if 'Data' in df.columns else None
+        return cls(df['Concurso'].to_numpy(), df[COLS_BOLAS].to_numpy(dtype=np.uint8), datas)
+
+    @classmethod
+    def de_arrays(cls, concursos, dezenas, datas=None):
+        """
+        Usa os arrays como estão, sem cópia (ex: views de np.memmap do snapshot).
+        As dezenas já devem vir ordenadas por linha, em uint8.
+        """
+        m = cls.__new__(cls)
+        m.concursos = concursos
+        m.dezenas = dezenas
+        m.datas = datas
+        m.incidencia = np.zeros((len(dezenas), UNIVERSO_DEZENAS), dtype=np.uint8)
+        m.incidencia[np.arange(len(dezenas))[:, None], dezenas.astype(np.intp) - 1] = 1
+        m.features = None
+        m._posicoes = None
+        m._acumulada = None
+        m._janelas = {}
+        m._indices = {}
+        m._raiz = None
+        return m
+
+    def __len__(self):
+        return len(self.dezenas)
+
+    @property
+    def vazia(self):
+        return len(self.dezenas) == 0
+
+    def posicao(self, concurso):
+        """Linha (0..N-1) do concurso informado, ou None se não existir."""
+        if self._posicoes is None:
+            self._posicoes = {int(c): i for i, c in enumerate(self.concursos.tolist())}
+        return self._posicoes.get(int(concurso))
+
+    @property
+    def acumulada(self):
+        if self._acumulada is None:
+            acc = np.zeros((len(self.dezenas) + 1, UNIVERSO_DEZENAS), dtype=np.int32)
+            np.cumsum(self.incidencia, axis=0, dtype=np.int32, out=acc[1:])
+            self._acumulada = acc
+        return self._acumulada
+
+    def indice(self, nome, construir):
+        """
+        Índice 'nome' montado por construir(matriz_raiz) na primeira chamada. Os
+        índices só respondem por prefixos (consultas com corte <= len da raiz), por
+        isso um único índice atende a matriz e todos os seus recortes.
+        """
+        if nome not in self._indices:
+            self._indices[nome] = construir(self._raiz if self._raiz is not None else self)
+        return self._indices[nome]
+
+    def lista_dezenas(self):
+        """Dezenas de cada sorteio como listas de int (para os laços que ainda são Python puro)."""
+        return self.dezenas.tolist()
+
+    def recorte(self, fim):
+        """Prefixo com as 'fim' primeiras linhas (views, sem cópia)."""
+        novo = MatrizSorteios.__new__(MatrizSorteios)
+        novo.concursos = self.concursos[:fim]
+        novo.dezenas = self.dezenas[:fim]
+        novo.incidencia = self.incidencia[:fim]
+        novo.datas = self.datas[:fim] if self.datas is not None else None
+        novo.features = {k: v[:fim] for k, v in self.features.items()} if self.features is not None else None
+        novo._posicoes = None
+        # Tudo que só depende do passado continua válido no prefixo
+        novo._acumulada = self._acumulada[:fim + 1] if self._acumulada is not None else None
+        novo._janelas = {j: tuple(v[:fim] for v in serie) for j, serie in self._janelas.items()}
+        novo._indices = self._indices
+        novo._raiz = self._raiz if self._raiz is not None else self
+        return novo
+
+
+def como_matriz(dados):
+    """Aceita um DataFrame do histórico ou uma MatrizSorteios e devolve a matriz."""
+    if isinstance(dados, MatrizSorteios):
+        return dados
+    if isinstance(dados, pd.DataFrame):
+        return MatrizSorteios.de_dataframe(dados)
+    raise TypeError(f"Histórico em formato não suportado: {type(dados).__name__}")
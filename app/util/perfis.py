@@ -0,0 +1,163 @@
+# app/util/perfis.py
+"""
+Perfis preditivos (gerar_perfil_preditivo_completo) memorizados por corte do histórico.
+
+O mesmo perfil é pedido várias vezes: cada /teste-preditivo, cada /simular-cenario
+e cada id de /simular-lote (lotes sobrepostos repetem cortes). O perfil só depende
+do prefixo de treino, da configuração e do código do motor, então a chave é:
+    (último concurso, qtd de linhas, hash do conteúdo do prefixo, hash de CONFIG_PERFIL)
+Correção de um sorteio já gravado muda o hash do conteúdo. Mudança no código que
+produz o perfil (analise_preditiva e o que ela usa) exige subir VERSAO_PERFIL, que
+entra em CONFIG_PERFIL: o perfil antigo em disco deixa de bater. O código não é
+lido em tempo de execução (no executável do PyInstaller não há fonte).
+- Memória: LRU com até TAMANHO_LRU perfis por banco.
+- Disco: SQLite ao lado do banco (megasena_db.perfis.sqlite3), perfil em pickle.
+  Sobrevive a reinícios do servidor e é compartilhado entre processos.
+O perfil devolvido é compartilhado: trate como somente leitura.
+"""
+import hashlib
+import json
+import os
+import pickle
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+import numpy as np
+from .analise_preditiva import gerar_perfil_preditivo_completo
+from .banco import conexao_leitura, transacao
+
+TAMANHO_LRU = 256
+TABELA_PERFIS = 'perfis'
+
+# Subir a cada mudança no cálculo do perfil (analise_preditiva e módulos que ela usa)
+VERSAO_PERFIL = 2
+
+# Tudo que muda o resultado do perfil para um mesmo prefixo
+CONFIG_PERFIL = {
+    'versao': VERSAO_PERFIL,
+    'janelas_temp': [39, 21],
+    'z_critico': 2.0,
+}
+
+
+def hash_config(config=CONFIG_PERFIL):
+    dados = json.dumps(config, sort_keys=True)
+    return hashlib.sha1(dados.encode('utf-8')).hexdigest()[:12]
+
+
+def hash_historico(m):
+    """Hash do conteúdo do prefixo (concursos e dezenas), independente do dtype de origem."""
+    sha = hashlib.sha1(np.ascontiguousarray(m.concursos, dtype='<i8').tobytes())
+    sha.update(np.ascontiguousarray(m.dezenas, dtype=np.uint8).tobytes())
+    return sha.hexdigest()[:12]
+
+
+def caminho_perfis(db_path):
+    """megasena_db.sqlite3 -> megasena_db.perfis.sqlite3 (mesma pasta)."""
+    return os.path.splitext(db_path)[0] + '.perfis.sqlite3'
+
+
+class CachePerfis:
+    """LRU em memória + (opcional) tabela em disco. Sem caminho: só memória."""
+
+    def __init__(self, caminho=None, tamanho=TAMANHO_LRU, config=CONFIG_PERFIL):
+        self.caminho = caminho
+        self.tamanho = tamanho
+        self.hash_config = hash_config(config)
+        self._memoria = OrderedDict()
+        self._lock = threading.Lock()
+        self._disco_pronto = False
+        self.acertos = 0
+        self.calculados = 0
+
+    def chave(self, m):
+        ultimo = int(m.concursos[-1]) if len(m) else 0
+        return f"{ultimo}:{len(m)}:{hash_historico(m)}:{self.hash_config}"
+
+    def obter(self, m):
+        """Perfil preditivo da matriz (ou recorte) m: memória, depois disco, depois calcula."""
+        chave = self.chave(m)
+        with self._lock:
+            predicao = self._memoria.get(chave)
+            if predicao is not None:
+                self._memoria.move_to_end(chave)
+                self.acertos += 1
+                return predicao
+
+        predicao = self._ler_disco(chave)
+        if predicao is None:
+            predicao = gerar_perfil_preditivo_completo(m)
+            self.calculados += 1
+            self._gravar_disco(chave, m, predicao)
+        else:
+            self.acertos += 1
+
+        with self._lock:
+            self._memoria[chave] = predicao
+            self._memoria.move_to_end(chave)
+            while len(self._memoria) > self.tamanho:
+                self._memoria.popitem(last=False)
+        return predicao
+
+    def limpar(self):
+        with self._lock:
+            self._memoria.clear()
+
+    # --- Disco ---
+
+    def _preparar_disco(self):
+        if not self._disco_pronto:
+            with transacao(self.caminho) as conn:
+                conn.execute(f"""
+                CREATE TABLE IF NOT EXISTS {TABELA_PERFIS} (
+                    chave TEXT PRIMARY KEY,
+                    concurso INTEGER,
+                    criado_em REAL,
+                    dados BLOB
+                );""")
+            self._disco_pronto = True
+
+    def _ler_disco(self, chave):
+        if self.caminho is None:
+            return None
+        try:
+            self._preparar_disco()
+            linha = conexao_leitura(self.caminho).execute(
+                f"SELECT dados FROM {TABELA_PERFIS} WHERE chave = ?", (chave,)).fetchone()
+            return pickle.loads(linha[0]) if linha else None
+        except (sqlite3.Error, OSError, pickle.UnpicklingError) as e:
+            print(f"Erro ao ler perfil em cache ({chave}): {e}")
+            return None
+
+    def _gravar_disco(self, chave, m, predicao):
+        if self.caminho is None:
+            return
+        try:
+            self._preparar_disco()
+            dados = pickle.dumps(predicao, protocol=pickle.HIGHEST_PROTOCOL)
+            with transacao(self.caminho) as conn:
+                conn.execute(f"INSERT OR REPLACE INTO {TABELA_PERFIS} (chave, concurso, criado_em, dados) "
+                             f"VALUES (?, ?, ?, ?)", (chave, int(m.concursos[-1]) if len(m) else 0, time.time(), dados))
+        except (sqlite3.Error, OSError) as e:
+            # Disco indisponível (ex: somente leitura): segue só com a memória
+            print(f"Erro ao gravar perfil em cache ({chave}): {e}")
+
+
+_caches = {}
+_caches_lock = threading.Lock()
+
+
+def obter_cache_perfis(db_path=None):
+    """Cache único do processo para o banco informado (None = só memória)."""
+    chave = os.path.abspath(db_path) if db_path else None
+    with _caches_lock:
+        cache = _caches.get(chave)
+        if cache is None:
+            cache = _caches[chave] = CachePerfis(caminho_perfis(chave) if chave else None)
+        return cache
+
+
+def perfil_preditivo(m, db_path=None):
+    """Atalho: gerar_perfil_preditivo_completo(m) memorizado pelo corte do histórico."""
+    return obter_cache_perfis(db_path).obter(m)
@@ -1,5 +1,12 @@
 # app/util/pontuacao.py
-from .config_mega import LISTA_PRIMOS, LISTA_MULTIPLOS_3, LISTA_FIBONACCI
+import numpy as np
+from .config_mega import LISTA_PRIMOS, LISTA_MULTIPLOS_3, LISTA_FIBONACCI, UNIVERSO_DEZENAS, NUM_DEZENAS_SORTEADAS
+from .mascaras import jogos_de_mascaras, popcount
+from .features import EH_PRIMO, EH_MULT3, QUADRANTE, LINHA, COLUNA
+
+# Ordem dos bits devolvidos por calcular_criterios_binarios
+CRITERIOS = ['soma', 'deltas', 'temp39', 'temp21', 'pares', 'primos', 'mult3',
+             'linhas', 'colunas', 'max_rep_39', 'max_rep_21', 'quadrantes']
 
 def classificar_faixa(valor, limites):
     """
@@ -15,11 +22,23 @@ def classificar_faixa(valor, limites):
     if valor <= mu + 1.5*sigma: return "Alto"
     return "Muito Alto"
 
-def calcular_pontuacao_binaria(jogo, perfil, mapa_39, mapa_21):
+def atende_max_rep(max_r, alvos):
+    """max_r (texto) contra os alvos de MaxRep: valores exatos ou ">=N"."""
+    # Correção para lidar com ">=10" ou valores exatos
+    for alvo in alvos:
+        if ">=" in str(alvo):
+            limite = int(str(alvo).replace(">=", "").strip())
+            if int(max_r) >= limite: return True
+        elif str(alvo) == max_r:
+            return True
+    return False
+
+def calcular_criterios_binarios(jogo, perfil, mapa_39, mapa_21):
     """
-    Calcula o Score (0 a 12 pontos) comparando o jogo com o Perfil Alvo.
+    Confere o jogo contra cada critério do Perfil Alvo.
+    Retorna máscara de 12 bits: bit k aceso = critério CRITERIOS[k] atendido.
     """
-    score = 0
+    criterios = 0
     dezenas = sorted(jogo)
     
     # --- GRUPO A: Faixas Numéricas (Requer limites mu/sigma) ---
@@ -27,36 +46,36 @@ def calcular_pontuacao_binaria(jogo, perfil, mapa_39, mapa_21):
     # 1. Soma
     soma = sum(dezenas)
     cat = classificar_faixa(soma, perfil['soma']['limites'])
-    if cat in perfil['soma']['alvo']: score += 1
+    if cat in perfil['soma']['alvo']: criterios |= 1 << 0
     
     # 2. Deltas
     deltas = sum([dezenas[i+1]-dezenas[i] for i in range(5)])
     cat = classificar_faixa(deltas, perfil['deltas']['limites'])
-    if cat in perfil['deltas']['alvo']: score += 1
+    if cat in perfil['deltas']['alvo']: criterios |= 1 << 1
 
     # 3. Temp 39
     t39 = sum([mapa_39.get(d, 0) for d in dezenas])
     cat = classificar_faixa(t39, perfil['temp39']['limites'])
-    if cat in perfil['temp39']['alvo']: score += 1
+    if cat in perfil['temp39']['alvo']: criterios |= 1 << 2
     
     # 4. Temp 21
     t21 = sum([mapa_21.get(d, 0) for d in dezenas])
     cat = classificar_faixa(t21, perfil['temp21']['limites'])
-    if cat in perfil['temp21']['alvo']: score += 1
+    if cat in perfil['temp21']['alvo']: criterios |= 1 << 3
 
     # --- GRUPO B: Contagem Direta (Listas de inteiros) ---
     
     # 5. Pares
     n = len([x for x in dezenas if x % 2 == 0])
-    if n in perfil['pares']['alvo']: score += 1
+    if n in perfil['pares']['alvo']: criterios |= 1 << 4
     
     # 6. Primos
     n = len([x for x in dezenas if x in LISTA_PRIMOS])
-    if n in perfil['primos']['alvo']: score += 1
+    if n in perfil['primos']['alvo']: criterios |= 1 << 5
     
     # 7. Múltiplos de 3
     n = len([x for x in dezenas if x in LISTA_MULTIPLOS_3])
-    if n in perfil['mult3']['alvo']: score += 1
+    if n in perfil['mult3']['alvo']: criterios |= 1 << 6
     
     # --- GRUPO C: Categóricos (String vs Int corrigido) ---
     
@@ -64,37 +83,22 @@ def calcular_pontuacao_binaria(jogo, perfil, mapa_39, mapa_21):
     n_linhas = len(set([(d-1)//10 for d in dezenas]))
     # Converte alvo para string para garantir match (ex: 3 vs "3")
     alvos_str = [str(x) for x in perfil['linhas']['alvo']]
-    if str(n_linhas) in alvos_str: score += 1
+    if str(n_linhas) in alvos_str: criterios |= 1 << 7
     
     # 9. Colunas
     n_cols = len(set([(d-1)%10 for d in dezenas]))
     alvos_str = [str(x) for x in perfil['colunas']['alvo']]
-    if str(n_cols) in alvos_str: score += 1
+    if str(n_cols) in alvos_str: criterios |= 1 << 8
     
     # 10. Max Repetição 39
     freqs = [mapa_39.get(d, 0) for d in dezenas]
     max_r = str(max(freqs)) if freqs else "0"
-    # Correção para lidar com ">=10" ou valores exatos
-    match_mr = False
-    for alvo in perfil['max_rep_39']['alvo']:
-        if ">=" in str(alvo):
-            limite = int(str(alvo).replace(">=", "").strip())
-            if int(max_r) >= limite: match_mr = True
-        elif str(alvo) == max_r:
-            match_mr = True
-    if match_mr: score += 1
+    if atende_max_rep(max_r, perfil['max_rep_39']['alvo']): criterios |= 1 << 9
     
     # 11. Max Repetição 21
     freqs = [mapa_21.get(d, 0) for d in dezenas]
     max_r = str(max(freqs)) if freqs else "0"
-    match_mr = False
-    for alvo in perfil['max_rep_21']['alvo']:
-        if ">=" in str(alvo):
-            limite = int(str(alvo).replace(">=", "").strip())
-            if int(max_r) >= limite: match_mr = True
-        elif str(alvo) == max_r:
-            match_mr = True
-    if match_mr: score += 1
+    if atende_max_rep(max_r, perfil['max_rep_21']['alvo']): criterios |= 1 << 10
 
     # --- GRUPO D: Novos Indicadores (Faltava Quadrantes) ---
 
@@ -116,6 +120,153 @@ def calcular_pontuacao_binaria(jogo, perfil, mapa_39, mapa_21):
     # Normaliza o alvo removendo traços (ex: "2-2-1-1" vira "2211")
     alvos_quad = [str(x).replace('-', '') for x in perfil['quadrantes']['alvo']]
     
-    if perfil_atual in alvos_quad: score += 1
+    if perfil_atual in alvos_quad: criterios |= 1 << 11
     
-    return score
\ No newline at end of file
+    return criterios
+
+class PerfilCompilado:
+    """
+    Perfil alvo + mapas de calor montados uma vez para pontuar jogos em lote.
+    Todas as métricas de um jogo são inteiras (somas, contagens, máximos do mapa de
+    calor), então cada critério vira uma tabela 'valor -> atende?' montada com a
+    mesma lógica de calcular_criterios_binarios (classificar_faixa, comparação por
+    texto, '>=N'): o resultado vetorizado é idêntico ao jogo a jogo.
+    - calor_39 / calor_21: (61,) valor do mapa por dezena (0 se ausente)
+    - tabelas[criterio]:   array bool indexado pela métrica (quadrantes: código c1*343+c2*49+c3*7+c4)
+    """
+
+    def __init__(self, perfil, mapa_39, mapa_21):
+        for nome, mapa in (('calor_39', mapa_39), ('calor_21', mapa_21)):
+            valores = [mapa.get(d, 0) for d in range(UNIVERSO_DEZENAS + 1)]
+            if any(not isinstance(v, (int, np.integer)) or v < 0 for v in valores):
+                raise ValueError(f"Mapa de calor com valores não inteiros/negativos ({nome})")
+            setattr(self, nome, np.array(valores, dtype=np.int64))
+        max39, max21 = int(self.calor_39.max()), int(self.calor_21.max())
+
+        def faixa(criterio, maximo):
+            limites, alvo = perfil[criterio]['limites'], perfil[criterio]['alvo']
+            return np.array([classificar_faixa(v, limites) in alvo for v in range(maximo + 1)])
+
+        def contagem(criterio):
+            return np.array([n in perfil[criterio]['alvo'] for n in range(NUM_DEZENAS_SORTEADAS + 1)])
+
+        def ocupacao(criterio):
+            alvos_str = [str(x) for x in perfil[criterio]['alvo']]
+            return np.array([str(n) in alvos_str for n in range(NUM_DEZENAS_SORTEADAS + 1)])
+
+        alvos_quad = [str(x).replace('-', '') for x in perfil['quadrantes']['alvo']]
+        quadrantes = np.array([padrao_quadrantes(c) in alvos_quad for c in range(7 ** 4)])
+
+        self.tabelas = {
+            'soma': faixa('soma', UNIVERSO_DEZENAS * NUM_DEZENAS_SORTEADAS),
+            'deltas': faixa('deltas', UNIVERSO_DEZENAS),
+            'temp39': faixa('temp39', max39 * NUM_DEZENAS_SORTEADAS),
+            'temp21': faixa('temp21', max21 * NUM_DEZENAS_SORTEADAS),
+            'pares': contagem('pares'),
+            'primos': contagem('primos'),
+            'mult3': contagem('mult3'),
+            'linhas': ocupacao('linhas'),
+            'colunas': ocupacao('colunas'),
+            'max_rep_39': np.array([atende_max_rep(str(v), perfil['max_rep_39']['alvo']) for v in range(max39 + 1)]),
+            'max_rep_21': np.array([atende_max_rep(str(v), perfil['max_rep_21']['alvo']) for v in range(max21 + 1)]),
+            'quadrantes': quadrantes,
+        }
+
+    def metricas(self, jogos):
+        """(M,6) dezenas -> {criterio: (M,) int} com as métricas de calcular_criterios_binarios."""
+        jogos = np.sort(np.asarray(jogos, dtype=np.intp).reshape(-1, NUM_DEZENAS_SORTEADAS), axis=1)
+        return {**metricas_estaticas(jogos), **self.metricas_dinamicas(jogos)}
+
+    def metricas_dinamicas(self, jogos):
+        """(M,6) dezenas -> {criterio: (M,) int} dos critérios que dependem dos mapas de calor."""
+        jogos = np.asarray(jogos, dtype=np.intp).reshape(-1, NUM_DEZENAS_SORTEADAS)
+        calor_39, calor_21 = self.calor_39[jogos], self.calor_21[jogos]
+        return {
+            'temp39': calor_39.sum(axis=1),
+            'temp21': calor_21.sum(axis=1),
+            'max_rep_39': calor_39.max(axis=1),
+            'max_rep_21': calor_21.max(axis=1),
+        }
+
+    def criterios(self, jogos):
+        """(M,6) dezenas -> (M,) uint16, bits de CRITERIOS (= calcular_criterios_binarios)."""
+        return criterios_de_metricas(self.metricas(jogos), self)
+
+    def pontuar(self, jogos):
+        """(M,6) dezenas -> (M,) uint8 (= calcular_pontuacao_binaria)."""
+        return popcount(self.criterios(jogos).astype(np.uint64)).astype(np.uint8)
+
+    def avaliar(self, jogos):
+        """(M,6) dezenas -> (scores uint8, criterios uint16, metricas {criterio: array}) numa passada só."""
+        metricas = self.metricas(jogos)
+        criterios = criterios_de_metricas(metricas, self)
+        return popcount(criterios.astype(np.uint64)).astype(np.uint8), criterios, metricas
+
+
+# Por dezena (posição 0 sem uso): bit da linha / da coluna e peso do quadrante no código c1*343+c2*49+c3*7+c4
+_BIT_LINHA = np.left_shift(np.uint64(1), LINHA.clip(0).astype(np.uint64))
+_BIT_COLUNA = np.left_shift(np.uint64(1), COLUNA.astype(np.uint64))
+_PESO_QUADRANTE = 7 ** (3 - QUADRANTE)
+
+
+# Critérios que só dependem das dezenas do jogo (os demais dependem dos mapas de calor)
+CRITERIOS_ESTATICOS = ['soma', 'deltas', 'pares', 'primos', 'mult3', 'linhas', 'colunas', 'quadrantes']
+
+
+def metricas_estaticas(jogos):
+    """(M,6) dezenas em ordem crescente -> {criterio: (M,) int} dos CRITERIOS_ESTATICOS."""
+    jogos = np.asarray(jogos, dtype=np.intp).reshape(-1, NUM_DEZENAS_SORTEADAS)
+    return {
+        'soma': jogos.sum(axis=1),
+        'deltas': jogos[:, -1] - jogos[:, 0],            # soma das diferenças consecutivas
+        'pares': (jogos % 2 == 0).sum(axis=1),
+        'primos': EH_PRIMO[jogos].sum(axis=1),
+        'mult3': EH_MULT3[jogos].sum(axis=1),
+        'linhas': popcount(np.bitwise_or.reduce(_BIT_LINHA[jogos], axis=1)),
+        'colunas': popcount(np.bitwise_or.reduce(_BIT_COLUNA[jogos], axis=1)),
+        'quadrantes': _PESO_QUADRANTE[jogos].sum(axis=1),
+    }
+
+def padrao_quadrantes(codigo):
+    """Código c1*343+c2*49+c3*7+c4 (métrica 'quadrantes') -> texto "c1c2c3c4" (ex: "2211")."""
+    codigo = int(codigo)
+    return f"{codigo // 343}{codigo // 49 % 7}{codigo // 7 % 7}{codigo % 7}"
+
+def atende(criterios, criterio):
+    """O critério (nome em CRITERIOS) está aceso na máscara de critérios?"""
+    return bool(int(criterios) >> CRITERIOS.index(criterio) & 1)
+
+def criterios_de_metricas(metricas, compilado):
+    """
+    Métricas inteiras por jogo ({criterio: array}, mesmas chaves de CRITERIOS) ->
+    máscara de critérios uint16, igual à de calcular_criterios_binarios.
+    """
+    tabelas = compilado.tabelas
+    criterios = np.zeros(len(metricas['soma']), dtype=np.uint16)
+    for k, criterio in enumerate(CRITERIOS):
+        criterios |= tabelas[criterio][metricas[criterio]].astype(np.uint16) << np.uint16(k)
+    return criterios
+
+def calcular_pontuacao_binaria(jogo, perfil, mapa_39, mapa_21):
+    """
+    Calcula o Score (0 a 12 pontos) comparando o jogo com o Perfil Alvo.
+    """
+    return calcular_criterios_binarios(jogo, perfil, mapa_39, mapa_21).bit_count()
+
+def pontuar_mascaras(mascaras, perfil, mapa_39, mapa_21, com_criterios=False, com_metricas=False):
+    """
+    Score de cada jogo de um array de máscaras (uint64). Retorna array uint8 alinhado.
+    perfil: gabarito (compilado aqui) ou um PerfilCompilado já montado (mapas ignorados).
+    com_criterios=True: retorna (scores, criterios), criterios em uint16 (bits de CRITERIOS).
+    com_metricas=True:  retorna (scores, criterios, metricas), metricas = {criterio: array}
+    com os valores conferidos (soma, pares, ..., quadrantes como código; ver padrao_quadrantes).
+    """
+    compilado = perfil if isinstance(perfil, PerfilCompilado) else PerfilCompilado(perfil, mapa_39, mapa_21)
+    scores, criterios, metricas = compilado.avaliar(jogos_de_mascaras(mascaras))
+    if com_metricas:
+        return scores, criterios, metricas
+    return (scores, criterios) if com_criterios else scores
+
+def agrupar_por_score(mascaras, scores):
+    """Baldes {score: array de máscaras} a partir dos scores alinhados às máscaras."""
+    return {int(s): mascaras[scores == s] for s in np.unique(scores)}
@@ -2,7 +2,9 @@
 import pandas as pd
 import numpy as np
 # Adicionei LISTA_MULTIPLOS_3 na importação
-from .config_mega import NUM_DEZENAS_SORTEADAS, LISTA_PRIMOS, LISTA_MULTIPLOS_3
+from .config_mega import LISTA_PRIMOS, LISTA_MULTIPLOS_3
+from .matriz import como_matriz
+from .features import obter_features
 
 def classificar_valor_z(valor, media, desvio):
     if desvio == 0: return "Média"
@@ -14,8 +16,11 @@ def classificar_valor_z(valor, media, desvio):
     return "Muito Alto"
 
 def calcular_assinatura_concurso(row, media_soma, std_soma, media_delta, std_delta, media_t39, std_t39, media_t21, std_t21):
-    cols = [f'Bola{i}' for i in range(1, NUM_DEZENAS_SORTEADAS + 1)]
-    dezenas = row[cols].dropna().astype(int).tolist()
+    """
+    row: dict com 'Concurso', 'dezenas' (lista de int) e as métricas
+    'Repetidas_Calc', 'Score_Temp39' e 'Score_Temp21'.
+    """
+    dezenas = row['dezenas']
     
     # 1. Indicadores EXATOS
     pares = len([d for d in dezenas if d % 2 == 0])
@@ -75,41 +80,32 @@ def calcular_assinatura_concurso(row, media_soma, std_soma, media_delta, std_del
         'faixa_t21': faixa_t21      # Faixa
     }
 
-def enriquecer_dataframe_com_metricas(df):
-    # (Mantenha o código anterior desta função aqui)
-    cols = [f'Bola{i}' for i in range(1, NUM_DEZENAS_SORTEADAS + 1)]
-    sets_dezenas = df[cols].apply(lambda x: set(x.dropna().astype(int)), axis=1)
-    lista_repetidas = [0]
-    for i in range(1, len(df)):
-        s_atual = sets_dezenas.iloc[i]
-        s_ant = sets_dezenas.iloc[i-1]
-        lista_repetidas.append(len(s_atual.intersection(s_ant)))
-    df['Repetidas_Calc'] = lista_repetidas
+def calcular_metricas_historico(df):
+    """
+    Repetidas do anterior e Temperaturas (39/21) de cada sorteio, como colunas de um
+    DataFrame alinhado às linhas do histórico.
+    """
+    f = obter_features(como_matriz(df))
+    return pd.DataFrame({
+        'Repetidas_Calc': f['repetidas'],
+        'Score_Temp39': f['temp39'],
+        'Score_Temp21': f['temp21'],
+    })
 
-    matriz_sorteios = pd.DataFrame(0, index=df.index, columns=range(1, 61))
-    for idx, row in df.iterrows():
-        dzs = row[cols].dropna().astype(int).tolist()
-        matriz_sorteios.loc[idx, dzs] = 1
-    
-    freq_movel_39 = matriz_sorteios.rolling(window=39, closed='left').sum().fillna(0)
-    freq_movel_21 = matriz_sorteios.rolling(window=21, closed='left').sum().fillna(0)
-    s39 = (matriz_sorteios * freq_movel_39).sum(axis=1)
-    s21 = (matriz_sorteios * freq_movel_21).sum(axis=1)
-    df['Score_Temp39'] = s39
-    df['Score_Temp21'] = s21
+def enriquecer_dataframe_com_metricas(df):
+    metricas = calcular_metricas_historico(df)
+    for col in metricas.columns:
+        df[col] = metricas[col].to_numpy()
     return df
 
 def buscar_concursos_similares(df_original, concurso_alvo_idx, top_n=20):
-    df = df_original.copy()
-    df = enriquecer_dataframe_com_metricas(df)
+    m = como_matriz(df_original)
+    df = calcular_metricas_historico(m)
     
-    cols_num = [f'Bola{i}' for i in range(1, NUM_DEZENAS_SORTEADAS + 1)]
-    somas = df[cols_num].sum(axis=1)
+    dezenas = m.lista_dezenas()
+    somas = pd.Series(m.dezenas.sum(axis=1, dtype=np.int64))
     
-    deltas_vals = []
-    for _, row in df.iterrows():
-        d = sorted(row[cols_num].dropna().astype(int).tolist())
-        deltas_vals.append(sum([d[i+1]-d[i] for i in range(len(d)-1)]))
+    deltas_vals = [d[-1] - d[0] for d in dezenas]
         
     medias = {
         'soma': somas.mean(), 'std_soma': somas.std(),
@@ -117,8 +113,13 @@ def buscar_concursos_similares(df_original, concurso_alvo_idx, top_n=20):
         't39': df['Score_Temp39'].mean(), 'std_t39': df['Score_Temp39'].std(),
         't21': df['Score_Temp21'].mean(), 'std_t21': df['Score_Temp21'].std(),
     }
+    linhas = [
+        {'Concurso': c, 'dezenas': d, 'Repetidas_Calc': r, 'Score_Temp39': t39, 'Score_Temp21': t21}
+        for c, d, r, t39, t21 in zip(m.concursos.tolist(), dezenas, df['Repetidas_Calc'].tolist(),
+                                     df['Score_Temp39'].tolist(), df['Score_Temp21'].tolist())
+    ]
     
-    row_alvo = df.iloc[concurso_alvo_idx]
+    row_alvo = linhas[concurso_alvo_idx]
     ass_alvo = calcular_assinatura_concurso(
         row_alvo, 
         medias['soma'], medias['std_soma'],
@@ -131,7 +132,7 @@ def buscar_concursos_similares(df_original, concurso_alvo_idx, top_n=20):
     
     # Loop de busca
     for i in range(50, concurso_alvo_idx):
-        row_cand = df.iloc[i]
+        row_cand = linhas[i]
         ass_cand = calcular_assinatura_concurso(
             row_cand, 
             medias['soma'], medias['std_soma'],
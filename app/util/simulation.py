@@ -1,76 +1,49 @@
 # app/util/simulation.py
-import pandas as pd
 import time
-import random
-from collections import defaultdict, Counter
-from .config_mega import NUM_DEZENAS_SORTEADAS
-from .analise_preditiva import gerar_perfil_preditivo_completo, extrair_perfil_alvo_completo
-from .gerador import gerar_universo_filtrado
-from .pontuacao import calcular_pontuacao_binaria
+from .analise_preditiva import montar_gabarito
+from .perfis import perfil_preditivo
+from .gerador import gerar_universo_filtrado, gerar_universo_em_blocos, escolher_metodo
+from .baldes import BaldesLimitados, encher_baldes, selecionar_com_diversificacao
+from .aleatorio import FLUXO_SELECAO, FLUXO_CENARIO, nova_semente, fluxo_python, derivar_semente
+from .pontuacao import PerfilCompilado, pontuar_mascaras, agrupar_por_score
+from .mascaras import mascara_jogo, mascaras_de_jogos, contar_acertos
+from .matriz import como_matriz
+from .features import obter_features
+from .exportacao import exportar_universo, exportar_lote, novo_pacote
 
-def simular_cenario_passado(df_completo, concurso_simulacao_id, params):
+def simular_cenario_passado(df_completo, concurso_simulacao_id, params, db_path=None):
     """
     params: dict com chaves 'qtd', 's1', 'p1', ... 'pressao'
+    params['semente']: repete exatamente o cenário (sem semente: nova, devolvida em 'semente')
+    db_path: banco de origem, para reaproveitar perfis já calculados em disco (app/util/perfis.py)
     """
     start_time = time.time()
+    semente = params.get('semente')
+    semente = nova_semente() if semente is None else semente
     
     # 1. Preparação dos Dados (Corte Temporal)
-    idx_mask = df_completo.index[df_completo['Concurso'] == concurso_simulacao_id].tolist()
-    if not idx_mask: return {'erro': 'Concurso não encontrado'}
-    idx_corte = idx_mask[0]
+    m = como_matriz(df_completo)
+    obter_features(m)  # calcula uma vez na matriz completa; o recorte herda as fatias
+    idx_corte = m.posicao(concurso_simulacao_id)
+    if idx_corte is None: return {'erro': 'Concurso não encontrado'}
     
-    df_treino = df_completo.iloc[:idx_corte+1] 
+    m_treino = m.recorte(idx_corte + 1)
     
-    if idx_corte + 1 >= len(df_completo):
+    if idx_corte + 1 >= len(m):
         return {'erro': 'Este é o último concurso, impossível validar futuro.'}
         
-    linha_futuro = df_completo.iloc[idx_corte + 1]
-    cols = [f'Bola{i}' for i in range(1, NUM_DEZENAS_SORTEADAS + 1)]
-    resultado_real = linha_futuro[cols].dropna().astype(int).tolist()
-    ultimo_sorteio = df_treino.iloc[-1][cols].dropna().astype(int).tolist()
+    concurso_futuro = int(m.concursos[idx_corte + 1])
+    resultado_real = m.dezenas[idx_corte + 1].tolist()
+    ultimo_sorteio = m_treino.dezenas[-1].tolist()
 
-    # 2. MOTOR PREDITIVO (Treinado no Passado)
-    predicao = gerar_perfil_preditivo_completo(df_treino)
-    perfil_alvo_raw = extrair_perfil_alvo_completo(predicao)
-    
-    gabarito = {}
-    for k in perfil_alvo_raw:
-        gabarito[k] = {'alvo': perfil_alvo_raw[k]}
-        if 'limites' in predicao.get(k, {}):
-            gabarito[k]['limites'] = predicao[k]['limites']
+    # 2. MOTOR PREDITIVO (Treinado no Passado; memorizado por corte)
+    predicao = perfil_preditivo(m_treino, db_path)
+    gabarito = montar_gabarito(predicao)
 
     # 3. GERAÇÃO (Universo Completo - Fidelidade ao Preditivo)
     qtd_universo = 300000
     modelo_selecionado = params.get('modelo', 'F4') # Pega do params
-    
-    candidatos = gerar_universo_filtrado(
-        qtd_universo, 
-        ultimo_sorteio, 
-        mapa_scores=predicao['mapa_39'], # Passa o mapa!
-        modelo=modelo_selecionado        # Passa o modelo!
-    )
-    
-    # 4. PONTUAÇÃO E SELEÇÃO (Lógica Fiel ao Modelo V5)
-    mapa39 = predicao['mapa_39']
-    mapa21 = predicao['mapa_21']
-    
-    baldes = defaultdict(list)
-    scores_audit = []
-    
-    for jogo in candidatos:
-        score = calcular_pontuacao_binaria(jogo, gabarito, mapa39, mapa21)
-        baldes[score].append(jogo)
-        scores_audit.append(score)
-        
-    max_score_found = max(scores_audit) if scores_audit else 0
-    
-    # --- INÍCIO DA LÓGICA DE SELEÇÃO POR METAS ---
-    finalistas = []
-    dezenas_pressao = predicao['ciclo_faltantes'].union(predicao['atrasadas_criticas'])
-    uso_global = Counter()
-    
     qtd_meta = params.get('qtd', 20)
-    perc_pressao = params.get('pressao', 60)
     
     # Configurações de Metas (Cascata)
     metas = [
@@ -79,65 +52,51 @@ def simular_cenario_passado(df_completo, concurso_simulacao_id, params):
         (params.get('s3', 10), params.get('p3', 30)),
         (params.get('s4', 9),  params.get('p4', 20))
     ]
-
-    def selecionar_com_diversificacao(nota_alvo, qtd_necessaria, lista_existente):
-        pool_nota = baldes[nota_alvo]
-        if not pool_nota: return []
-        random.shuffle(pool_nota)
-        selecionados_agora = []
-        
-        # Tentativa 1: Respeitando filtros de diversificação e pressão
-        for jogo in pool_nota:
-            if len(selecionados_agora) >= qtd_necessaria: break
-            if jogo in lista_existente: continue
-            
-            # Filtro de Pressão
-            tem_pressao = bool(set(jogo).intersection(dezenas_pressao))
-            if perc_pressao > 0 and not tem_pressao:
-                # Se exige pressão e jogo não tem, descarta com chance baseada na %
-                if random.random() * 100 < perc_pressao: continue
-
-            # Filtro de Repetição Visual (Diversificação)
-            pontos_repeticao = sum([uso_global[d] for d in jogo])
-            if pontos_repeticao < 25: 
-                selecionados_agora.append(jogo)
-                for d in jogo: uso_global[d] += 1
-        
-        # Tentativa 2: Se faltou jogo, pega qualquer um da nota (relaxa filtros)
-        if len(selecionados_agora) < qtd_necessaria:
-            for jogo in pool_nota:
-                if len(selecionados_agora) >= qtd_necessaria: break
-                if jogo not in lista_existente and jogo not in selecionados_agora:
-                    selecionados_agora.append(jogo)
-                    for d in jogo: uso_global[d] += 1
-                    
-        return selecionados_agora
-
-    # Executa a Cascata
-    for meta_score, meta_perc in metas:
-        falta = qtd_meta - len(finalistas)
-        if falta <= 0: break
-        cota = int(qtd_meta * (meta_perc/100))
-        finalistas.extend(selecionar_com_diversificacao(meta_score, cota, finalistas))
-
-    # Preenchimento de Sobras (Waterfall descrecente)
-    if len(finalistas) < qtd_meta:
-        for sc in range(max_score_found, -1, -1):
-            if len(finalistas) >= qtd_meta: break
-            # Pula os scores já processados nas metas principais para não duplicar lógica (opcional)
-            falta = qtd_meta - len(finalistas)
-            finalistas.extend(selecionar_com_diversificacao(sc, falta, finalistas))
-            
-    jogos_finais = finalistas[:qtd_meta]
+    metodo = escolher_metodo(params.get('gerador', 'auto'))
+    mapa39 = predicao['mapa_39']
+    mapa21 = predicao['mapa_21']
+    
+    # Baldes limitados às metas: a geração em fluxo para quando todos enchem
+    baldes_metas = BaldesLimitados.das_metas(qtd_meta, metas)
+    geracao = dict(
+        mapa_scores=mapa39,              # Passa o mapa!
+        modelo=modelo_selecionado,       # Passa o modelo!
+        metodo=metodo, semente=semente, perfil=gabarito, mapa_21=mapa21, cotas=baldes_metas.cotas())
+    compilado = PerfilCompilado(gabarito, mapa39, mapa21)
+    
+    # 4. PONTUAÇÃO E SELEÇÃO (Lógica Fiel ao Modelo V5)
+    exportado = None
+    if params.get('exportar'):
+        # Guarda o universo pontuado para análise offline (app/util/exportacao.py)
+        candidatos = gerar_universo_filtrado(qtd_universo, ultimo_sorteio, **geracao)
+        scores_audit, criterios = pontuar_mascaras(candidatos, compilado, mapa39, mapa21, com_criterios=True)
+        exportado = exportar_universo(
+            novo_pacote(f"universo_sim_{concurso_simulacao_id}"), candidatos, scores_audit, criterios,
+            metadados={'concurso_base': int(concurso_simulacao_id), 'concurso_validacao': concurso_futuro,
+                       'resultado_real': resultado_real, 'modelo': modelo_selecionado, 'gabarito': gabarito})
+        baldes = agrupar_por_score(candidatos, scores_audit)
+        max_score_found = int(scores_audit.max()) if len(scores_audit) else 0
+    else:
+        encher_baldes(gerar_universo_em_blocos(qtd_universo, ultimo_sorteio, **geracao),
+                      baldes_metas, compilado, mapa39, mapa21)
+        baldes = baldes_metas.baldes()
+        max_score_found = baldes_metas.max_score
+    
+    # --- SELEÇÃO POR METAS (cascata + sobras, app/util/baldes.py) ---
+    mascara_pressao = mascara_jogo(predicao['ciclo_faltantes'].union(predicao['atrasadas_criticas']))
+    perc_pressao = params.get('pressao', 60)
+    finalistas = selecionar_com_diversificacao(
+        baldes, metas, qtd_meta, max_score_found, mascara_pressao, perc_pressao,
+        fluxo_python(semente, FLUXO_SELECAO))
     
     # 5. CONFERÊNCIA
     acertos_stats = {0:0, 1:0, 2:0, 3:0, 4:0, 5:0, 6:0}
     lista_jogos = []
+    # O score de cada finalista é o do balde de onde ele saiu
+    mascaras_finais = mascaras_de_jogos([jogo for jogo, _ in finalistas])
+    acertos_jogos = contar_acertos(mascaras_finais, mascara_jogo(resultado_real)).tolist()
     
-    for jogo in jogos_finais:
-        # Recalcula score final apenas para exibição
-        score = calcular_pontuacao_binaria(jogo, gabarito, mapa39, mapa21)
-        acertos = len(set(jogo).intersection(set(resultado_real)))
+    for (jogo, score), acertos in zip(finalistas, acertos_jogos):
         acertos_stats[acertos] += 1
         lista_jogos.append({
             'numeros': jogo,
@@ -150,24 +109,35 @@ def simular_cenario_passado(df_completo, concurso_simulacao_id, params):
         
     return {
         'concurso_base': int(concurso_simulacao_id),
-        'concurso_validacao': int(linha_futuro['Concurso']),
+        'concurso_validacao': concurso_futuro,
         'resultado_real': resultado_real,
         'resumo': acertos_stats,
         'jogos': lista_jogos,
         'tempo': round(time.time() - start_time, 2),
-        'max_score_epoca': max_score_found
+        'max_score_epoca': max_score_found,
+        'exportado': exportado,
+        'semente': semente
     }
 
-def simular_lote_cenarios(df_completo, lista_ids, params):
+def simular_lote_cenarios(df_completo, lista_ids, params, db_path=None):
     """
     Executa a simulação para uma lista de IDs de concurso.
     Retorna um resumo agregado.
+    params['exportar']: grava também o resumo como pacote colunar (app/util/exportacao.py).
+    params['semente']: semente do lote; cada concurso usa a semente derivada
+    (semente, FLUXO_CENARIO, id), então o resultado de um id não depende da ordem
+    nem de quais outros ids estão no lote.
     """
     resultados = []
+    m = como_matriz(df_completo)
+    params_cenario = {k: v for k, v in params.items() if k != 'exportar'}
+    semente_lote = params.get('semente')
+    params_cenario['semente'] = semente_lote = nova_semente() if semente_lote is None else semente_lote
     
     for cid in lista_ids:
         try:
-            res = simular_cenario_passado(df_completo, int(cid), params)
+            semente = derivar_semente(semente_lote, FLUXO_CENARIO, int(cid))
+            res = simular_cenario_passado(m, int(cid), dict(params_cenario, semente=semente), db_path)
             if 'erro' not in res:
                 # Simplifica o objeto para o resumo
                 resultados.append({
@@ -179,5 +149,9 @@ def simular_lote_cenarios(df_completo, lista_ids, params):
                 })
         except Exception as e:
             print(f"Erro ao simular {cid}: {e}")
+
+    if params.get('exportar') and resultados:
+        caminho = exportar_lote(novo_pacote('lote'), resultados, metadados={'params': params_cenario})
+        print(f"Lote exportado em {caminho}")
             
     return resultados
\ No newline at end of file
@@ -0,0 +1,178 @@
+# app/util/snapshot.py
+"""
+Snapshot binário do histórico, gravado ao lado do banco (megasena_db.historico.bin).
+
+Layout (little-endian), lido com np.memmap sem passar por sqlite3/pandas:
+    cabeçalho  64 bytes       -> ver CABECALHO
+    concursos  (N,)  int32
+    datas      (N,)  S{w}     -> texto da data como no banco (ex: b'25/11/2025')
+    dezenas    (N,6) uint8    -> ordenadas por linha
+
+O coletor regrava o arquivo sempre que adiciona concursos. Quem lê confere
+o cabeçalho (último concurso, total, soma de verificação) contra o banco e, se não bater, ignora
+o snapshot e volta para o caminho normal. Vários processos que mapeiam o
+mesmo arquivo compartilham uma única cópia física das páginas.
+
+Gerar/regravar manualmente:  python -m app.util.snapshot [caminho_do_banco] [--se-desatualizado]
+"""
+import argparse
+import os
+import numpy as np
+import pandas as pd
+from .config_mega import TABLE_NAME, DATABASE_NAME, NUM_DEZENAS_SORTEADAS
+from .matriz import MatrizSorteios, COLS_BOLAS
+
+MAGICA = b'MSHIST01'
+VERSAO_FORMATO = 2
+CABECALHO = np.dtype([
+    ('magica', 'S8'),
+    ('versao', '<u4'),
+    ('total', '<u4'),
+    ('qtd_bolas', '<u4'),
+    ('ultimo_concurso', '<u4'),
+    ('largura_data', '<u4'),
+    ('soma_verificacao', '<u8'),
+    ('reservado', 'S28'),
+])
+assert CABECALHO.itemsize == 64
+
+# Soma de verificação do conteúdo: muda quando um concurso existente é corrigido no
+# lugar (o que MAX/COUNT não enxergam). Não depende da ordem das bolas na linha;
+# linhas com alguma bola nula ficam de fora, como no SUM do SQLite.
+SQL_SOMA_VERIFICACAO = "COALESCE(SUM((Concurso % 1009 + 1) * ({})), 0)".format(
+    ' + '.join(f'{c} * {c} * {c}' for c in COLS_BOLAS))
+
+
+def caminho_snapshot(db_path):
+    """megasena_db.sqlite3 -> megasena_db.historico.bin (mesma pasta)."""
+    return os.path.splitext(db_path)[0] + '.historico.bin'
+
+
+def soma_verificacao(concursos, dezenas):
+    """Mesmo valor de SQL_SOMA_VERIFICACAO, calculado sobre os arrays (linhas com NaN ignoradas)."""
+    dezenas = np.asarray(dezenas, dtype=np.float64).reshape(-1, NUM_DEZENAS_SORTEADAS)
+    completas = ~np.isnan(dezenas).any(axis=1)
+    pesos = np.asarray(concursos, dtype=np.int64)[completas] % 1009 + 1
+    cubos = (dezenas[completas].astype(np.int64) ** 3).sum(axis=1)
+    return int((pesos * cubos).sum())
+
+
+def consultar_versao(conn):
+    """(último concurso, total de linhas, soma de verificação) do banco."""
+    ultimo, total, soma = conn.execute(
+        f"SELECT MAX(Concurso), COUNT(*), {SQL_SOMA_VERIFICACAO} FROM {TABLE_NAME}").fetchone()
+    return int(ultimo or 0), int(total), int(soma)
+
+
+def versao_do_cabecalho(cab):
+    """Tupla comparável com consultar_versao."""
+    return cab['ultimo_concurso'], cab['total'], cab['soma_verificacao']
+
+
+def gravar_snapshot(caminho, concursos, dezenas, datas):
+    """Grava o snapshot de forma atômica (arquivo temporário + os.replace)."""
+    concursos = np.ascontiguousarray(concursos, dtype='<i4')
+    dezenas = np.ascontiguousarray(np.sort(np.asarray(dezenas, dtype=np.uint8), axis=1))
+    datas = np.asarray(['' if d is None else str(d) for d in datas], dtype=object)
+    largura = max([len(d.encode('utf-8')) for d in datas] + [1])
+    datas = np.array([d.encode('utf-8') for d in datas], dtype=f'S{largura}')
+
+    cab = np.zeros(1, dtype=CABECALHO)
+    cab['magica'] = MAGICA
+    cab['versao'] = VERSAO_FORMATO
+    cab['total'] = len(concursos)
+    cab['qtd_bolas'] = dezenas.shape[1]
+    cab['ultimo_concurso'] = int(concursos[-1]) if len(concursos) else 0
+    cab['largura_data'] = largura
+    cab['soma_verificacao'] = soma_verificacao(concursos, dezenas)
+
+    temporario = caminho + '.tmp'
+    with open(temporario, 'wb') as f:
+        for parte in (cab, concursos, datas, dezenas):
+            f.write(parte.tobytes())
+    # No Windows a troca falha se outro processo estiver com o arquivo mapeado;
+    # quem chama trata o erro (o leitor detecta o snapshot desatualizado)
+    os.replace(temporario, caminho)
+    return len(concursos)
+
+
+def gravar_snapshot_do_banco(conn, db_path):
+    """Lê o histórico pela conexão informada e regrava o snapshot ao lado do banco."""
+    df = pd.read_sql_query(
+        f"SELECT Concurso, Data, {', '.join(COLS_BOLAS)} FROM {TABLE_NAME} ORDER BY Concurso ASC", conn)
+    return gravar_snapshot(caminho_snapshot(db_path), df['Concurso'].to_numpy(),
+                           df[COLS_BOLAS].to_numpy(), df['Data'].to_numpy(dtype=object))
+
+
+def snapshot_em_dia(conn, db_path):
+    """True se o snapshot existe e bate com o banco (último concurso, total e soma de verificação)."""
+    cab = ler_cabecalho(caminho_snapshot(db_path))
+    if cab is None:
+        return False
+    return versao_do_cabecalho(cab) == consultar_versao(conn)
+
+
+def ler_cabecalho(caminho):
+    """Cabeçalho do snapshot como dict, ou None se o arquivo não existir/for inválido."""
+    try:
+        cab = np.fromfile(caminho, dtype=CABECALHO, count=1)
+    except (OSError, ValueError):
+        return None
+    if len(cab) != 1 or cab['magica'][0] != MAGICA or int(cab['versao'][0]) != VERSAO_FORMATO:
+        return None
+    return {nome: int(cab[nome][0])
+            for nome in ('total', 'qtd_bolas', 'ultimo_concurso', 'largura_data', 'soma_verificacao')}
+
+
+def abrir_snapshot(caminho):
+    """
+    Mapeia o snapshot em memória (somente leitura).
+    Retorna (cabecalho, concursos, datas, dezenas) como views do arquivo, ou None.
+    """
+    cab = ler_cabecalho(caminho)
+    if cab is None:
+        return None
+    n, qtd, largura = cab['total'], cab['qtd_bolas'], cab['largura_data']
+    inicio_datas = CABECALHO.itemsize + 4 * n
+    inicio_dezenas = inicio_datas + largura * n
+    if n == 0 or qtd != NUM_DEZENAS_SORTEADAS or os.path.getsize(caminho) != inicio_dezenas + qtd * n:
+        return None
+    # asarray: views ndarray comuns (sem a subclasse memmap) que mantêm o mapeamento vivo
+    buf = np.asarray(np.memmap(caminho, dtype=np.uint8, mode='r'))
+    concursos = buf[CABECALHO.itemsize:inicio_datas].view('<i4')
+    datas = buf[inicio_datas:inicio_dezenas].view(f'S{largura}')
+    dezenas = buf[inicio_dezenas:].reshape(n, qtd)
+    return cab, concursos, datas, dezenas
+
+
+def matriz_do_snapshot(caminho):
+    """MatrizSorteios com concursos/dezenas apontando direto para o arquivo mapeado."""
+    aberto = abrir_snapshot(caminho)
+    if aberto is None:
+        return None
+    _, concursos, datas, dezenas = aberto
+    return MatrizSorteios.de_arrays(concursos, dezenas, np.char.decode(datas, 'utf-8').astype(object))
+
+
+def dataframe_da_matriz(m):
+    """DataFrame no mesmo formato da consulta ao banco (Concurso, Data, Bola1..Bola6)."""
+    df = pd.DataFrame({'Concurso': m.concursos.astype(np.int64), 'Data': m.datas})
+    for i, col in enumerate(COLS_BOLAS):
+        df[col] = m.dezenas[:, i].astype(np.int64)
+    return df
+
+
+if __name__ == '__main__':
+    from .banco import conexao_leitura
+    padrao = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..', DATABASE_NAME)
+    parser = argparse.ArgumentParser(description='Regrava o snapshot binário do histórico da Mega-Sena.')
+    parser.add_argument('db', nargs='?', default=os.path.normpath(padrao))
+    parser.add_argument('--se-desatualizado', action='store_true',
+                        help='só regrava se o snapshot não existir ou não bater com o banco')
+    args = parser.parse_args()
+    conn = conexao_leitura(args.db)
+    if args.se_desatualizado and snapshot_em_dia(conn, args.db):
+        print(f"Snapshot em dia: {caminho_snapshot(args.db)}")
+        raise SystemExit(0)
+    total = gravar_snapshot_do_banco(conn, args.db)
+    print(f"{total} concursos gravados em {caminho_snapshot(args.db)}.")
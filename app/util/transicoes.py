@@ -0,0 +1,106 @@
+# app/util/transicoes.py
+"""
+Transições estado -> próximo estado dos indicadores, contadas por posição.
+
+calcular_matriz_transicao refaz a tabela inteira a cada perfil; nos backtests isso
+se repete a cada corte (quadrático no total). Aqui cada série de estados vira, uma
+única vez, a lista ordenada das transições (par (a, b), linha t da origem). As
+probabilidades "no corte n" (série até a linha n-1) saem de duas buscas binárias
+por próximo estado, sem reprocessar o prefixo.
+
+Vale para indicadores com estado fixo por sorteio (contagens, padrões, MaxRep,
+repetidas). Os indicadores por faixa (soma, deltas, Temp) não entram: as faixas
+dependem da média/desvio do próprio prefixo e o estado de cada sorteio muda com o corte.
+"""
+import numpy as np
+from .features import obter_features
+
+# Indicadores com estado fixo: chave do perfil -> (coluna de features, nome exibido, primeira linha da série)
+INDICADORES_DISCRETOS = {
+    'primos': ('primos', 'Primos', 0),
+    'pares': ('pares', 'Pares', 0),
+    'fibo': ('fibo', 'Fibo', 0),
+    'mult3': ('mult3', 'Mult3', 0),
+    'sequenciais': ('sequenciais', 'Sequenciais', 0),
+    'linhas': ('linhas', 'Linhas', 0),
+    'colunas': ('colunas', 'Colunas', 0),
+    'quadrantes': ('quadrantes', 'Quadrantes', 0),
+    'repetidas': ('repetidas', 'Repetidas', 1),      # o 1º sorteio não tem anterior
+    'iniciais': ('iniciais', 'Conc iniciais', 0),
+    'finais': ('finais', 'Conc finais', 0),
+    'max_rep_39': ('max_rep_39', 'MaxRep 39', 39),   # só com a janela completa
+    'max_rep_21': ('max_rep_21', 'MaxRep 21', 21),
+}
+
+
+class TransicoesPrefixadas:
+    """
+    Série de estados (N,) -> transições ordenadas por (par, linha).
+    - rotulos: estados distintos em texto (as chaves de 'probabilidades')
+    - codigos: (N,) código de cada sorteio em rotulos
+    - inicio:  primeira linha considerada (a série do corte n é estados[inicio:n])
+    """
+
+    def __init__(self, estados, inicio=0):
+        estados = np.asarray(estados)
+        rotulos, codigos = np.unique(estados, return_inverse=True)
+        self.rotulos = [str(r) for r in rotulos.tolist()]
+        self.codigos = codigos.astype(np.int64)
+        self.inicio = inicio
+        self.total = len(estados)
+
+        qtd = len(self.rotulos)
+        t = np.arange(inicio, self.total - 1, dtype=np.int64)
+        pares = self.codigos[t] * qtd + self.codigos[t + 1]
+        ordem = np.lexsort((t, pares))
+        # Chave crescente par*(N+1) + linha: contagem de um par até um corte = busca binária
+        self._chaves = pares[ordem] * (self.total + 1) + t[ordem]
+        self._linhas = t[ordem]
+
+    def no_corte(self, n):
+        """
+        (último estado, {próximo: %}) da série até a linha n-1, no formato de
+        calcular_matriz_transicao (% com 1 casa; ordem = primeira ocorrência).
+        None se a série do corte estiver vazia.
+        """
+        if n <= self.inicio:
+            return None
+        qtd = len(self.rotulos)
+        ultimo = int(self.codigos[n - 1])
+        base = (ultimo * qtd + np.arange(qtd, dtype=np.int64)) * (self.total + 1)
+        ini = np.searchsorted(self._chaves, base)
+        fim = np.searchsorted(self._chaves, base + (n - 1))   # transições com origem t < n-1
+        contagens = fim - ini
+        seguintes = np.flatnonzero(contagens)
+        seguintes = seguintes[np.argsort(self._linhas[ini[seguintes]], kind='stable')]
+        total = int(contagens.sum())
+        probabilidades = {self.rotulos[b]: round(int(contagens[b]) / total * 100, 1) for b in seguintes.tolist()}
+        return self.rotulos[ultimo], probabilidades
+
+
+class IndiceTransicoes:
+    """TransicoesPrefixadas de cada indicador discreto, a partir das features da matriz raiz."""
+
+    def __init__(self, m):
+        f = obter_features(m)
+        self.series = {chave: TransicoesPrefixadas(f[coluna], inicio)
+                       for chave, (coluna, _, inicio) in INDICADORES_DISCRETOS.items()}
+
+    def tendencia(self, chave, n):
+        """Dict de tendência do indicador no corte n (mesmo formato dos analisar_tendencia_*)."""
+        _, nome, _ = INDICADORES_DISCRETOS[chave]
+        estado = self.series[chave].no_corte(n)
+        if estado is None:
+            return None
+        ultimo, probabilidades = estado
+        return {'indicador': nome, 'ultimo_estado': ultimo, 'probabilidades': probabilidades}
+
+
+def indice_transicoes(m):
+    """Índice da matriz (montado uma vez na raiz, compartilhado com os recortes)."""
+    return m.indice('transicoes', IndiceTransicoes)
+
+
+def tendencia_no_corte(m, chave):
+    """Tendência do indicador discreto 'chave' na matriz m (ou recorte), sem reprocessar o histórico."""
+    return indice_transicoes(m).tendencia(chave, len(m))
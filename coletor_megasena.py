@@ -20,6 +20,12 @@ from selenium.webdriver.support import expected_conditions as EC
 from selenium.webdriver.support.ui import WebDriverWait
 from webdriver_manager.chrome import ChromeDriverManager
 
+from app.util.features import atualizar_features
+from app.util.banco import transacao
+from app.util.snapshot import gravar_snapshot_do_banco
+from app.util.agregados import atualizar_agregados_arquivo
+from app.util.cubo import universo_ativado, atualizar_em_segundo_plano
+
 # --- Configurações Globais ---
 os.environ['WDM_LOG'] = '0'
 DIRETORIO_SCRIPT = os.path.dirname(os.path.abspath(__file__))
@@ -99,7 +105,7 @@ class BaseLotteryScraper:
         );"""
 
         try:
-            with sqlite3.connect(self.caminho_banco_dados) as conn:
+            with transacao(self.caminho_banco_dados) as conn:
                 cursor = conn.cursor()
                 cursor.execute(query_create_table)
                 conn.commit()
@@ -113,7 +119,7 @@ class BaseLotteryScraper:
         if not os.path.exists(self.caminho_banco_dados):
             return 0
         try:
-            with sqlite3.connect(self.caminho_banco_dados) as conn:
+            with transacao(self.caminho_banco_dados) as conn:
                 cursor = conn.cursor()
                 cursor.execute(f"SELECT MAX(Concurso) FROM {self.nome_tabela_resultados}")
                 resultado = cursor.fetchone()
@@ -128,10 +134,11 @@ class BaseLotteryScraper:
             logging.info("Nenhum novo resultado para salvar.")
             return True
         try:
-            with sqlite3.connect(self.caminho_banco_dados) as conn:
+            with transacao(self.caminho_banco_dados) as conn:
                 df_results.to_sql(
                     self.nome_tabela_resultados, conn, if_exists="append", index=False
                 )
+                self._after_results_saved(conn)
             logging.info(f"Salvo com sucesso: {len(df_results)} novo(s) resultado(s) para {self.lottery_name}.")
             return True
         except sqlite3.IntegrityError:
@@ -141,6 +148,10 @@ class BaseLotteryScraper:
             logging.error(f"Erro inesperado ao salvar dados no banco: {e}")
             return False
 
+    def _after_results_saved(self, conn: sqlite3.Connection):
+        """Gancho executado na mesma conexão logo após gravar novos resultados."""
+        pass
+
     def _search_contest(self, contest_number: int) -> bool:
         """Preenche o campo de busca e pesquisa por um concurso específico."""
         try:
@@ -265,6 +276,36 @@ class MegaSenaScraper(BaseLotteryScraper):
             ball_list_xpath='//ul[contains(@class, "numbers")]/li'
         )
 
+    def _after_results_saved(self, conn: sqlite3.Connection):
+        """Mantém features, snapshot binário e agregados do dashboard em dia com os concursos salvos."""
+        try:
+            gravadas = atualizar_features(conn)
+            logging.info(f"Features atualizadas para {gravadas} concurso(s).")
+        except Exception as e:
+            # Não invalida o resultado salvo; o backfill (python -m app.util.features) corrige depois
+            logging.error(f"Erro ao atualizar features: {e}")
+        try:
+            total = gravar_snapshot_do_banco(conn, self.caminho_banco_dados)
+            logging.info(f"Snapshot binário regravado com {total} concurso(s).")
+        except Exception as e:
+            # Ex: no Windows, servidor com o arquivo mapeado. O servidor detecta o
+            # snapshot desatualizado e lê pelo banco; o launcher regrava depois.
+            logging.error(f"Erro ao gravar snapshot do histórico: {e}")
+        try:
+            ag = atualizar_agregados_arquivo(conn, self.caminho_banco_dados)
+            logging.info(f"Agregados do dashboard atualizados até o concurso {ag.ultimo_concurso}.")
+        except Exception as e:
+            # O servidor reconstrói os agregados a partir do histórico se o arquivo faltar
+            logging.error(f"Erro ao atualizar agregados do dashboard: {e}")
+        if universo_ativado():
+            try:
+                # ~35 s (e ~800 MB de cubo na primeira vez): roda em outro processo, o coletor não espera
+                proc = atualizar_em_segundo_plano(self.caminho_banco_dados)
+                logging.info(f"Universo pontuado sendo atualizado em segundo plano (PID {proc.pid}).")
+            except Exception as e:
+                # Sem o universo em dia, /teste-preditivo segue com a geração em fluxo
+                logging.error(f"Erro ao iniciar a pontuação do universo: {e}")
+
 if __name__ == "__main__":
     # --- Execução da Coleta ---
     
@@ -1,102 +1,62 @@
 # main.py
-from flask import Flask, render_template, g, request 
-import sqlite3
+from flask import Flask, render_template, request
 import os
 import time
-import random
-from collections import Counter, defaultdict
+from collections import Counter
+from html import escape
+from urllib.parse import urlencode
+import numpy as np
 
 # Importações do seu projeto
-from app.util.estatisticas import (
-    carregar_todos_resultados, 
-    analisar_basicos, 
-    analisar_iniciais_finais, 
-    analisar_sequenciais, 
-    analisar_repetidas_anterior, 
-    analisar_somas_distribuicao,
-    analisar_frequencia_periodo_distribuicao,
-    analisar_frequencia_geral, 
-    analisar_pares_impares,
-    analisar_distribuicao_maximas,
-    analisar_distribuicao_quadrantes,
-    analisar_ciclos,
-    analisar_padrao_linhas_colunas,
-    analisar_atrasos,
-    analisar_deltas
-)
-from app.util.config_mega import DATABASE_NAME, LISTA_PRIMOS, LISTA_FIBONACCI, LISTA_MULTIPLOS_3
-from app.util.analise_preditiva import gerar_perfil_preditivo_completo, extrair_perfil_alvo_completo
-from app.util.gerador import gerar_universo_filtrado
-from app.util.pontuacao import calcular_pontuacao_binaria
+from app.util.config_mega import DATABASE_NAME, LISTA_FIBONACCI
+from app.util.analise_preditiva import extrair_perfil_alvo_completo, montar_gabarito
+from app.util.perfis import perfil_preditivo
+from app.util.gerador import gerar_universo_filtrado, gerar_universo_em_blocos, escolher_metodo
+from app.util.baldes import BaldesLimitados, encher_baldes, selecionar_com_diversificacao
+from app.util.cubo import METODO_UNIVERSO, TOP_N_QUADRANTES_PREDITIVO, universo_do_perfil, assinatura_perfil
+from app.util.aleatorio import FLUXO_SELECAO, nova_semente, fluxo_python
+from app.util.pontuacao import PerfilCompilado, pontuar_mascaras, agrupar_por_score, atende, padrao_quadrantes
+from app.util.mascaras import mascara_jogo
+from app.util.exportacao import exportar_universo, novo_pacote
 from app.util.simulation import simular_cenario_passado
 from app.util.similarity import buscar_concursos_similares
+from app.util.historico import obter_cache_historico, obter_matriz, obter_agregados
+from app.util.cache_http import CachePaginas
+from app.util.banco import conexao_leitura, fechar_conexoes_thread
 
 app = Flask(__name__, template_folder='app/templates', static_folder='app/static')
 BASE_DIR = os.path.dirname(os.path.abspath(__file__))
 DB_PATH = os.path.join(BASE_DIR, DATABASE_NAME)
+# Opções de gerador do formulário do teste preditivo (ver app/util/gerador.py)
+GERADORES_FORMULARIO = [('auto', 'Auto'), ('lote', 'Lote'), ('dirigido', 'Dirigido'),
+                        ('exaustivo', 'Exaustivo'), ('legado', 'Legado')]
 
 # --- CONFIGURAÇÃO DO BANCO ---
 def get_db():
-    db = getattr(g, '_database', None)
-    if db is None:
-        db = g._database = sqlite3.connect(DB_PATH)
-        db.row_factory = sqlite3.Row
-    return db
+    # Conexão somente-leitura da thread, reaproveitada dentro da requisição (app/util/banco.py)
+    return conexao_leitura(DB_PATH)
 
 @app.teardown_appcontext
 def close_connection(exception):
-    db = getattr(g, '_database', None)
-    if db is not None:
-        db.close()
+    # Uma thread por requisição no servidor de desenvolvimento: sem isso cada thread deixaria conexões abertas
+    fechar_conexoes_thread()
 
 # --- ROTA PRINCIPAL (DASHBOARD) ---
+# O dashboard só depende do histórico: HTML (e gzip) renderizado uma vez por versão
+_cache_dashboard = CachePaginas()
+
 @app.route('/')
 def index():
-    df = carregar_todos_resultados(DB_PATH)
+    df, versao = obter_cache_historico(DB_PATH).obter_versionado()
     if df.empty: return "Erro: Banco vazio."
+    return _cache_dashboard.obter(versao, lambda: renderizar_dashboard(df)).responder(request)
+
+def renderizar_dashboard(df):
     ultimo = df.iloc[-1].to_dict()
-    
-    freq_geral, top_10, bottom_10 = analisar_frequencia_geral(df)
-    stats_pares = analisar_pares_impares(df)
-    stats_soma_dist = analisar_somas_distribuicao(df)
-    basicos = analisar_basicos(df)
-    ini, fim = analisar_iniciais_finais(df)
-    sequencias = analisar_sequenciais(df)
-    rep_anterior = analisar_repetidas_anterior(df)
-    stats_quadrantes = analisar_distribuicao_quadrantes(df)
-    rep_39_dist = analisar_frequencia_periodo_distribuicao(df, 39)
-    rep_21_dist = analisar_frequencia_periodo_distribuicao(df, 21)
-    dist_max_39 = analisar_distribuicao_maximas(df, 39)
-    dist_max_21 = analisar_distribuicao_maximas(df, 21)
-    ciclo_atual = analisar_ciclos(df)
-    padrao_linhas_cols = analisar_padrao_linhas_colunas(df)
-    ranking_atrasos = analisar_atrasos(df)
-    dist_deltas = analisar_deltas(df)
+    # Agregados incrementais: O(1) por sorteio novo, sem varrer o histórico
+    painel = obter_agregados(DB_PATH).painel()
 
-    return render_template('index.html', 
-                           ultimo_sorteio=ultimo,
-                           freq_geral=freq_geral,
-                           top_10=top_10,
-                           bottom_10=bottom_10,
-                           stats_pares=stats_pares,
-                           stats_soma_dist=stats_soma_dist,
-                           stats_primos=basicos['primos'],
-                           stats_fibo=basicos['fibo'],
-                           stats_mult3=basicos['mult3'],
-                           stats_ini=ini,
-                           stats_fim=fim,
-                           stats_seq=sequencias,
-                           stats_rep_ant=rep_anterior,
-                           stats_rep_39=rep_39_dist,
-                           stats_rep_21=rep_21_dist,
-                           dist_max_39=dist_max_39,
-                           dist_max_21=dist_max_21,
-                           stats_quadrantes=stats_quadrantes,
-                           ciclo_atual=ciclo_atual,
-                           stats_lin_col=padrao_linhas_cols,
-                           ranking_atrasos=ranking_atrasos,
-                           dist_deltas=dist_deltas
-                           )
+    return render_template('index.html', ultimo_sorteio=ultimo, **painel)
 
 # ==============================================================================
 #                        MÓDULO PREDITIVO VISUAL (CORRIGIDO)
@@ -130,58 +90,7 @@ def estilo_celula(match):
         # Cinza Neutro
         return 'color: #90a4ae;'
 
-# 3. HELPER: Validação Lógica (Sincronizada com pontuacao.py)
-def verificar_match(chave, valor, gabarito):
-    """
-    Verifica se o valor atende ao requisito do gabarito.
-    Sincronizado com a lógica do arquivo pontuacao.py para garantir que a cor verde
-    apareça exatamente quando o score é pontuado.
-    """
-    if chave not in gabarito: return False
-    
-    item = gabarito[chave]
-    alvos = item.get('alvo', [])
-    limites = item.get('limites') # Pode ser lista [mu, sigma] ou dict
-
-    # A. Caso Quadrantes (String vs String formatada)
-    if chave == 'quadrantes':
-        alvos_limpos = [str(a).replace('-', '') for a in alvos]
-        return str(valor) in alvos_limpos
-
-    # B. Caso Faixas Estatísticas (Soma, Deltas, Temps)
-    # A lógica aqui DEVE ser igual à do pontuacao.py -> classificar_faixa
-    if limites and isinstance(limites, (list, tuple)) and len(limites) == 2:
-        try:
-            mu, sigma = limites
-            v_float = float(valor)
-            
-            # Recria a lógica de classificação do pontuacao.py
-            categoria = "Muito Alto"
-            if v_float < mu - 1.5*sigma: categoria = "Muito Baixo"
-            elif v_float < mu - 0.5*sigma: categoria = "Baixo"
-            elif v_float <= mu + 0.5*sigma: categoria = "Média"
-            elif v_float <= mu + 1.5*sigma: categoria = "Alto"
-            
-            # Verifica se a categoria calculada está na lista de alvos (ex: ['Média', 'Alto'])
-            if categoria in alvos:
-                return True
-        except:
-            pass
-
-    # C. Caso Comparação Direta (Pares, Primos, Linhas, Colunas, MaxRep)
-    if isinstance(alvos, list):
-        # Tenta string exata
-        if str(valor) in [str(x) for x in alvos]: return True
-        
-        # Tenta numérico
-        try:
-            if float(valor) in [float(x) for x in alvos]: return True
-        except:
-            pass
-
-    return False
-
-# 4. ROTA DO TESTE PREDITIVO (ATUALIZADA COM SELETOR DE MODELO)
+# 3. ROTA DO TESTE PREDITIVO (ATUALIZADA COM SELETOR DE MODELO)
 @app.route('/teste-preditivo')
 def teste_preditivo():
     start_time = time.time()
@@ -190,6 +99,15 @@ def teste_preditivo():
     qtd_jogos = request.args.get('qtd', default=100, type=int)
     # NOVO: Captura o modelo (F4 ou F5)
     modelo_geracao = request.args.get('modelo', default='F4', type=str)
+    # gerador=auto (padrão): lote (modelo F4/F5); gerador=dirigido varre o score máximo exato;
+    # gerador=legado volta ao laço original, jogo a jogo (para comparação);
+    # gerador=exaustivo amostra de todas as combinações válidas, sem modelo: dos baldes exatos
+    # do universo pontuado do concurso (python -m app.util.cubo) quando existe, senão pelo enumerador
+    metodo_geracao = gerador_pedido = request.args.get('gerador', default='auto', type=str)
+    # semente=N repete exatamente universo e seleção (sem semente: nova, exibida no resultado)
+    semente = semente_pedida = request.args.get('semente', type=int)
+    if semente is None or semente < 0:
+        semente, semente_pedida = nova_semente(), None
     
     try:
         s1, p1 = int(request.args.get('s1', 12)), int(request.args.get('p1', 20))
@@ -201,93 +119,68 @@ def teste_preditivo():
         s1, p1, s2, p2, s3, p3, s4, p4, perc_pressao = 12, 20, 11, 30, 10, 30, 9, 20, 60
 
     corte_z = request.args.get('z', default=2.0, type=float)
+    # exportar=1 grava o universo pontuado em exportacoes/ (app/util/exportacao.py)
+    exportar = request.args.get('exportar', default=0, type=int)
     
     print(f"--- MOTOR PREDITIVO V5.5 (Modelo {modelo_geracao}) ---")
     
     # --- Dados ---
-    df = carregar_todos_resultados(DB_PATH)
-    predicao = gerar_perfil_preditivo_completo(df)
-    perfil_alvo_raw = extrair_perfil_alvo_completo(predicao, top_n_quadrantes=15)
+    m = obter_matriz(DB_PATH)
+    predicao = perfil_preditivo(m, DB_PATH)  # memorizado por versão do histórico
+    perfil_alvo_raw = extrair_perfil_alvo_completo(predicao, top_n_quadrantes=TOP_N_QUADRANTES_PREDITIVO)
     ultimo_sorteio = list(predicao['ultimo_sorteio'])
     
-    # Monta Gabarito
-    gabarito = {}
-    for k in perfil_alvo_raw:
-        gabarito[k] = {'alvo': perfil_alvo_raw[k]}
-        if k in predicao and 'limites' in predicao[k]:
-            gabarito[k]['limites'] = predicao[k]['limites']
+    # Monta Gabarito (o mesmo do job do universo pontuado)
+    gabarito = montar_gabarito(predicao, TOP_N_QUADRANTES_PREDITIVO)
 
     # --- GERAÇÃO (Atualizado) ---
     qtd_candidatos_brutos = 300000
-    
-    # Passa o modelo e o mapa de scores para a geração inteligente
-    pool = gerar_universo_filtrado(
-        qtd_candidatos_brutos, 
-        ultimo_sorteio, 
-        mapa_scores=predicao['mapa_39'], 
-        modelo=modelo_geracao
-    )
-    
-    # Pontuação
-    baldes = defaultdict(list)
+    configs = [(s1, p1), (s2, p2), (s3, p3), (s4, p4)]
     mapa39 = predicao['mapa_39']
     mapa21 = predicao['mapa_21']
-    scores_audit = []
+    # exaustivo: baldes exatos do universo pontuado do concurso (app/util/cubo.py), se o job já rodou
+    # para este perfil; os outros geradores seguem o modelo escolhido, que o universo não reproduz
+    universo = None
+    if metodo_geracao == METODO_UNIVERSO and not exportar:
+        universo = universo_do_perfil(DB_PATH, assinatura_perfil(gabarito, mapa39, mapa21, ultimo_sorteio))
+    metodo_geracao = 'universo' if universo is not None else escolher_metodo(metodo_geracao)
     
-    for jogo in pool:
-        score = calcular_pontuacao_binaria(jogo, gabarito, mapa39, mapa21)
-        baldes[score].append(jogo)
-        scores_audit.append(score)
-        
-    max_score_found = max(scores_audit) if scores_audit else 0
+    # Passa o modelo e o mapa de scores para a geração inteligente
+    # (baldes limitados às metas: a geração em fluxo para quando todos enchem)
+    baldes_metas = BaldesLimitados.das_metas(qtd_jogos, configs)
+    geracao = dict(mapa_scores=mapa39, modelo=modelo_geracao, metodo=metodo_geracao, semente=semente,
+                   perfil=gabarito, mapa_21=mapa21, cotas=baldes_metas.cotas())
+    compilado = PerfilCompilado(gabarito, mapa39, mapa21)
     
-    # Seleção
-    finalistas = []
-    dezenas_pressao = predicao['ciclo_faltantes'].union(predicao['atrasadas_criticas'])
-    uso_global = Counter()
-
-    def selecionar_com_diversificacao(nota_alvo, qtd_meta, lista_existente):
-        candidatos = baldes[nota_alvo]
-        if not candidatos: return []
-        random.shuffle(candidatos)
-        selecionados_agora = []
-        
-        for jogo in candidatos:
-            if len(selecionados_agora) >= qtd_meta: break
-            if jogo in lista_existente: continue
-            
-            tem_pressao = bool(set(jogo).intersection(dezenas_pressao))
-            if perc_pressao > 0 and not tem_pressao:
-                if random.random() < 0.6: continue
-
-            pontos_repeticao = sum([uso_global[d] for d in jogo])
-            if pontos_repeticao < 25: 
-                selecionados_agora.append(jogo)
-                for d in jogo: uso_global[d] += 1
-        
-        if len(selecionados_agora) < qtd_meta:
-            for jogo in candidatos:
-                if len(selecionados_agora) >= qtd_meta: break
-                if jogo not in lista_existente and jogo not in selecionados_agora:
-                    selecionados_agora.append(jogo)
-                    for d in jogo: uso_global[d] += 1
-        return selecionados_agora
-
-    configs = [(s1, p1), (s2, p2), (s3, p3), (s4, p4)]
-    for meta_score, perc in configs:
-        falta = qtd_jogos - len(finalistas)
-        if falta <= 0: break
-        cota = int(qtd_jogos * (perc/100))
-        finalistas.extend(selecionar_com_diversificacao(meta_score, cota, finalistas))
-
-    if len(finalistas) < qtd_jogos:
-        for sc in range(max_score_found, -1, -1):
-            if len(finalistas) >= qtd_jogos: break
-            if sc in [s1, s2, s3, s4]: continue
-            falta = qtd_jogos - len(finalistas)
-            finalistas.extend(selecionar_com_diversificacao(sc, falta, finalistas))
-
-    jogos_finais = finalistas[:qtd_jogos]
+    # Pontuação (pool e baldes são arrays de máscaras uint64)
+    if exportar:
+        # A exportação guarda o universo inteiro pontuado
+        pool = gerar_universo_filtrado(qtd_candidatos_brutos, ultimo_sorteio, **geracao)
+        scores_audit, criterios = pontuar_mascaras(pool, compilado, mapa39, mapa21, com_criterios=True)
+        caminho = exportar_universo(
+            novo_pacote(f"universo_{int(m.concursos[-1])}"), pool, scores_audit, criterios,
+            metadados={'concurso_base': int(m.concursos[-1]), 'modelo': modelo_geracao, 'gabarito': gabarito})
+        print(f"Universo exportado em {caminho}")
+        baldes = agrupar_por_score(pool, scores_audit)
+        max_score_found = int(scores_audit.max()) if len(scores_audit) else 0
+    elif universo is not None:
+        # Todas as combinações já pontuadas: amostra uniforme de cada score, nas cotas dos baldes
+        baldes = universo.sortear(baldes_metas.cotas(), semente)
+        max_score_found = universo.max_score
+    else:
+        encher_baldes(gerar_universo_em_blocos(qtd_candidatos_brutos, ultimo_sorteio, **geracao),
+                      baldes_metas, compilado, mapa39, mapa21)
+        baldes = baldes_metas.baldes()
+        max_score_found = baldes_metas.max_score
+    
+    # Seleção (app/util/baldes.py): sem dezena de pressão, o jogo é descartado com 60% de chance
+    mascara_pressao = mascara_jogo(predicao['ciclo_faltantes'].union(predicao['atrasadas_criticas']))
+    finalistas = selecionar_com_diversificacao(
+        baldes, configs, qtd_jogos, max_score_found, mascara_pressao, 60 if perc_pressao > 0 else 0,
+        fluxo_python(semente, FLUXO_SELECAO), pular_metas_na_sobra=True)
+    jogos_finais = [jogo for jogo, _ in finalistas]
+    scores_finais = [score for _, score in finalistas]      # score do balde de onde cada jogo saiu
+    mascara_ultimo = mascara_jogo(ultimo_sorteio)
     tempo_proc = time.time() - start_time
 
     # --- HTML VIEW ---
@@ -295,6 +188,11 @@ def teste_preditivo():
     atrasos_filtrados = [d for d in predicao['lista_atrasos_completa'] if d['z_score'] >= corte_z]
     quadrantes_html = html_tags(perfil_alvo_raw['quadrantes'], classe='tag-quad')
     
+    # Gerador e semente voltam para o formulário; 'repetir' refaz esta execução com a semente usada
+    opcoes_gerador = ''.join(
+        f'<option value="{valor}" {"selected" if gerador_pedido == valor else ""}>{rotulo}</option>'
+        for valor, rotulo in GERADORES_FORMULARIO)
+    link_repetir = escape(urlencode({**request.args.to_dict(), 'semente': semente}))
     html_form = f"""
     <form action="/teste-preditivo" method="get" style="background:#e8f5e9; padding:15px; border-radius:8px; margin-bottom:20px; border: 1px solid #c8e6c9; box-shadow: 0 2px 4px rgba(0,0,0,0.05);">
         <div style="display:flex; gap:15px; flex-wrap:wrap; align-items:center; justify-content:center;">
@@ -333,9 +231,19 @@ def teste_preditivo():
                 <label style="font-size:0.8em; color:#d32f2f; font-weight:bold;">Pressão</label><br>
                 <input type="number" name="pressao" value="{perc_pressao}" style="width:60px; padding:5px; text-align:center; border:1px solid #ccc; border-radius:4px;">
             </div>
+            <div style="text-align:center; background:white; padding:5px; border-radius:5px; border:1px solid #a5d6a7;">
+                <label style="font-weight:bold; font-size:0.7em; color:#1b5e20; display:block; margin-bottom:2px;">Gerador</label>
+                <select name="gerador" style="padding:4px; border:1px solid #ccc; border-radius:4px; color:#333;">
+                    {opcoes_gerador}
+                </select>
+            </div>
+            <div style="text-align:center;">
+                <label style="font-size:0.8em; color:#1b5e20; font-weight:bold;">Semente</label><br>
+                <input type="number" name="semente" min="0" value="{'' if semente_pedida is None else semente_pedida}" placeholder="nova" style="width:130px; padding:5px; text-align:center; border:1px solid #ccc; border-radius:4px;">
+            </div>
             <button type="submit" style="background:#2e7d32; color:white; border:none; padding:0 25px; height:45px; border-radius:4px; cursor:pointer; font-weight:bold; box-shadow: 0 2px 5px rgba(0,0,0,0.2);">PROCESSAR</button>
         </div>
-        <div style="margin-top:8px; font-size:0.8em; color:#555;">Max Score: <strong>{max_score_found}</strong> | Tempo: {tempo_proc:.2f}s</div>
+        <div style="margin-top:8px; font-size:0.8em; color:#555;">Max Score: <strong>{max_score_found}</strong> | Tempo: {tempo_proc:.2f}s | Semente: {semente} (<a href="/teste-preditivo?{link_repetir}">repetir</a>)</div>
     </form>
     """
 
@@ -374,50 +282,48 @@ def teste_preditivo():
         <tbody>
     """
     
+    # Bits de critério e métricas de todos os finalistas numa chamada (mesmo kernel da pontuação)
+    if jogos_finais:
+        _, criterios_finais, metricas_finais = compilado.avaliar(np.array(jogos_finais))
+        criterios_finais = criterios_finais.tolist()
+        metricas_finais = {c: v.tolist() for c, v in metricas_finais.items()}
+
     for i, jogo in enumerate(jogos_finais):
-        score = calcular_pontuacao_binaria(jogo, gabarito, mapa39, mapa21)
+        score = scores_finais[i]
+        bits = criterios_finais[i]
         
-        soma = sum(jogo)
-        pares = len([x for x in jogo if x % 2 == 0])
-        primos = len([x for x in jogo if x in LISTA_PRIMOS])
+        soma = metricas_finais['soma'][i]
+        pares = metricas_finais['pares'][i]
+        primos = metricas_finais['primos'][i]
         fibo = len([x for x in jogo if x in LISTA_FIBONACCI])
-        mult3 = len([x for x in jogo if x in LISTA_MULTIPLOS_3])
-        repetidas = len(set(jogo).intersection(set(ultimo_sorteio)))
-        sb = sorted(jogo)
-        sequenciais = sum([1 for k in range(len(sb)-1) if sb[k+1] == sb[k]+1])
-        deltas = sum([sb[k+1]-sb[k] for k in range(len(sb)-1)])
+        mult3 = metricas_finais['mult3'][i]
+        mascara = mascara_jogo(jogo)
+        repetidas = (mascara & mascara_ultimo).bit_count()
+        sequenciais = (mascara & (mascara >> 1)).bit_count()
+        deltas = metricas_finais['deltas'][i]
         max_iniciais = max(Counter([d // 10 for d in jogo]).values() or [0])
         max_finais = max(Counter([d % 10 for d in jogo]).values() or [0])
-        linhas = len(set([(d-1)//10 for d in jogo]))
-        colunas = len(set([(d-1)%10 for d in jogo]))
-        t39 = sum([mapa39.get(d, 0) for d in jogo])
-        t21 = sum([mapa21.get(d, 0) for d in jogo])
-        mr39 = max([mapa39.get(d, 0) for d in jogo]) if jogo else 0
-        mr21 = max([mapa21.get(d, 0) for d in jogo]) if jogo else 0
-        
-        q1 = q2 = q3 = q4 = 0
-        for n in jogo:
-            col = (n - 1) % 10
-            if n <= 30:
-                if col < 5: q1 += 1
-                else: q2 += 1
-            else:
-                if col < 5: q3 += 1
-                else: q4 += 1
-        quad_str = f"{q1}{q2}{q3}{q4}"
+        linhas = metricas_finais['linhas'][i]
+        colunas = metricas_finais['colunas'][i]
+        t39 = metricas_finais['temp39'][i]
+        t21 = metricas_finais['temp21'][i]
+        mr39 = metricas_finais['max_rep_39'][i]
+        mr21 = metricas_finais['max_rep_21'][i]
+        quad_str = padrao_quadrantes(metricas_finais['quadrantes'][i])
         
-        st_soma = estilo_celula(verificar_match('soma', soma, gabarito))
-        st_par = estilo_celula(verificar_match('pares', pares, gabarito))
-        st_pri = estilo_celula(verificar_match('primos', primos, gabarito))
-        st_m3 = estilo_celula(verificar_match('mult3', mult3, gabarito))
-        st_delt = estilo_celula(verificar_match('deltas', deltas, gabarito))
-        st_quad = estilo_celula(verificar_match('quadrantes', quad_str, gabarito))
-        st_lin = estilo_celula(verificar_match('linhas', linhas, gabarito))
-        st_col = estilo_celula(verificar_match('colunas', colunas, gabarito))
-        st_t39 = estilo_celula(verificar_match('temp39', t39, gabarito))
-        st_t21 = estilo_celula(verificar_match('temp21', t21, gabarito))
-        st_mr39 = estilo_celula(verificar_match('max_rep_39', mr39, gabarito))
-        st_mr21 = estilo_celula(verificar_match('max_rep_21', mr21, gabarito))
+        # Verde exatamente quando o critério pontuou (bit aceso na máscara de critérios)
+        st_soma = estilo_celula(atende(bits, 'soma'))
+        st_par = estilo_celula(atende(bits, 'pares'))
+        st_pri = estilo_celula(atende(bits, 'primos'))
+        st_m3 = estilo_celula(atende(bits, 'mult3'))
+        st_delt = estilo_celula(atende(bits, 'deltas'))
+        st_quad = estilo_celula(atende(bits, 'quadrantes'))
+        st_lin = estilo_celula(atende(bits, 'linhas'))
+        st_col = estilo_celula(atende(bits, 'colunas'))
+        st_t39 = estilo_celula(atende(bits, 'temp39'))
+        st_t21 = estilo_celula(atende(bits, 'temp21'))
+        st_mr39 = estilo_celula(atende(bits, 'max_rep_39'))
+        st_mr21 = estilo_celula(atende(bits, 'max_rep_21'))
         st_neutro = "color: #78909c;"
 
         jogo_fmt = ' '.join([f'<span class="num-bola">{n:02d}</span>' for n in jogo])
@@ -596,28 +502,25 @@ def gerar_html_atrasos(lista_atrasos):
 
 @app.route('/analise-similaridade')
 def analise_similaridade():
-    df = carregar_todos_resultados(DB_PATH)
+    m = obter_matriz(DB_PATH)
     
     # ID base opcional (se não passar, pega o último)
     id_req = request.args.get('id', type=int)
     if id_req:
-        try:
-            idx_alvo = df[df['Concurso'] == id_req].index[0]
-        except:
+        idx_alvo = m.posicao(id_req)
+        if idx_alvo is None:
             return "Concurso não encontrado."
     else:
-        idx_alvo = len(df) - 1
+        idx_alvo = len(m) - 1
         
-    similares, perfil_alvo = buscar_concursos_similares(df, idx_alvo, top_n=30)
+    similares, perfil_alvo = buscar_concursos_similares(m, idx_alvo, top_n=30)
     
     # Adiciona o resultado futuro para exibição na tabela
     for item in similares:
         idx_fut = item['indice_df'] + 1
-        if idx_fut < len(df):
-            row = df.iloc[idx_fut]
-            cols = [f'Bola{i}' for i in range(1, 7)]
-            item['concurso_futuro'] = int(row['Concurso'])
-            item['res_futuro'] = row[cols].dropna().astype(int).tolist()
+        if idx_fut < len(m):
+            item['concurso_futuro'] = int(m.concursos[idx_fut])
+            item['res_futuro'] = m.dezenas[idx_fut].tolist()
         else:
             item['concurso_futuro'] = "N/A"
             item['res_futuro'] = []
@@ -633,14 +536,15 @@ def simular_cenario_route():
         's2': request.args.get('s2', 11, type=int), 'p2': request.args.get('p2', 30, type=int),
         's3': request.args.get('s3', 10, type=int), 'p3': request.args.get('p3', 30, type=int),
         's4': request.args.get('s4', 9, type=int),  'p4': request.args.get('p4', 20, type=int),
-        'pressao': request.args.get('pressao', 60, type=int)
+        'pressao': request.args.get('pressao', 60, type=int),
+        'gerador': request.args.get('gerador', 'auto', type=str),
+        'semente': request.args.get('semente', type=int)
     }
     cid = request.args.get('cid', type=int)
     
     if not cid: return "ID do concurso obrigatório"
     
-    df = carregar_todos_resultados(DB_PATH)
-    res = simular_cenario_passado(df, cid, params)
+    res = simular_cenario_passado(obter_matriz(DB_PATH), cid, params, DB_PATH)
     
     return render_template('resultado_simulacao.html', res=res)
 
@@ -653,17 +557,19 @@ def simular_lote():
     params = {
         'qtd': int(params_form.get('qtd', 100)),
         'modelo': params_form.get('modelo', 'F4'), # Captura modelo
+        'gerador': params_form.get('gerador', 'auto'),
         's1': int(params_form.get('s1', 12)), 'p1': int(params_form.get('p1', 20)),
         's2': int(params_form.get('s2', 11)), 'p2': int(params_form.get('p2', 30)),
         's3': int(params_form.get('s3', 10)), 'p3': int(params_form.get('p3', 30)),
         's4': int(params_form.get('s4', 9)),  'p4': int(params_form.get('p4', 20)),
-        'pressao': int(params_form.get('pressao', 60))
+        'pressao': int(params_form.get('pressao', 60)),
+        'exportar': bool(params_form.get('exportar', False)),
+        'semente': int(params_form['semente']) if params_form.get('semente') not in (None, '') else None
     }
     
-    df = carregar_todos_resultados(DB_PATH)
     from app.util.simulation import simular_lote_cenarios
     
-    resultados = simular_lote_cenarios(df, ids, params)
+    resultados = simular_lote_cenarios(obter_matriz(DB_PATH), ids, params, DB_PATH)
     return render_template('partial_lote_results.html', resultados=resultados)
 
 if __name__ == '__main__':
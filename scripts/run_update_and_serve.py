@@ -2,6 +2,12 @@
 Launcher: run_update_and_serve.py
 
 - Runs the collector to update the DB (coletor_megasena.py)
+- Makes sure the binary history snapshot next to the DB is current, so the
+  server maps it with np.memmap at startup instead of loading via sqlite3 + pandas
+- Optionally (--universo or MEGASENA_UNIVERSO=1) refreshes the fully scored universe
+  of the current draw in the background (app/util/cubo.py; the first run also builds
+  the ~800 MB feature cube). Startup never waits for it: until it is ready the
+  server generates candidates per request as usual
 - Then starts the Flask app (main.py) in a subprocess
 - Waits until the server is reachable and opens the default browser
 
@@ -40,6 +46,21 @@ def run_collector(python_exe: str) -> int:
     return proc.returncode
 
 
+def refresh_snapshot(python_exe: str) -> int:
+    # The collector rewrites the snapshot when it saves new draws; this covers the
+    # first run and the case where the rewrite failed (e.g. file mapped on Windows)
+    print('> Verificando snapshot binário do histórico...')
+    proc = subprocess.run([python_exe, '-m', 'app.util.snapshot', '--se-desatualizado'], cwd=str(ROOT))
+    return proc.returncode
+
+
+def refresh_universe_background(python_exe: str) -> subprocess.Popen:
+    # Opt-in and non-blocking: the job takes ~35 s per draw (plus the one-time cube build);
+    # a lock file in app.util.cubo skips it if the collector already started one
+    print('> Atualizando universo pontuado em segundo plano...')
+    return subprocess.Popen([python_exe, '-m', 'app.util.cubo', '--se-desatualizado'], cwd=str(ROOT))
+
+
 def start_main_server(python_exe: str) -> subprocess.Popen:
     if not MAIN.exists():
         raise FileNotFoundError(f'main.py não encontrado em {MAIN}')
@@ -72,6 +93,13 @@ def main():
         # Decide to continue or not — we will abort to be safe
         sys.exit(code)
 
+    if refresh_snapshot(python_exe) != 0:
+        # Not fatal: the server falls back to reading the DB
+        print('Aviso: não foi possível atualizar o snapshot; o servidor lerá direto do banco.')
+
+    if '--universo' in sys.argv[1:] or os.environ.get('MEGASENA_UNIVERSO', '').strip().lower() in ('1', 'true', 'sim'):
+        refresh_universe_background(python_exe)
+
     server_proc = start_main_server(python_exe)
 
     try:
@@ -0,0 +1,66 @@
+# tests/conftest.py
+"""
+Fixtures compartilhadas. O histórico vem do megasena_db.sqlite3 do repositório,
+lido em modo somente-leitura; testes que gravam usam uma cópia em tmp_path.
+"""
+import os
+import shutil
+import sqlite3
+import sys
+
+import pandas as pd
+import pytest
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if RAIZ not in sys.path:
+    sys.path.insert(0, RAIZ)
+
+from app.util.config_mega import DATABASE_NAME, TABLE_NAME  # noqa: E402
+from app.util.matriz import MatrizSorteios, COLS_BOLAS  # noqa: E402
+
+DB_REPOSITORIO = os.path.join(RAIZ, DATABASE_NAME)
+
+
+def ler_historico(db_path):
+    """DataFrame (Concurso, Data, Bola1..Bola6) sem passar pelos caches do app."""
+    conn = sqlite3.connect(f"file:{db_path}?mode=ro", uri=True)
+    try:
+        return pd.read_sql_query(
+            f"SELECT Concurso, Data, {', '.join(COLS_BOLAS)} FROM {TABLE_NAME} ORDER BY Concurso ASC", conn)
+    finally:
+        conn.close()
+
+
+def prefixo(m, n):
+    """Matriz independente com os n primeiros sorteios (sem compartilhar índices com m)."""
+    return MatrizSorteios(m.concursos[:n].copy(), m.dezenas[:n].copy())
+
+
+@pytest.fixture(scope='session')
+def historico():
+    return ler_historico(DB_REPOSITORIO)
+
+
+@pytest.fixture(scope='session')
+def matriz(historico):
+    return MatrizSorteios.de_dataframe(historico)
+
+
+@pytest.fixture(scope='session')
+def predicao(matriz):
+    from app.util.perfis import perfil_preditivo
+    return perfil_preditivo(matriz)
+
+
+@pytest.fixture(scope='session')
+def gabarito(predicao):
+    from app.util.analise_preditiva import montar_gabarito
+    return montar_gabarito(predicao)
+
+
+@pytest.fixture
+def db_copia(tmp_path):
+    """Cópia do banco do repositório para testes que gravam (snapshot, correções)."""
+    destino = tmp_path / DATABASE_NAME
+    shutil.copyfile(DB_REPOSITORIO, destino)
+    return str(destino)
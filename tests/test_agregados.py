@@ -0,0 +1,36 @@
+# tests/test_agregados.py
+import pytest
+
+from app.util.agregados import AgregadosPainel, estender
+from app.util.estatisticas import calcular_painel
+
+from conftest import prefixo
+
+
+@pytest.mark.parametrize('corte', [1, 40, 500, -1])
+def test_estender_igual_a_reconstruir(matriz, corte):
+    n = corte % len(matriz)
+    ag = AgregadosPainel.reconstruir(prefixo(matriz, n))
+    estender(ag, matriz.concursos[n:].tolist(), matriz.dezenas[n:].tolist())
+    assert ag.para_dict() == AgregadosPainel.reconstruir(matriz).para_dict()
+
+
+def test_estender_ignora_concursos_ja_incorporados(matriz):
+    ag = AgregadosPainel.reconstruir(prefixo(matriz, 100))
+    estender(ag, matriz.concursos[:120].tolist(), matriz.dezenas[:120].tolist())
+    assert ag.para_dict() == AgregadosPainel.reconstruir(prefixo(matriz, 120)).para_dict()
+
+
+def test_salvo_e_estendido_igual_a_reconstruir(matriz, tmp_path):
+    caminho = str(tmp_path / 'agregados.json')
+    n = len(matriz) - 7
+    AgregadosPainel.reconstruir(prefixo(matriz, n)).salvar(caminho)
+    ag = AgregadosPainel.carregar(caminho)
+    estender(ag, matriz.concursos[n:].tolist(), matriz.dezenas[n:].tolist())
+    assert ag.painel() == AgregadosPainel.reconstruir(matriz).painel()
+
+
+@pytest.mark.parametrize('n', [60, None])
+def test_painel_igual_ao_calculo_completo(matriz, n):
+    m = matriz if n is None else prefixo(matriz, n)
+    assert AgregadosPainel.reconstruir(m).painel() == calcular_painel(m)
@@ -0,0 +1,69 @@
+# tests/test_ciclos.py
+import numpy as np
+import pytest
+
+from app.util.ciclos import IndiceCiclos
+from app.util.mascaras import mascara_jogo
+
+from conftest import prefixo
+
+
+def _ciclos_referencia(m):
+    """Mesma regra de analisar_ciclos, sorteio a sorteio: (ciclo, início, vistos) após cada linha."""
+    estados, ciclo_id, inicio, vistos = [], 1, 0, set()
+    for i, jogo in enumerate(m.lista_dezenas()):
+        if len(vistos) == 60:
+            ciclo_id, inicio, vistos = ciclo_id + 1, i, set()
+        vistos.update(jogo)
+        estados.append((ciclo_id, inicio, mascara_jogo(vistos)))
+    return estados
+
+
+def _arrays(indice):
+    return indice.ciclo, indice.inicio, indice.vistos
+
+
+def test_indice_igual_a_referencia(matriz):
+    indice = IndiceCiclos(matriz)
+    ciclo, inicio, vistos = zip(*_ciclos_referencia(matriz))
+    np.testing.assert_array_equal(indice.ciclo, ciclo)
+    np.testing.assert_array_equal(indice.inicio, inicio)
+    np.testing.assert_array_equal(indice.vistos, np.array(vistos, dtype=np.uint64))
+
+
+@pytest.mark.parametrize('n', [1, 5, 200, 1000, -3, -1])
+def test_estender_igual_a_reconstruir(matriz, n):
+    n = n % len(matriz)
+    estendido = IndiceCiclos(prefixo(matriz, n)).estender(matriz)
+    for a, b in zip(_arrays(estendido), _arrays(IndiceCiclos(matriz))):
+        np.testing.assert_array_equal(a, b)
+    assert estendido.total == len(matriz)
+
+
+def test_estender_logo_apos_fechar_um_ciclo(matriz):
+    completo = IndiceCiclos(matriz)
+    # Último sorteio de um ciclo fechado: o próximo abre um ciclo novo
+    fechamentos = np.flatnonzero(np.diff(completo.ciclo)) + 1
+    n = int(fechamentos[len(fechamentos) // 2])
+    estendido = IndiceCiclos(prefixo(matriz, n)).estender(matriz)
+    for a, b in zip(_arrays(estendido), _arrays(completo)):
+        np.testing.assert_array_equal(a, b)
+
+
+def test_estender_matriz_que_nao_continua_reconstroi(matriz):
+    anterior = IndiceCiclos(prefixo(matriz, 300))
+    outra = prefixo(matriz, 600)
+    outra.concursos[299] += 100000           # não é continuação do índice anterior
+    estendido = anterior.estender(outra)
+    for a, b in zip(_arrays(estendido), _arrays(IndiceCiclos(prefixo(matriz, 600)))):
+        np.testing.assert_array_equal(a, b)
+
+
+def test_estado_no_corte(matriz):
+    indice = IndiceCiclos(matriz)
+    referencia = _ciclos_referencia(matriz)
+    for n in (1, 17, len(matriz) // 2, len(matriz)):
+        ciclo, inicio, vistos = referencia[n - 1]
+        assert indice.estado(n) == (ciclo, n - inicio, vistos)
+    with pytest.raises(ValueError):
+        indice.estado(0)
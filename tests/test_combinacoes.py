@@ -0,0 +1,58 @@
+# tests/test_combinacoes.py
+import itertools
+
+import numpy as np
+
+from app.util.combinacoes import (
+    TOTAL_COMBINACOES, ConjuntoJogos, indices_de_jogos, indices_de_mascaras, jogos_de_indices,
+    mascaras_de_indices)
+from app.util.mascaras import mascaras_de_jogos
+
+
+def test_total():
+    assert TOTAL_COMBINACOES == 50063860
+
+
+def test_ida_e_volta_de_indices():
+    rng = np.random.default_rng(19)
+    indices = np.concatenate((
+        np.array([0, 1, 2, TOTAL_COMBINACOES - 2, TOTAL_COMBINACOES - 1]),
+        rng.integers(0, TOTAL_COMBINACOES, 200000))).astype(np.uint32)
+    jogos = jogos_de_indices(indices)
+    assert jogos.dtype == np.uint8
+    assert (np.diff(jogos.astype(np.int64), axis=1) > 0).all()
+    assert jogos.min() >= 1 and jogos.max() <= 60
+    np.testing.assert_array_equal(indices_de_jogos(jogos), indices)
+
+
+def test_ida_e_volta_de_jogos(matriz):
+    indices = indices_de_jogos(matriz.dezenas)
+    np.testing.assert_array_equal(jogos_de_indices(indices), matriz.dezenas)
+    mascaras = mascaras_de_jogos(matriz.dezenas)
+    np.testing.assert_array_equal(indices_de_mascaras(mascaras), indices)
+    np.testing.assert_array_equal(mascaras_de_indices(indices), mascaras)
+
+
+def test_ordem_lexicografica():
+    primeiros = np.array(list(itertools.islice(itertools.combinations(range(1, 61), 6), 5000)))
+    np.testing.assert_array_equal(indices_de_jogos(primeiros), np.arange(5000))
+    np.testing.assert_array_equal(jogos_de_indices(np.arange(5000)), primeiros)
+    np.testing.assert_array_equal(jogos_de_indices([TOTAL_COMBINACOES - 1]), [[55, 56, 57, 58, 59, 60]])
+
+
+def test_ordem_lexicografica_em_torno_de_uma_troca_de_prefixo():
+    # Jogos que começam em 30: índices consecutivos e na ordem de itertools
+    jogos = np.array([(30,) + resto for resto in itertools.combinations(range(31, 61), 5)])
+    indices = indices_de_jogos(jogos).astype(np.int64)
+    np.testing.assert_array_equal(np.diff(indices), 1)
+    assert indices_de_jogos([[29, 56, 57, 58, 59, 60]])[0] == indices[0] - 1
+
+
+def test_conjunto_jogos():
+    conjunto = ConjuntoJogos()
+    entraram = conjunto.adicionar([5, 9, 5, TOTAL_COMBINACOES - 1])
+    assert entraram.tolist() == [True, True, False, True]
+    assert len(conjunto) == 3
+    assert conjunto.contem([5, 6, 9, TOTAL_COMBINACOES - 1]).tolist() == [True, False, True, True]
+    assert conjunto.adicionar([1, 2, 3, 9], limite=2).tolist() == [True, True, False, False]
+    assert conjunto.indices().tolist() == [1, 2, 5, 9, TOTAL_COMBINACOES - 1]
@@ -0,0 +1,33 @@
+# tests/test_cubo.py
+import os
+
+import numpy as np
+
+from app.util import cubo
+from app.util.combinacoes import TOTAL_COMBINACOES
+
+
+def _gravar(db_path, assinatura, qtd_validos=100):
+    scores = np.full(TOTAL_COMBINACOES, cubo.INVALIDO, dtype=np.uint8)
+    scores[:qtd_validos] = 12
+    caminho = cubo.caminho_universo(db_path, assinatura)
+    cubo.gravar_universo(caminho, scores, 1, assinatura)
+    return caminho
+
+
+def test_cada_assinatura_em_um_arquivo_e_cache_so_da_atual(tmp_path):
+    db_path = str(tmp_path / 'megasena_db.sqlite3')
+    antigo = _gravar(db_path, 'a' * 16)
+    universo = cubo.universo_do_perfil(db_path, 'a' * 16)
+    assert universo is not None and len(universo.balde(12)) == 100
+    assert cubo.universo_do_perfil(db_path, 'b' * 16) is None
+
+    # O job grava a nova assinatura ao lado, sem substituir o arquivo mapeado...
+    novo = _gravar(db_path, 'b' * 16, qtd_validos=50)
+    assert novo != antigo and os.path.exists(antigo)
+    assert len(cubo.universo_do_perfil(db_path, 'b' * 16).balde(12)) == 50
+    # ... o servidor solta o antigo ao abrir o novo, e o job pode apagá-lo
+    assert list(cubo._abertos) == [os.path.abspath(novo)]
+    cubo._remover_universos_antigos(db_path, novo)
+    assert not os.path.exists(antigo) and os.path.exists(novo)
+    cubo._abertos.clear()
@@ -0,0 +1,70 @@
+# tests/test_pontuacao.py
+import copy
+
+import numpy as np
+import pytest
+
+from app.util.analise_preditiva import montar_gabarito
+from app.util.mascaras import mascaras_de_jogos
+from app.util.perfis import perfil_preditivo
+from app.util.pontuacao import (
+    CRITERIOS, PerfilCompilado, calcular_criterios_binarios, calcular_pontuacao_binaria, pontuar_mascaras)
+
+
+def _jogos(qtd, semente):
+    rng = np.random.default_rng(semente)
+    return np.sort(np.argsort(rng.random((qtd, 60)), axis=1)[:, :6] + 1, axis=1)
+
+
+def _variantes(gabarito):
+    """O gabarito do perfil e versões com alvos que o perfil real raramente produz."""
+    alterado = copy.deepcopy(gabarito)
+    alterado['max_rep_39']['alvo'] = ['>=5', 3]
+    alterado['linhas']['alvo'] = ['4', 5.0]
+    alterado['soma']['limites'] = ()
+    alterado['soma']['alvo'] = ['Indefinido']
+    return [gabarito, alterado]
+
+
+@pytest.mark.parametrize('corte', [300, 1500, None])
+@pytest.mark.parametrize('top_n', [12, 15])
+def test_kernel_igual_ao_calculo_escalar(matriz, corte, top_n):
+    predicao = perfil_preditivo(matriz if corte is None else matriz.recorte(corte))
+    mapa39, mapa21 = predicao['mapa_39'], predicao['mapa_21']
+    jogos = _jogos(4000, corte or 0)
+    for gabarito in _variantes(montar_gabarito(predicao, top_n)):
+        compilado = PerfilCompilado(gabarito, mapa39, mapa21)
+        esperado = np.array([calcular_criterios_binarios(j, gabarito, mapa39, mapa21) for j in jogos.tolist()])
+        np.testing.assert_array_equal(compilado.criterios(jogos), esperado)
+
+        scores, criterios, metricas = compilado.avaliar(jogos)
+        np.testing.assert_array_equal(criterios, esperado)
+        np.testing.assert_array_equal(
+            scores, [calcular_pontuacao_binaria(j, gabarito, mapa39, mapa21) for j in jogos[:500].tolist()] +
+            [int(c).bit_count() for c in esperado[500:].tolist()])
+        assert set(metricas) == set(CRITERIOS)
+
+
+def test_kernel_nao_depende_da_ordem_das_dezenas(gabarito, predicao):
+    compilado = PerfilCompilado(gabarito, predicao['mapa_39'], predicao['mapa_21'])
+    jogos = _jogos(2000, 1)
+    embaralhados = np.random.default_rng(2).permuted(jogos, axis=1)
+    np.testing.assert_array_equal(compilado.criterios(embaralhados), compilado.criterios(jogos))
+
+
+def test_pontuar_mascaras_igual_ao_kernel(gabarito, predicao):
+    mapa39, mapa21 = predicao['mapa_39'], predicao['mapa_21']
+    jogos = _jogos(20000, 3)
+    compilado = PerfilCompilado(gabarito, mapa39, mapa21)
+    mascaras = mascaras_de_jogos(jogos)
+    np.testing.assert_array_equal(pontuar_mascaras(mascaras, gabarito, mapa39, mapa21), compilado.pontuar(jogos))
+    scores, criterios = pontuar_mascaras(mascaras, compilado, mapa39, mapa21, com_criterios=True)
+    np.testing.assert_array_equal(criterios, compilado.criterios(jogos))
+    np.testing.assert_array_equal(scores, compilado.pontuar(jogos))
+
+
+def test_mapa_de_calor_invalido(gabarito, predicao):
+    mapa = dict(predicao['mapa_39'])
+    mapa[1] = 2.5
+    with pytest.raises(ValueError):
+        PerfilCompilado(gabarito, mapa, predicao['mapa_21'])
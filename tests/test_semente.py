@@ -0,0 +1,121 @@
+# tests/test_semente.py
+import random
+
+import numpy as np
+import pytest
+
+from app.util.aleatorio import FLUXO_SELECAO, chaves_aleatorias, derivar_semente, fluxo_numpy, fluxo_python
+from app.util.baldes import BaldesLimitados, encher_baldes, selecionar_com_diversificacao
+from app.util.gerador import escolher_metodo, gerar_universo_em_blocos, gerar_universo_filtrado, gerar_universo_lote
+from app.util.gerador_dirigido import SCORE_DIRIGIDO, gerar_universo_dirigido
+from app.util.mascaras import mascara_jogo
+from app.util.pontuacao import PerfilCompilado, pontuar_mascaras
+from app.util.simulation import simular_cenario_passado
+
+METAS = [(9, 20), (8, 30), (7, 30), (6, 20)]
+METAS_ALTAS = [(12, 20), (11, 30), (10, 30), (9, 20)]
+
+
+@pytest.fixture(scope='module')
+def geracao(predicao, gabarito):
+    return dict(ultimo_sorteio=list(predicao['ultimo_sorteio']), mapa_scores=predicao['mapa_39'],
+                modelo='F4', perfil=gabarito, mapa_21=predicao['mapa_21'])
+
+
+def test_fluxos_da_semente():
+    assert derivar_semente(7, FLUXO_SELECAO) == derivar_semente(7, FLUXO_SELECAO)
+    assert derivar_semente(7, FLUXO_SELECAO) != derivar_semente(7, FLUXO_SELECAO + 1)
+    assert fluxo_python(7, FLUXO_SELECAO).random() == fluxo_python(7, FLUXO_SELECAO).random()
+    np.testing.assert_array_equal(fluxo_numpy(7, 1).integers(0, 60, 50), fluxo_numpy(7, 1).integers(0, 60, 50))
+    valores = np.arange(1000, dtype=np.uint64)
+    chaves = chaves_aleatorias(valores, 7, 1)
+    assert len(np.unique(chaves)) == len(valores)
+    # A chave de um valor não depende de com quem ele é processado
+    np.testing.assert_array_equal(chaves_aleatorias(valores[::-1], 7, 1), chaves[::-1])
+
+
+@pytest.mark.parametrize('metodo', ['lote', 'legado', 'exaustivo'])
+def test_universo_filtrado_repete_com_a_mesma_semente(geracao, metodo):
+    a = gerar_universo_filtrado(3000, metodo=metodo, semente=11, **geracao)
+    b = gerar_universo_filtrado(3000, metodo=metodo, semente=11, **geracao)
+    c = gerar_universo_filtrado(3000, metodo=metodo, semente=12, **geracao)
+    np.testing.assert_array_equal(a, b)
+    assert not np.array_equal(a, c)
+
+
+def test_blocos_repetem_com_a_mesma_semente(geracao):
+    def blocos(semente):
+        return np.concatenate(list(gerar_universo_em_blocos(20000, metodo='lote', semente=semente, **geracao)))
+    np.testing.assert_array_equal(blocos(5), blocos(5))
+    assert not np.array_equal(blocos(5), blocos(6))
+
+
+def test_dirigido_repete_e_completa_as_faixas_baixas_com_lote(geracao, predicao):
+    cotas = BaldesLimitados.das_metas(50, METAS_ALTAS).cotas()
+    a = gerar_universo_filtrado(30000, metodo='dirigido', semente=3, cotas=cotas, **geracao)
+    np.testing.assert_array_equal(a, gerar_universo_filtrado(30000, metodo='dirigido', semente=3, cotas=cotas,
+                                                             **geracao))
+    assert len(np.unique(a)) == len(a)
+
+    # Só a cota do score máximo é dirigida...
+    dirigidos = gerar_universo_dirigido(cotas[SCORE_DIRIGIDO], geracao['ultimo_sorteio'], geracao['perfil'],
+                                        predicao['mapa_39'], predicao['mapa_21'], semente=3)
+    assert 0 < len(dirigidos) <= cotas[SCORE_DIRIGIDO]
+    np.testing.assert_array_equal(a[:len(dirigidos)], dirigidos)
+    scores = pontuar_mascaras(dirigidos, geracao['perfil'], predicao['mapa_39'], predicao['mapa_21'])
+    assert (scores == SCORE_DIRIGIDO).all()
+    # ... e o resto é o 'lote' da mesma semente, sem repetir os dirigidos
+    resto = gerar_universo_lote(30000 - len(dirigidos), geracao['ultimo_sorteio'], predicao['mapa_39'], 'F4', 3)
+    np.testing.assert_array_equal(a[len(dirigidos):], resto[~np.isin(resto, dirigidos)])
+
+
+def test_auto_nunca_escolhe_o_dirigido():
+    assert escolher_metodo('auto') == 'lote'
+    assert escolher_metodo('dirigido') == 'dirigido'
+
+
+def _selecao(geracao, gabarito, predicao, semente, pressao=60):
+    baldes = BaldesLimitados.das_metas(30, METAS)
+    compilado = PerfilCompilado(gabarito, predicao['mapa_39'], predicao['mapa_21'])
+    encher_baldes(gerar_universo_em_blocos(60000, metodo='lote', semente=semente, **geracao),
+                  baldes, compilado, predicao['mapa_39'], predicao['mapa_21'])
+    mascara_pressao = mascara_jogo(predicao['ciclo_faltantes'].union(predicao['atrasadas_criticas']))
+    return selecionar_com_diversificacao(baldes.baldes(), METAS, 30, baldes.max_score, mascara_pressao,
+                                         pressao, fluxo_python(semente, FLUXO_SELECAO))
+
+
+def test_selecao_repete_com_a_mesma_semente(geracao, gabarito, predicao):
+    a = _selecao(geracao, gabarito, predicao, 21)
+    assert a == _selecao(geracao, gabarito, predicao, 21)
+    assert a != _selecao(geracao, gabarito, predicao, 22)
+    assert len(a) == 30 and len(set(a)) == 30
+    # O score que acompanha cada jogo é o do kernel
+    jogos, scores = zip(*a)
+    np.testing.assert_array_equal(
+        PerfilCompilado(gabarito, predicao['mapa_39'], predicao['mapa_21']).pontuar(np.array(jogos)), scores)
+    assert _selecao(geracao, gabarito, predicao, 21, pressao=0) == _selecao(geracao, gabarito, predicao, 21, pressao=0)
+
+
+def test_selecao_respeita_cotas_e_pula_metas_na_sobra():
+    rng = random.Random(0)
+    jogos = {s: sorted({tuple(sorted(rng.sample(range(1, 61), 6))) for _ in range(40)}) for s in range(4)}
+    baldes = {s: np.array([mascara_jogo(j) for j in js], dtype=np.uint64) for s, js in jogos.items()}
+    metas = [(3, 50), (2, 25)]
+    selecionados = selecionar_com_diversificacao(baldes, metas, 20, 3, 0, 0, random.Random(1))
+    assert len(selecionados) == 20
+    assert all(j in jogos[s] for j, s in selecionados)
+    assert sum(s == 3 for _, s in selecionados) >= 10
+    pulando = selecionar_com_diversificacao(baldes, metas, 20, 3, 0, 0, random.Random(1), pular_metas_na_sobra=True)
+    assert sum(s == 3 for _, s in pulando) == 10
+    assert sum(s == 2 for _, s in pulando) == 5
+
+
+def test_simulacao_repete_com_a_mesma_semente(matriz):
+    concurso = int(matriz.concursos[-40])
+    params = {'qtd': 15, 's1': 9, 'p1': 20, 's2': 8, 'p2': 30, 's3': 7, 'p3': 30, 's4': 6, 'p4': 20,
+              'gerador': 'lote', 'semente': 99}
+    a = simular_cenario_passado(matriz, concurso, params)
+    b = simular_cenario_passado(matriz, concurso, params)
+    assert a['semente'] == b['semente'] == 99
+    assert a['jogos'] == b['jogos']
+    assert a['resumo'] == b['resumo']
@@ -0,0 +1,127 @@
+# tests/test_snapshot.py
+import sqlite3
+
+import numpy as np
+
+from app.util.config_mega import TABLE_NAME
+from app.util.historico import HistoricoSorteios
+from app.util.matriz import MatrizSorteios
+from app.util.snapshot import (
+    CABECALHO, caminho_snapshot, consultar_versao, dataframe_da_matriz, gravar_snapshot_do_banco,
+    ler_cabecalho, matriz_do_snapshot, snapshot_em_dia, soma_verificacao)
+
+from conftest import ler_historico
+
+
+def _gravar(db_path):
+    conn = sqlite3.connect(db_path)
+    try:
+        gravar_snapshot_do_banco(conn, db_path)
+    finally:
+        conn.close()
+
+
+def _em_dia(db_path):
+    conn = sqlite3.connect(db_path)
+    try:
+        return snapshot_em_dia(conn, db_path)
+    finally:
+        conn.close()
+
+
+def _executar(db_path, sql, params=()):
+    conn = sqlite3.connect(db_path)
+    try:
+        conn.execute(sql, params)
+        conn.commit()
+    finally:
+        conn.close()
+
+
+def test_snapshot_ida_e_volta(db_copia):
+    _gravar(db_copia)
+    df = ler_historico(db_copia)
+    esperado = MatrizSorteios.de_dataframe(df)
+
+    m = matriz_do_snapshot(caminho_snapshot(db_copia))
+    assert m is not None
+    np.testing.assert_array_equal(m.concursos, esperado.concursos)
+    np.testing.assert_array_equal(m.dezenas, esperado.dezenas)
+    np.testing.assert_array_equal(m.incidencia, esperado.incidencia)
+    assert list(m.datas) == list(df['Data'])
+    assert dataframe_da_matriz(m)[['Concurso', 'Bola1', 'Bola6']].equals(
+        dataframe_da_matriz(esperado)[['Concurso', 'Bola1', 'Bola6']])
+    assert _em_dia(db_copia)
+
+
+def test_soma_verificacao_igual_no_sql_e_nos_arrays(db_copia):
+    df = ler_historico(db_copia)
+    conn = sqlite3.connect(db_copia)
+    try:
+        ultimo, total, soma = consultar_versao(conn)
+    finally:
+        conn.close()
+    assert (ultimo, total) == (int(df['Concurso'].iloc[-1]), len(df))
+    assert soma == soma_verificacao(df['Concurso'].to_numpy(), df[[f'Bola{i}' for i in range(1, 7)]].to_numpy())
+    # Não depende da ordem das bolas na linha (o snapshot guarda as dezenas ordenadas)
+    dezenas = df[[f'Bola{i}' for i in range(1, 7)]].to_numpy()
+    assert soma == soma_verificacao(df['Concurso'].to_numpy(), dezenas[:, ::-1])
+
+
+def test_cabecalho_desatualizado_por_concurso_novo(db_copia):
+    _gravar(db_copia)
+    df = ler_historico(db_copia)
+    ultimo = int(df['Concurso'].iloc[-1])
+    _executar(db_copia, f"INSERT INTO {TABLE_NAME} (Concurso, Data, Bola1, Bola2, Bola3, Bola4, Bola5, Bola6) "
+                        "VALUES (?, '01/01/2099', 1, 12, 23, 34, 45, 56)", (ultimo + 1,))
+    assert not _em_dia(db_copia)
+
+    h = HistoricoSorteios(db_copia)
+    assert h.obter_matriz().concursos[-1] == ultimo + 1
+    assert h.versao[:2] == (ultimo + 1, len(df) + 1)
+
+
+def test_cabecalho_desatualizado_por_correcao_no_lugar(db_copia):
+    _gravar(db_copia)
+    df = ler_historico(db_copia)
+    concurso = int(df['Concurso'].iloc[5])
+    antes = sorted(int(x) for x in df.iloc[5][[f'Bola{i}' for i in range(1, 7)]])
+    nova = next(d for d in range(60, 0, -1) if d not in antes)
+    # Mesmo último concurso e mesma contagem: só a soma de verificação muda
+    _executar(db_copia, f"UPDATE {TABLE_NAME} SET Bola1 = ? WHERE Concurso = ?", (nova, concurso))
+    assert not _em_dia(db_copia)
+
+    h = HistoricoSorteios(db_copia)
+    m = h.obter_matriz()
+    assert h._matriz_base is None            # não usou o snapshot velho
+    assert nova in m.dezenas[5].tolist()
+
+
+def test_historico_recarrega_correcao_em_memoria(db_copia):
+    h = HistoricoSorteios(db_copia)
+    df = h.obter()
+    versao = h.versao
+    concurso = int(df['Concurso'].iloc[0])
+    antes = set(int(x) for x in df.iloc[0][[f'Bola{i}' for i in range(1, 7)]])
+    nova = next(d for d in range(1, 61) if d not in antes)
+    _executar(db_copia, f"UPDATE {TABLE_NAME} SET Bola6 = ? WHERE Concurso = ?", (nova, concurso))
+    h._assinatura = None                     # força a conferência (mtime pode não mudar no mesmo tick)
+
+    df_novo = h.obter()
+    assert h.versao != versao
+    assert h.versao[:2] == versao[:2]
+    assert int(df_novo.loc[df_novo['Concurso'] == concurso, 'Bola6'].iloc[0]) == nova
+
+
+def test_cabecalho_de_outro_formato_e_ignorado(db_copia):
+    _gravar(db_copia)
+    caminho = caminho_snapshot(db_copia)
+    assert ler_cabecalho(caminho) is not None
+    with open(caminho, 'r+b') as f:
+        cab = np.frombuffer(f.read(CABECALHO.itemsize), dtype=CABECALHO).copy()
+        cab['versao'] = cab['versao'] - 1
+        f.seek(0)
+        f.write(cab.tobytes())
+    assert ler_cabecalho(caminho) is None
+    assert matriz_do_snapshot(caminho) is None
+    assert not _em_dia(db_copia)
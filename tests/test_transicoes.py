@@ -0,0 +1,45 @@
+# tests/test_transicoes.py
+import pytest
+
+from app.util.analise_preditiva import calcular_matriz_transicao
+from app.util.features import obter_features
+from app.util.transicoes import INDICADORES_DISCRETOS, TransicoesPrefixadas, tendencia_no_corte
+
+
+def _referencia(estados, inicio, n):
+    """(último estado, {próximo: %}) pela matriz de transição completa do prefixo."""
+    serie = estados[inicio:n]
+    if not serie:
+        return None
+    return serie[-1], calcular_matriz_transicao(serie).get(serie[-1], {})
+
+
+@pytest.mark.parametrize('chave', sorted(INDICADORES_DISCRETOS))
+def test_no_corte_igual_a_matriz_de_transicao(matriz, chave):
+    coluna, _, inicio = INDICADORES_DISCRETOS[chave]
+    estados = [str(v) for v in obter_features(matriz)[coluna].tolist()]
+    transicoes = TransicoesPrefixadas(estados, inicio)
+    total = len(estados)
+    for n in sorted({1, 2, inicio, inicio + 1, inicio + 2, 50, 300, total // 2, total - 1, total}):
+        obtido = transicoes.no_corte(n)
+        esperado = _referencia(estados, inicio, n)
+        assert obtido == esperado, n
+        if esperado is not None:
+            # Mesma ordem de chaves (primeira ocorrência), como no dict exibido
+            assert list(obtido[1]) == list(esperado[1]), n
+
+
+def test_serie_sintetica_com_estado_sem_sucessor():
+    estados = ['a', 'b', 'a', 'c', 'a', 'b', 'd']
+    transicoes = TransicoesPrefixadas(estados)
+    for n in range(len(estados) + 1):
+        assert transicoes.no_corte(n) == _referencia(estados, 0, n)
+    assert transicoes.no_corte(len(estados)) == ('d', {})
+
+
+def test_tendencia_no_corte_dos_recortes(matriz):
+    estados = [str(v) for v in obter_features(matriz)['pares'].tolist()]
+    for n in (10, 700, len(matriz)):
+        tendencia = tendencia_no_corte(matriz.recorte(n), 'pares')
+        ultimo, probabilidades = _referencia(estados, 0, n)
+        assert tendencia == {'indicador': 'Pares', 'ultimo_estado': ultimo, 'probabilidades': probabilidades}